@@ -0,0 +1,9 @@
+"""Benchmarks for the OpenMotics API client.
+
+All benchmarks run against the local fake OpenMotics API
+(`pyopenmotics.fakeserver`), so they can be run offline and produce
+comparable numbers between revisions.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks --output bench.json
+"""
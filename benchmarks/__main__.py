@@ -0,0 +1,63 @@
+"""Run the benchmarks and write the results as JSON."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+from typing import Any
+
+from pyopenmotics.__version__ import __version__
+
+from . import bench_decode, bench_requests, bench_status
+
+BENCHMARKS = {
+    "requests": bench_requests.run,
+    "status": bench_status.run,
+    "decode": bench_decode.run,
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the selected benchmarks.
+
+    Args:
+        argv: command line arguments
+    """
+    parser = argparse.ArgumentParser(description="OpenMotics client benchmarks")
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        choices=[[], *BENCHMARKS],
+        default=[],
+        help="benchmarks to run (default: all)",
+    )
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # The rate limit error log would drown the report.
+    logging.getLogger("pyopenmotics").setLevel(logging.CRITICAL)
+
+    report: dict[str, Any] = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": int(time.time()),
+        "results": [],
+    }
+    for name in args.benchmarks or BENCHMARKS:
+        for result in BENCHMARKS[name]():
+            report["results"].append({"benchmark": name, **result})
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as handle:
+            handle.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
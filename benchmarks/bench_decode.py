@@ -0,0 +1,116 @@
+"""Decode time and peak memory of large list responses."""
+from __future__ import annotations
+
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from pyopenmotics.fakeserver import FakeServerConfig
+
+from .common import fake_client, measure
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Return the peak memory (bytes) allocated while calling func.
+
+    Args:
+        func: function to measure
+
+    Returns:
+        peak traced memory in bytes
+    """
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def decode(client: Any, path: str, params: dict[str, Any] | None) -> dict[str, Any]:
+    """Measure decoding a response body the way Api does.
+
+    The body is downloaded once, so the timings and the peak memory only
+    cover the client side decode and not the (in-process) fake server.
+
+    Args:
+        client: an authenticated client
+        path: api path
+        params: query parameters
+
+    Returns:
+        body size, decode time and peak decode memory
+    """
+    url = str(client.join_url(client.base_url, path))
+    resp = client.session.get(url, params=params)
+
+    def decode_body() -> Any:
+        return client.serializer.decode_data(resp.content)
+
+    start = time.perf_counter()
+    runs = 0
+    while runs < 5 or time.perf_counter() - start < 0.5:
+        decode_body()
+        runs += 1
+    return {
+        "serializer": client.serializer.name,
+        "body_bytes": len(resp.content),
+        "decode_ms": (time.perf_counter() - start) / runs * 1000,
+        "peak_memory_bytes": peak_memory(decode_body),
+    }
+
+
+def run(outputs: int = 5000, history_days: int = 30) -> list[dict[str, Any]]:
+    """Benchmark outputs.all and sensors.historical on a large installation.
+
+    Args:
+        outputs: number of outputs on the installation
+        history_days: length of the history window at 1 minute resolution
+
+    Returns:
+        list of benchmark results
+    """
+    results = []
+    config = FakeServerConfig(outputs=outputs, sensors=1)
+    with fake_client(config) as (client, _):
+        installations = client.base.installations
+
+        def all_outputs() -> Any:
+            return installations.outputs.all(1)
+
+        results.append(
+            {
+                "name": "outputs.all",
+                "entities": outputs,
+                **decode(client, "/base/installations/1/outputs", None),
+                **measure(all_outputs, 10),
+            }
+        )
+
+        params = {
+            "start": 0,
+            "end": history_days * 86400,
+            "resolution": "1m",
+            "time_format": "unix",
+        }
+
+        def history() -> Any:
+            return installations.sensors.historical(
+                1,
+                0,
+                start=0,
+                end=history_days * 86400,
+                resolution="1m",
+                time_format="unix",
+            )
+
+        results.append(
+            {
+                "name": "sensors.historical",
+                "points": history_days * 1440,
+                **decode(client, "/base/installations/1/sensors/0/historical", params),
+                **measure(history, 5),
+            }
+        )
+    return results
@@ -0,0 +1,49 @@
+"""Throughput and latency of Api.get and Api.post."""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pyopenmotics.fakeserver import FakeServerConfig
+
+from .common import fake_client, measure, summarize
+
+
+def run(iterations: int = 500, threads: int = 8) -> list[dict[str, Any]]:
+    """Benchmark single requests, sequentially and from a thread pool.
+
+    Args:
+        iterations: number of requests per benchmark
+        threads: number of worker threads for the concurrent benchmark
+
+    Returns:
+        list of benchmark results
+    """
+    results = []
+    with fake_client(FakeServerConfig(outputs=10)) as (client, _):
+        get_path = "/base/installations/1/outputs/1"
+        post_path = "/base/installations/1/outputs/1/toggle"
+
+        results.append(
+            {"name": "api.get", **measure(lambda: client.get(get_path), iterations)}
+        )
+        results.append(
+            {"name": "api.post", **measure(lambda: client.post(post_path), iterations)}
+        )
+
+        def timed_get(_: int) -> float:
+            start = time.perf_counter()
+            client.get(get_path)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            samples = list(pool.map(timed_get, range(iterations)))
+        results.append(
+            {
+                "name": f"api.get[{threads} threads]",
+                **summarize(samples, time.perf_counter() - start),
+            }
+        )
+    return results
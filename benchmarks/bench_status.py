@@ -0,0 +1,36 @@
+"""Cost of Installations.status_by_id."""
+from __future__ import annotations
+
+from typing import Any
+
+from pyopenmotics.fakeserver import FakeServerConfig
+
+from .common import fake_client, measure
+
+
+def run(iterations: int = 50, latency: float = 0.005) -> list[dict[str, Any]]:
+    """Benchmark status_by_id, counting the requests it needs.
+
+    Args:
+        iterations: number of status_by_id calls
+        latency: simulated server latency in seconds
+
+    Returns:
+        list of benchmark results
+    """
+    config = FakeServerConfig(
+        outputs=100, lights=20, shutters=10, sensors=20, latency=latency
+    )
+    with fake_client(config) as (client, server):
+        installations = client.base.installations
+        before = sum(server.fleet.requests.values())
+        result = measure(lambda: installations.status_by_id(1), iterations)
+        requests = sum(server.fleet.requests.values()) - before
+    return [
+        {
+            "name": "installations.status_by_id",
+            "server_latency_ms": latency * 1000,
+            "requests_per_call": requests / iterations,
+            **result,
+        }
+    ]
@@ -0,0 +1,89 @@
+"""Shared helpers for the benchmarks."""
+from __future__ import annotations
+
+import contextlib
+import math
+import time
+from typing import Any, Callable, Iterator
+
+from pyopenmotics import BackendClient
+from pyopenmotics.fakeserver import FakeOpenMoticsServer, FakeServerConfig
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return the nearest-rank percentile pct of samples.
+
+    Args:
+        samples: list of measurements
+        pct: percentile between 0 and 100
+
+    Returns:
+        the percentile, or nan when there are no samples
+    """
+    if not samples:
+        return math.nan
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summarize(samples: list[float], elapsed: float) -> dict[str, Any]:
+    """Summarize latency samples (seconds) measured over elapsed seconds.
+
+    Args:
+        samples: list of latencies in seconds
+        elapsed: wall clock time of the whole run in seconds
+
+    Returns:
+        a dict with count, throughput and latency percentiles in milliseconds
+    """
+    return {
+        "count": len(samples),
+        "requests_per_second": len(samples) / elapsed if elapsed else math.nan,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else math.nan,
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int) -> dict[str, Any]:
+    """Call func iterations times and summarize the latencies.
+
+    Args:
+        func: function to benchmark
+        iterations: number of calls
+
+    Returns:
+        see summarize
+    """
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - call_start)
+    return summarize(samples, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def fake_client(
+    config: FakeServerConfig | None = None,
+) -> Iterator[tuple[BackendClient, FakeOpenMoticsServer]]:
+    """Start a fake server and yield an authenticated client for it.
+
+    Args:
+        config: FakeServerConfig
+
+    Yields:
+        a (client, server) tuple
+    """
+    with FakeOpenMoticsServer(config) as server:
+        client = BackendClient(
+            "benchmark", "benchmark", server=server.host, port=server.port, ssl=False
+        )
+        client.get_token()
+        try:
+            yield client, server
+        finally:
+            client.session.close()
@@ -1,11 +1,17 @@
 """Asynchronous Python client for OpenMotics."""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping, Sequence
 
 from cached_property import cached_property
 
-from ...util import feature_used
+from ...exceptions import OpenMoticsDeadlineExceededError
+from ...features import SECTION_FEATURES, FeatureSet
+from ...tracing import traced
+from ...util import compile_fields, project
+from ...waiting import StateWaiter
 from .groupactions import Groupactions
 from .inputs import Inputs
 from .lights import Lights
@@ -54,6 +60,9 @@ class Installations:
     # }
     """
 
+    # Seconds the features of an installation are cached.
+    features_ttl: float = 3600.0
+
     def __init__(self, api_client: Api):
         """Init the installations object.
 
@@ -61,6 +70,8 @@ class Installations:
             api_client: Api
         """
         self.api_client = api_client
+        self._features: dict[int, tuple[float, FeatureSet]] = {}
+        self._features_lock = threading.Lock()
 
     @cached_property
     def groupactions(self):
@@ -116,6 +127,15 @@ class Installations:
         """
         return Shutters(api_client=self.api_client)
 
+    @cached_property
+    def waiter(self):
+        """cached_property.
+
+        Returns:
+            waiter: waits for entity states, see wait_for
+        """
+        return StateWaiter(api_client=self.api_client)
+
     def all(  # noqa: A003
         self,
         installation_filter: str | None = None,
@@ -158,12 +178,15 @@ class Installations:
         path = "/base/installations"
         if installation_filter:
             query_params = {"filter": installation_filter}
-            return self.api_client.get(
+            installations = self.api_client.get(
                 path=path,
                 params=query_params,
             )
+        else:
+            installations = self.api_client.get(path)
 
-        return self.api_client.get(path)
+        self._learn(installations)
+        return installations
 
     def discovery(
         self,
@@ -220,16 +243,87 @@ class Installations:
         # }
         """
         path = f"/base/installations/{installation_id}"
-        return self.api_client.get(path)
+        installation = self.api_client.get(path)
+        self._learn(installation)
+        return installation
+
+    def features(self, installation_id: int) -> FeatureSet:
+        """Return the features of an installation.
+
+        They are cached for features_ttl seconds, and read with by_id when
+        unknown or expired.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            FeatureSet
+        """
+        with self._features_lock:
+            cached = self._features.get(installation_id)
+        if cached is not None and time.monotonic() - cached[0] < self.features_ttl:
+            return cached[1]
+        self.by_id(installation_id=installation_id)
+        with self._features_lock:
+            return self._features[installation_id][1]
+
+    def _learn(self, installations: Any) -> None:
+        """Pass Installation objects on to the components learning from them.
+
+        Args:
+            installations: an Installation object or a list of them
+        """
+        if self.api_client.router is not None:
+            self.api_client.router.learn(installations)
+        if self.api_client.breaker is not None:
+            self.api_client.breaker.learn(installations)
+        if isinstance(installations, dict):
+            installations = [installations]
+        now = time.monotonic()
+        for installation in installations or []:
+            if isinstance(installation, dict) and "features" in installation:
+                features = FeatureSet.from_installation(installation)
+                with self._features_lock:
+                    self._features[installation["id"]] = (now, features)
+
+    def wait_for(
+        self,
+        installation_id: int,
+        entity: tuple[str, int],
+        predicate: Callable[[dict[str, Any]], bool],
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Wait until an entity satisfies a predicate, see waiting.StateWaiter.
+
+        Args:
+            installation_id: int
+            entity: (kind, entity id), for example ("shutters", 1)
+            predicate: called with the entity object
+            timeout: seconds to wait
 
+        Returns:
+            the entity object satisfying predicate
+        """
+        return self.waiter.wait_for(installation_id, entity, predicate, timeout)
+
+    @traced("openmotics.status_by_id")
     def status_by_id(
         self,
         installation_id: int,
+        timeout: float | None = None,
     ) -> dict[str, Any]:
         """Return status of all connected devices in one call.
 
+        The cached features of the installation decide which sections are
+        read, see features.
+
+        When the timeout (or the deadline of an enclosing Api.deadline)
+        passes, the parts not fetched yet are left out and listed under
+        "timed_out".
+
         Args:
             installation_id: int
+            timeout: seconds the whole call may take
 
         Returns:
             Dict
@@ -240,29 +334,114 @@ class Installations:
             "shutters": {},
             "groupsactions": {},
             "sensors": {},
+            "timed_out": [],
         }
 
-        installation = self.by_id(installation_id=installation_id)
-        inst_features = installation["features"]
+        sections = ("outputs", "shutters", "groupactions", "sensors", "lights")
+        return self._snapshot(status, installation_id, sections, {}, timeout)
+
+    @traced("openmotics.snapshot")
+    def snapshot(
+        self,
+        installation_id: int,
+        sections: Iterable[str] | None = None,
+        fields: Sequence[str] | Mapping[str, Sequence[str]] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Return the entities of selected sections, with selected fields.
 
-        # outlets & lights: (an output can be a light or an outlet)
-        if feature_used(features=inst_features, feat_to_check="outputs"):
-            if outputs := self.outputs.all(installation_id):  # pylint: disable=E1101
-                status["outputs"] = outputs
+        Only the requested sections the installation uses are read, and
+        the entities are projected down to the requested fields:
 
-        if feature_used(features=inst_features, feat_to_check="shutters"):
-            if shutters := self.shutters.all(installation_id):  # pylint: disable=E1101
-                status["shutters"] = shutters
+            snapshot(21, ["outputs"], ["id", "status.on"])
 
-        if groupactions := self.groupactions.all(
-            installation_id
-        ):  # pylint: disable=E1101
-            status["groupactions"] = groupactions
+        Sections the installation does not use are empty. Sections not read
+        before the timeout passed are left out and listed under "timed_out".
 
-        if sensors := self.sensors.all(installation_id):  # pylint: disable=E1101
-            status["sensors"] = sensors
+        Args:
+            installation_id: int
+            sections: for example ["outputs", "shutters"], None for all of
+                outputs, lights, shutters, sensors, groupactions and inputs
+            fields: field names, nested fields separated by dots, for every
+                section or as a dict per section. None for all fields.
+            timeout: seconds the whole call may take
 
-        if lights := self.lights.all(installation_id):  # pylint: disable=E1101
-            status["lights"] = lights
+        Returns:
+            Dict with a list of entities per section
 
-        return status
+        Raises:
+            ValueError: an unknown section was requested
+        """
+        sections = tuple(SECTION_FEATURES if sections is None else sections)
+        unknown = set(sections) - set(SECTION_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        if fields is None:
+            trees: dict[str, dict[str, Any]] = {}
+        elif isinstance(fields, Mapping):
+            trees = {key: compile_fields(value) for key, value in fields.items()}
+        else:
+            tree = compile_fields(fields)
+            trees = {section: tree for section in sections}
+        result: dict[str, Any] = {section: [] for section in sections}
+        result["timed_out"] = []
+        return self._snapshot(result, installation_id, sections, trees, timeout)
+
+    def _snapshot(
+        self,
+        result: dict[str, Any],
+        installation_id: int,
+        sections: Iterable[str],
+        trees: dict[str, dict[str, Any]],
+        timeout: float | None,
+    ) -> dict[str, Any]:
+        """Read the sections the installation uses into result.
+
+        Args:
+            result: the status being built, with a "timed_out" list
+            installation_id: int
+            sections: the sections to read
+            trees: projection tree per section, see util.compile_fields
+            timeout: seconds the whole call may take
+
+        Returns:
+            result
+        """
+        with self.api_client.deadline(timeout):
+            try:
+                features = self.features(installation_id)
+            except OpenMoticsDeadlineExceededError:
+                result["timed_out"].append("installation")
+                return result
+
+            # Only the sections the installation uses, lights are outputs.
+            for key in sections:
+                if features.needs(key):
+                    self._fetch_part(
+                        result, key, getattr(self, key), installation_id, trees.get(key)
+                    )
+
+        return result
+
+    @staticmethod
+    def _fetch_part(
+        status: dict[str, Any],
+        key: str,
+        section: Any,
+        installation_id: int,
+        tree: dict[str, Any] | None = None,
+    ) -> None:
+        """Add all entities of a section to status, unless the deadline passed.
+
+        Args:
+            status: the status being built by status_by_id or snapshot
+            key: key of the entities in status
+            section: api section with an all method, for example Outputs
+            installation_id: int
+            tree: projection tree of the entities, None to keep all fields
+        """
+        try:
+            if entities := section.all(installation_id):
+                status[key] = entities if tree is None else project(entities, tree)
+        except OpenMoticsDeadlineExceededError:
+            status["timed_out"].append(key)
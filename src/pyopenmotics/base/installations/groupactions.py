@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any
 
+from ...scenes import ScenePrediction, decode_actions
+
 if TYPE_CHECKING:
     from ...client import Api  # pylint: disable=R0401
 
@@ -14,6 +16,9 @@ class Groupactions:
     sequentially.
     They can contain limited logic such as if-statements.
     They do not hold state so it"s a fire-and-forget approach.
+
+    The action lists of the groupactions read with all and by_id are kept,
+    so the effect of a trigger on outputs and shutters can be predicted.
     """
 
     def __init__(self, api_client: Api):
@@ -23,6 +28,8 @@ class Groupactions:
             api_client: Api
         """
         self.api_client = api_client
+        self._actions: dict[int, dict[int, list[int]]] = {}
+        self._predictions: dict[int, dict[int, ScenePrediction]] = {}
 
     def all(  # noqa: A003
         self,
@@ -60,9 +67,11 @@ class Groupactions:
         path = f"/base/installations/{installation_id}/groupactions"
         if groupactions_filter:
             query_params = {"filter": groupactions_filter}
-            return self.api_client.get(path, params=query_params)
-
-        return self.api_client.get(path)
+            result = self.api_client.get(path, params=query_params)
+        else:
+            result = self.api_client.get(path)
+        self._learn(installation_id, result)
+        return result
 
     def by_id(
         self,
@@ -79,7 +88,9 @@ class Groupactions:
             Returns a groupaction with id
         """
         path = f"/base/installations/{installation_id}/groupactions/{groupaction_id}"
-        return self.api_client.get(path)
+        result = self.api_client.get(path)
+        self._learn(installation_id, result)
+        return result
 
     def trigger(
         self,
@@ -88,6 +99,9 @@ class Groupactions:
     ) -> dict[str, Any]:
         """Trigger a specified groupaction object.
 
+        With a state store on the client, the predicted effects of the
+        groupaction are applied to it once the trigger succeeded.
+
         Args:
             installation_id: int
             groupaction_id: int
@@ -100,7 +114,79 @@ class Groupactions:
             f"/base/installations/{installation_id}"
             f"/groupactions/{groupaction_id}/trigger"
         )
-        return self.api_client.post(path)
+        result = self.api_client.post(path)
+        store = self.api_client.state
+        if store is not None:
+            prediction = self.predict(installation_id, groupaction_id)
+            for effect in prediction.effects:
+                known = store.get(installation_id, effect.kind, effect.entity_id)
+                status = effect.resolve(known.data if known is not None else None)
+                if status is not None:
+                    store.assume(installation_id, effect.kind, effect.entity_id, status)
+        return result
+
+    def predict(
+        self,
+        installation_id: int,
+        groupaction_id: int,
+    ) -> ScenePrediction:
+        """Return the predicted effects of a groupaction.
+
+        The groupaction is fetched when its actions are not known yet.
+
+        Args:
+            installation_id: int
+            groupaction_id: int
+
+        Returns:
+            ScenePrediction with the affected outputs and shutters
+        """
+        predictions = self._predictions.setdefault(installation_id, {})
+        prediction = predictions.get(groupaction_id)
+        if prediction is None:
+            actions = self._actions.get(installation_id, {})
+            if groupaction_id not in actions:
+                self.by_id(installation_id, groupaction_id)
+                actions = self._actions.get(installation_id, {})
+            prediction = decode_actions(actions.get(groupaction_id, []), actions)
+            if groupaction_id not in actions:
+                prediction.complete = False
+            predictions[groupaction_id] = prediction
+        return prediction
+
+    def refresh_affected(
+        self,
+        installation_id: int,
+        groupaction_id: int,
+    ) -> list[dict[str, Any]]:
+        """Read the outputs and shutters a groupaction affects.
+
+        Only the affected entities are read. When the groupaction has
+        actions that can not be predicted, all outputs and shutters are.
+
+        Args:
+            installation_id: int
+            groupaction_id: int
+
+        Returns:
+            list of the output and shutter objects read
+        """
+        installations = self.api_client.base.installations
+        sections = {
+            "outputs": installations.outputs,
+            "shutters": installations.shutters,
+        }
+        prediction = self.predict(installation_id, groupaction_id)
+        if not prediction.complete:
+            return [
+                entity
+                for section in sections.values()
+                for entity in section.all(installation_id)
+            ]
+        return [
+            sections[effect.kind].by_id(installation_id, effect.entity_id)
+            for effect in prediction.effects
+        ]
 
     def by_usage(
         self,
@@ -136,3 +222,21 @@ class Groupactions:
             Returns all scenes
         """
         return self.by_usage(installation_id, "SCENE")
+
+    def _learn(self, installation_id: int, groupactions: Any) -> None:
+        """Keep the action lists of groupactions read from the API.
+
+        Args:
+            installation_id: int
+            groupactions: a groupaction object or a list of them
+        """
+        if isinstance(groupactions, dict):
+            groupactions = [groupactions]
+        if not isinstance(groupactions, list):
+            return
+        actions = self._actions.setdefault(installation_id, {})
+        for groupaction in groupactions:
+            if isinstance(groupaction, dict) and "id" in groupaction:
+                actions[groupaction["id"]] = list(groupaction.get("actions") or [])
+        # Nested groupactions may have changed, decode again when needed.
+        self._predictions.pop(installation_id, None)
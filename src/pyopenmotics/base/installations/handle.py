@@ -0,0 +1,215 @@
+"""Asynchronous Python client for OpenMotics."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ...client import Api  # pylint: disable=R0401
+
+# Commands per section, the last path segment of POST
+# /base/installations/{installation_id}/{section}/{id}/{action}
+ROUTES: dict[str, frozenset[str]] = {
+    "outputs": frozenset({"turn_on", "turn_off", "toggle", "location"}),
+    "lights": frozenset({"turn_on", "turn_off", "location"}),
+    "shutters": frozenset(
+        {
+            "up",
+            "down",
+            "stop",
+            "change_position",
+            "change_relative_position",
+            "lock",
+            "unlock",
+            "preset",
+            "move",
+        }
+    ),
+    "groupactions": frozenset({"trigger"}),
+    "sensors": frozenset(),
+    "inputs": frozenset(),
+}
+
+
+class Installation:
+    """Calls of a single installation, with its paths built once.
+
+    Returned by Api.installation. The paths of the installation, its
+    sections and the commands used are kept, so a command loop does not
+    format them again:
+
+        home = client.installation(21)
+        home.turn_on_output(3)
+        home.change_shutter_position(1, 50)
+    """
+
+    def __init__(self, api_client: Api, installation_id: int):
+        """Init the installation handle.
+
+        Args:
+            api_client: Api
+            installation_id: int
+        """
+        self.api_client = api_client
+        self.installation_id = installation_id
+        self.path = f"/base/installations/{installation_id}"
+        self._paths: dict[tuple[str, int | None, str | None], str] = {
+            (section, None, None): f"{self.path}/{section}" for section in ROUTES
+        }
+
+    def route(
+        self,
+        section: str,
+        entity_id: int | None = None,
+        action: str | None = None,
+    ) -> str:
+        """Return the path of a section, entity or command.
+
+        Args:
+            section: for example "outputs"
+            entity_id: int, None for the whole section
+            action: command, for example "turn_on"
+
+        Returns:
+            the api path
+
+        Raises:
+            ValueError: unknown section or command
+        """
+        key = (section, entity_id, action)
+        path = self._paths.get(key)
+        if path is None:
+            if section not in ROUTES or (
+                action is not None and action not in ROUTES[section]
+            ):
+                raise ValueError(f"Unknown route {section}/{action}")
+            path = self._paths[(section, None, None)]
+            if entity_id is not None:
+                path = f"{path}/{entity_id}"
+            if action is not None:
+                path = f"{path}/{action}"
+            self._paths[key] = path
+        return path
+
+    def get(
+        self,
+        section: str,
+        entity_id: int | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> Any:
+        """Get the entities of a section, or a single entity.
+
+        Args:
+            section: for example "outputs"
+            entity_id: int, None for all entities
+            params: request parameter
+
+        Returns:
+            the entity objects
+        """
+        return self.api_client.get(self.route(section, entity_id), params=params)
+
+    def command(
+        self,
+        section: str,
+        entity_id: int | None,
+        action: str,
+        json: dict[str, Any] | None = None,
+    ) -> Any:
+        """Send a command to an entity.
+
+        Args:
+            section: for example "outputs"
+            entity_id: int, None for commands on all entities of a section
+            action: for example "turn_on"
+            json: request body
+
+        Returns:
+            response body, the updated entity for most commands
+        """
+        return self.api_client.post(self.route(section, entity_id, action), json=json)
+
+    def turn_on_output(self, output_id: int, value: int | None = None) -> Any:
+        """Turn on an output, see Outputs.turn_on.
+
+        Args:
+            output_id: int
+            value: <0 - 100>
+
+        Returns:
+            Returns a output with id
+        """
+        return self.command("outputs", output_id, "turn_on", {"value": value})
+
+    def turn_off_output(self, output_id: int) -> Any:
+        """Turn off an output, see Outputs.turn_off.
+
+        Args:
+            output_id: int
+
+        Returns:
+            Returns a output with id
+        """
+        return self.command("outputs", output_id, "turn_off")
+
+    def toggle_output(self, output_id: int) -> Any:
+        """Toggle an output, see Outputs.toggle.
+
+        Args:
+            output_id: int
+
+        Returns:
+            Returns a output with id
+        """
+        return self.command("outputs", output_id, "toggle")
+
+    def turn_on_light(self, light_id: int, value: int | None = 100) -> Any:
+        """Turn on a light, see Lights.turn_on for the color arguments.
+
+        Args:
+            light_id: int
+            value: <0 - 100>
+
+        Returns:
+            Returns a light with id
+        """
+        return self.command("lights", light_id, "turn_on", {"value": value})
+
+    def turn_off_light(self, light_id: int) -> Any:
+        """Turn off a light, see Lights.turn_off.
+
+        Args:
+            light_id: int
+
+        Returns:
+            Returns a light with id
+        """
+        return self.command("lights", light_id, "turn_off")
+
+    def change_shutter_position(self, shutter_id: int, position: int) -> Any:
+        """Move a shutter, see Shutters.change_position.
+
+        Args:
+            shutter_id: int
+            position: <0 - 100>
+
+        Returns:
+            Returns a shutter with id
+        """
+        return self.command(
+            "shutters", shutter_id, "change_position", {"position": position}
+        )
+
+    def trigger_groupaction(self, groupaction_id: int) -> Any:
+        """Trigger a groupaction, see Groupactions.trigger.
+
+        Goes through Groupactions, which applies the predicted effects to
+        the state store.
+
+        Args:
+            groupaction_id: int
+
+        Returns:
+            Returns a groupaction with id
+        """
+        groupactions = self.api_client.base.installations.groupactions
+        return groupactions.trigger(self.installation_id, groupaction_id)
@@ -7,7 +7,6 @@ This section documents the gateways having full Light support.
 """
 from __future__ import annotations
 
-import json
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
@@ -124,17 +123,15 @@ class Lights:
             Returns a light with id
         """
         path = f"/base/installations/{installation_id}/lights/{light_id}/turn_on"
-        payload = json.dumps(
-            {
-                "value": value,
-                "temperature": temperature,
-                "hue": hue,
-                "saturation": saturation,
-                "red": red,
-                "green": green,
-                "blue": blue,
-            }
-        )
+        payload = {
+            "value": value,
+            "temperature": temperature,
+            "hue": hue,
+            "saturation": saturation,
+            "red": red,
+            "green": green,
+            "blue": blue,
+        }
         return self.api_client.post(path, json=payload)
 
     def turn_off(
@@ -178,13 +175,11 @@ class Lights:
         """
 
         path = f"/base/installations/{installation_id}/lights/{light_id}/location"
-        payload = json.dumps(
-            {
-                "floor_id": floor_id,
-                "floor_coordinates": {
-                    "x": floor_coordinates_x,
-                    "y": floor_coordinates_y,
-                },
-            }
-        )
+        payload = {
+            "floor_id": floor_id,
+            "floor_coordinates": {
+                "x": floor_coordinates_x,
+                "y": floor_coordinates_y,
+            },
+        }
         return self.api_client.post(path, json=payload)
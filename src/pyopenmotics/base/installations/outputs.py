@@ -1,9 +1,10 @@
 """Asynchronous Python client for OpenMotics."""
 from __future__ import annotations
 
-import json
 import logging
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Iterator
+
+from ...tracing import traced
 
 if TYPE_CHECKING:
     from ...client import Api  # pylint: disable=R0401
@@ -61,6 +62,24 @@ class Outputs:
         path = f"/base/installations/{installation_id}/outputs"
         return self.api_client.get(path)
 
+    def iter_all(
+        self,
+        installation_id: int,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream all output objects, one at a time.
+
+        The outputs are decoded while the response is downloaded, which keeps
+        memory bounded on installations with thousands of outputs.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            Iterator over the outputs
+        """
+        path = f"/base/installations/{installation_id}/outputs"
+        return self.api_client.iter_get(path)
+
     def by_filter(
         self,
         installation_id: int,
@@ -174,6 +193,7 @@ class Outputs:
         payload = {"value": value}
         return self.api_client.post(path, json=payload)
 
+    @traced("openmotics.outputs.turn_off")
     def turn_off(
         self,
         installation_id: int,
@@ -217,15 +237,13 @@ class Outputs:
             Returns the outputs at location
         """
         path = f"/base/installations/{installation_id}/outputs/{output_id}/location"
-        payload = json.dumps(
-            {
-                "floor_id": floor_id,
-                "floor_coordinates": {
-                    "x": floor_coordinates_x,
-                    "y": floor_coordinates_y,
-                },
-            }
-        )
+        payload = {
+            "floor_id": floor_id,
+            "floor_coordinates": {
+                "x": floor_coordinates_x,
+                "y": floor_coordinates_y,
+            },
+        }
         return self.api_client.post(path, json=payload)
 
     def by_type(
@@ -242,7 +260,9 @@ class Outputs:
         Returns:
             Returns a output with type
         """
-        output_filter = json.dumps({"type": output_type.upper()})
+        output_filter = self.api_client.serializer.dumps_str(
+            {"type": output_type.upper()}
+        )
         return self.by_filter(
             installation_id=installation_id,
             output_filter=output_filter,
@@ -296,7 +316,9 @@ class Outputs:
         Returns:
             Returns all outlets
         """
-        output_filter = json.dumps({"usage": output_usage.upper()})
+        output_filter = self.api_client.serializer.dumps_str(
+            {"usage": output_usage.upper()}
+        )
         return self.by_filter(
             installation_id=installation_id,
             output_filter=output_filter,
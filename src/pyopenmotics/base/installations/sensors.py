@@ -1,7 +1,9 @@
 """Asynchronous Python client for OpenMotics."""
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Iterator
+
+from ...tracing import traced
 
 if TYPE_CHECKING:
     from ...client import Api  # pylint: disable=R0401
@@ -77,6 +79,7 @@ class Sensors:
         path = f"/base/installations/{installation_id}/sensors/{sensor_id}"
         return self.api_client.get(path)
 
+    @traced("openmotics.sensors.historical")
     def historical(
         self,
         installation_id: int,
@@ -130,11 +133,75 @@ class Sensors:
         # }
         """
 
-        # E501 line too long
-        path = (
-            f"/base/installations/{installation_id}/sensors/{sensor_id}"
-            f"/historical?start={start}&end={end}&resolution={resolution}"
-            f"&group_function={group_function}&use_active_hours={use_active_hours}"
-            f"&time_format={time_format}"
+        path, query_params = self._historical_query(
+            installation_id,
+            sensor_id,
+            start=start,
+            end=end,
+            resolution=resolution,
+            group_function=group_function,
+            use_active_hours=use_active_hours,
+            time_format=time_format,
         )
-        return self.api_client.get(path)
+        return self.api_client.get(path, params=query_params)
+
+    def iter_historical(
+        self,
+        installation_id: int,
+        sensor_id: int | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        resolution: str | None = "5m",
+        group_function: str | None = "last",
+        use_active_hours: bool | None = False,
+        time_format: str | None = "iso",
+    ) -> Iterator[dict[str, Any]]:
+        """Stream the historical data of a sensor, one point at a time.
+
+        Same arguments as historical, but the points are decoded while the
+        response is downloaded, which keeps memory bounded for long windows.
+
+        Args:
+            installation_id: int
+            sensor_id: int
+            start: start point to query from in unix timestamp
+            end: end point to query from in unix timestamp
+            resolution: {1m, 5m, 15m, h, D, M}
+            group_function: {last, mean, max, min}
+            use_active_hours: {True, False}
+            time_format: {unix, iso}
+
+        Returns:
+            Iterator over the data points
+        """
+        path, query_params = self._historical_query(
+            installation_id,
+            sensor_id,
+            start=start,
+            end=end,
+            resolution=resolution,
+            group_function=group_function,
+            use_active_hours=use_active_hours,
+            time_format=time_format,
+        )
+        return self.api_client.iter_get(path, params=query_params)
+
+    @staticmethod
+    def _historical_query(
+        installation_id: int,
+        sensor_id: int | None,
+        **query: Any,
+    ) -> tuple[str, dict[str, Any]]:
+        """Build the path and query parameters of a historical request.
+
+        Args:
+            installation_id: int
+            sensor_id: int
+            **query: query parameters, None values are left out
+
+        Returns:
+            path and query parameters
+        """
+        path = f"/base/installations/{installation_id}/sensors/{sensor_id}/historical"
+        query_params = {key: value for key, value in query.items() if value is not None}
+        return path, query_params
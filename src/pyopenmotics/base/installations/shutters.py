@@ -1,7 +1,6 @@
 """Asynchronous Python client for OpenMotics."""
 from __future__ import annotations
 
-import json
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
@@ -146,11 +145,9 @@ class Shutters:
             f"/base/installations/{installation_id}"
             f"/shutters/{shutter_id}/change_position"
         )
-        payload = json.dumps(
-            {
-                "position": position,
-            }
-        )
+        payload = {
+            "position": position,
+        }
         return self.api_client.post(path, json=payload)
 
     def change_relative_position(
@@ -178,11 +175,9 @@ class Shutters:
             f"/base/installations/{installation_id}"
             f"/shutters/{shutter_id}/change_relative_position"
         )
-        payload = json.dumps(
-            {
-                "offset": offset,
-            }
-        )
+        payload = {
+            "offset": offset,
+        }
         return self.api_client.post(path, json=payload)
 
     def lock(
@@ -247,11 +242,9 @@ class Shutters:
             Returns a shutter with id
         """
         path = f"/base/installations/{installation_id}/shutters/{shutter_id}/preset"
-        payload = json.dumps(
-            {
-                "position": position,
-            }
-        )
+        payload = {
+            "position": position,
+        }
         return self.api_client.post(path, json=payload)
 
     def move_to_preset(
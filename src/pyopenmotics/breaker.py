@@ -0,0 +1,272 @@
+"""Per installation circuit breaker.
+
+Calls to an installation whose gateway is offline fail slowly: every call
+waits for its retries before the error reaches the caller. A CircuitBreaker
+counts the consecutive failures per installation and, once
+failure_threshold is reached, opens the circuit: further calls fail
+immediately with OpenMoticsCircuitOpenError. After reset_timeout the
+circuit is half-open and a few probe calls are let through, the first
+success closes it again, a failure reopens it:
+
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    client = BackendClient("id", "secret", breaker=breaker)
+    ...
+    breaker.state(21)  # "closed", "open" or "half_open"
+
+Only calls served by the gateway of an installation go through the
+breaker, see util.gateway_installation_id.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from .exceptions import (
+    OpenMoticsAuthenticationError,
+    OpenMoticsCircuitOpenError,
+    OpenMoticsDeadlineExceededError,
+    OpenMoticsError,
+    OpenMoticsRateLimitError,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass
+class Circuit:
+    """State of the circuit of one installation.
+
+    Attributes:
+        state: CLOSED, OPEN or HALF_OPEN
+        failures: consecutive failed calls
+        opened_at: time.monotonic() the circuit was last opened
+        probes: half-open calls in flight
+    """
+
+    state: str = CLOSED
+    failures: int = 0
+    opened_at: float = 0.0
+    probes: int = 0
+
+
+class CircuitBreaker:
+    """Fail fast on installations that keep failing."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        """Init the breaker.
+
+        Args:
+            failure_threshold: consecutive failures opening a circuit
+            reset_timeout: seconds an open circuit waits before probing
+            half_open_max_calls: concurrent probe calls when half-open
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.circuits: dict[int, Circuit] = {}
+        self._lock = threading.Lock()
+
+    def state(self, installation_id: int) -> str:
+        """Return the state of the circuit of an installation.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            "closed", "open" or "half_open"
+        """
+        with self._lock:
+            circuit = self.circuits.get(installation_id)
+            if circuit is None:
+                return CLOSED
+            self._update(circuit)
+            return circuit.state
+
+    def snapshot(self) -> dict[int, dict[str, Any]]:
+        """Return the circuits that are not closed or have failures.
+
+        Returns:
+            dict of installation id to state, failures and seconds open
+        """
+        now = time.monotonic()
+        with self._lock:
+            snapshot = {}
+            for installation_id, circuit in sorted(self.circuits.items()):
+                self._update(circuit)
+                if circuit.state == CLOSED and not circuit.failures:
+                    continue
+                snapshot[installation_id] = {
+                    "state": circuit.state,
+                    "failures": circuit.failures,
+                    "open_for": now - circuit.opened_at
+                    if circuit.state != CLOSED
+                    else 0.0,
+                }
+            return snapshot
+
+    def trip(self, installation_id: int) -> None:
+        """Open the circuit of an installation, for example when it is offline.
+
+        Args:
+            installation_id: int
+        """
+        with self._lock:
+            circuit = self.circuits.setdefault(installation_id, Circuit())
+            self._open(installation_id, circuit)
+
+    def reset(self, installation_id: int | None = None) -> None:
+        """Close the circuit of an installation, or all circuits.
+
+        Args:
+            installation_id: int, None for all installations
+        """
+        with self._lock:
+            if installation_id is None:
+                self.circuits.clear()
+            else:
+                self.circuits.pop(installation_id, None)
+
+    def learn(self, installations: Any) -> None:
+        """Open the circuits of installations reported offline.
+
+        Args:
+            installations: an Installation object or a list of them, as
+                returned by Installations.all and Installations.by_id
+        """
+        if isinstance(installations, dict):
+            installations = [installations]
+        for installation in installations or []:
+            if not isinstance(installation, dict):
+                continue
+            online = (installation.get("flags") or {}).get("ONLINE")
+            if online is False and installation.get("id") is not None:
+                if self.state(installation["id"]) == CLOSED:
+                    self.trip(installation["id"])
+
+    @contextmanager
+    def guard(self, installation_id: int) -> Iterator[None]:
+        """Run a call through the circuit of an installation.
+
+        Args:
+            installation_id: int
+
+        Yields:
+            None, when the call is allowed
+
+        Raises:
+            OpenMoticsCircuitOpenError: the circuit is open
+            Exception: the exception of the call, after counting it
+        """
+        probe, failures = self._before(installation_id)
+        if probe is None:
+            raise OpenMoticsCircuitOpenError(
+                f"Circuit of installation {installation_id} is open after "
+                f"{failures} failures"
+            )
+        outcome = None
+        try:
+            yield
+        except Exception as exc:
+            outcome = self.outcome(exc)
+            raise
+        else:
+            outcome = True
+        finally:
+            self._after(installation_id, probe, outcome)
+
+    @staticmethod
+    def outcome(exc: BaseException) -> bool | None:
+        """Classify an exception raised by a call.
+
+        Client errors (HTTP 4xx) show the installation is answering.
+        Authentication errors, rate limiting and exceeded deadlines are about
+        the client, they neither open nor close a circuit.
+
+        Args:
+            exc: the exception raised by the call
+
+        Returns:
+            False for a failure of the installation, True for an answer
+            from the installation, None if it tells nothing about it
+        """
+        if isinstance(
+            exc,
+            (
+                OpenMoticsRateLimitError,
+                OpenMoticsAuthenticationError,
+                OpenMoticsDeadlineExceededError,
+            ),
+        ):
+            return None
+        if isinstance(exc, OpenMoticsError) and exc.args:
+            status = exc.args[0]
+            if isinstance(status, int) and 400 <= status < 500:
+                return True
+        return False
+
+    def _before(self, installation_id: int) -> tuple[bool | None, int]:
+        """Let a call through the circuit of an installation.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            (probe, failures), probe is None when the call is not allowed
+        """
+        with self._lock:
+            circuit = self.circuits.get(installation_id)
+            if circuit is None:
+                return False, 0
+            self._update(circuit)
+            if circuit.state == CLOSED:
+                return False, circuit.failures
+            if circuit.state == HALF_OPEN and circuit.probes < self.half_open_max_calls:
+                circuit.probes += 1
+                return True, circuit.failures
+            return None, circuit.failures
+
+    def _after(self, installation_id: int, probe: bool, outcome: bool | None) -> None:
+        with self._lock:
+            circuit = self.circuits.get(installation_id)
+            if circuit is None:
+                if outcome is not False:
+                    return
+                circuit = self.circuits[installation_id] = Circuit()
+            if probe:
+                circuit.probes -= 1
+            if outcome is None:
+                return
+            if outcome:
+                if circuit.state != CLOSED:
+                    logger.info("Circuit of installation %s closed", installation_id)
+                del self.circuits[installation_id]
+                return
+            circuit.failures += 1
+            if probe or circuit.failures >= self.failure_threshold:
+                self._open(installation_id, circuit)
+
+    def _open(self, installation_id: int, circuit: Circuit) -> None:
+        if circuit.state != OPEN:
+            logger.warning("Circuit of installation %s opened", installation_id)
+        circuit.state = OPEN
+        circuit.opened_at = time.monotonic()
+
+    def _update(self, circuit: Circuit) -> None:
+        if (
+            circuit.state == OPEN
+            and time.monotonic() - circuit.opened_at >= self.reset_timeout
+        ):
+            circuit.state = HALF_OPEN
@@ -0,0 +1,157 @@
+"""Validator cache for conditional GET requests.
+
+The client remembers the ETag and Last-Modified validators of GET responses
+together with their decoded data. The next GET of the same url and params
+is sent with If-None-Match / If-Modified-Since, and when the server answers
+304 Not Modified the remembered data is returned without downloading or
+decoding the body again.
+
+Cached data is copied when stored and when returned, so callers can change
+the results they get. Historical sensor data is large and rarely polled,
+it is not cached.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+DEFAULT_MAX_ENTRIES = 512
+UNCACHED_SEGMENTS = ("/historical",)
+
+
+@dataclass
+class CachedResponse:
+    """Validators and decoded data of a GET response.
+
+    Attributes:
+        data: the decoded "data" member of the response
+        etag: value of the ETag header, if any
+        last_modified: value of the Last-Modified header, if any
+    """
+
+    data: Any
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Return the headers making a request conditional on this response.
+
+        Returns:
+            dict with If-None-Match and/or If-Modified-Since
+        """
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Thread safe LRU cache of CachedResponse objects, keyed by url and params."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Init the cache.
+
+        Args:
+            max_entries: number of responses to remember
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any] | None = None) -> Hashable:
+        """Return the cache key of a request.
+
+        Args:
+            url: full url of the request
+            params: query parameters
+
+        Returns:
+            hashable key
+        """
+        if not params:
+            return url
+        return (url, tuple(sorted((str(k), str(v)) for k, v in params.items())))
+
+    @staticmethod
+    def cacheable(url: str) -> bool:
+        """Return if the responses of url are worth caching.
+
+        Args:
+            url: full url or path of the request
+
+        Returns:
+            bool
+        """
+        return not any(segment in url for segment in UNCACHED_SEGMENTS)
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        """Return the cached response of key, marking it recently used.
+
+        Args:
+            key: see ResponseCache.key
+
+        Returns:
+            the CachedResponse, None if key is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: Hashable, headers: Any, data: Any) -> None:
+        """Remember the validators and data of a 200 response.
+
+        Responses without ETag and Last-Modified headers can not be
+        revalidated and are not stored (a stale entry of key is dropped).
+
+        Args:
+            key: see ResponseCache.key
+            headers: the response headers
+            data: the decoded data of the response
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        with self._lock:
+            if etag is None and last_modified is None:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = CachedResponse(
+                copy.deepcopy(data), etag, last_modified
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, hit: bool) -> None:
+        """Count the outcome of a conditional request.
+
+        Args:
+            hit: True if the server answered 304 Not Modified
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self) -> None:
+        """Forget all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of cached responses.
+
+        Returns:
+            int
+        """
+        return len(self._entries)
@@ -1,28 +1,93 @@
 """Asynchronous Python client for OpenMotics API."""
 from __future__ import annotations
 
+import copy
 import logging
+import threading
 import time
-from typing import Any
+from contextlib import ExitStack, nullcontext
+from typing import Any, ContextManager, Iterator
 
 import backoff  # type: ignore
+import httpx
 from authlib.integrations.httpx_client import OAuth2Client, OAuthError
 from cached_property import cached_property
 from yarl import URL
 
+from . import deadlines, scheduler, tracing
 from .__version__ import __version__
 from .base import Base
+from .base.installations.handle import Installation
+from .breaker import CircuitBreaker
+from .cache import ResponseCache
 from .const import OM_API_BASE_PATH, OM_API_HOST, OM_API_PORT, OM_API_SSL
-from .exceptions import (  # OpenMoticsConnectionTimeoutError,
+from .exceptions import (
     OpenMoticsAuthenticationError,
     OpenMoticsConnectionError,
+    OpenMoticsConnectionTimeoutError,
+    OpenMoticsDeadlineExceededError,
     OpenMoticsError,
     OpenMoticsRateLimitError,
 )
+from .hedging import HedgingPolicy
+from .instrumentation import (
+    AuthRefreshEvent,
+    PhaseTimings,
+    RateLimitEvent,
+    RequestEvent,
+    RequestHooks,
+    ResponseEvent,
+    RetryEvent,
+)
+from .routing import LocalRouter
+from .scheduler import Priority, PriorityScheduler
+from .serialization import Serializer, default_serializer
+from .state import StateStore, list_path
+from .streaming import iter_json_array
+from .util import (
+    endpoint_template,
+    gateway_installation_id,
+    installation_id_from_path,
+)
 from .websocket import WebSocket
 
 logger = logging.getLogger(__name__)
 
+MAX_URLS = 4096
+
+
+def _on_backoff(details: dict[str, Any]) -> None:
+    """Report a retry of Api.__send to the tracing span and hooks.
+
+    Args:
+        details: the backoff details of the failed call
+    """
+    args = details["args"]
+    api = args[0]
+    if api.tracer is not None:
+        # pylint: disable=protected-access
+        api._local.retries = getattr(api._local, "retries", 0) + 1
+        api._set_span_attribute(tracing.ATTR_RETRIES, api._local.retries)
+    if not api.hooks:
+        return
+    if isinstance(details.get("exception"), OpenMoticsRateLimitError):
+        # Reported as rate_limit phase of the next attempt.
+        api._local.rate_limit_wait = details["wait"]  # pylint: disable=W0212
+    kwargs = details["kwargs"]
+    method = args[1] if len(args) > 1 else kwargs.get("method", "GET")
+    url = args[2] if len(args) > 2 else kwargs.get("url", "")
+    api._emit(  # pylint: disable=protected-access
+        "on_retry",
+        RetryEvent(
+            method=method,
+            endpoint=endpoint_template(url),
+            tries=details["tries"],
+            wait=details["wait"],
+            elapsed=details["elapsed"],
+            error=details.get("exception"),
+        ),
+    )
+
 
 # class Api(object):
 class Api:
@@ -40,6 +105,15 @@ class Api:
         ssl: bool | None = OM_API_SSL,
         request_timeout: int | None = 8,
         user_agent: str | None = None,
+        hooks: list[RequestHooks] | None = None,
+        tracer: Any | None = None,
+        serializer: Serializer | None = None,
+        conditional_requests: bool = False,
+        router: LocalRouter | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedging: HedgingPolicy | None = None,
+        scheduler: PriorityScheduler | None = None,
+        state: StateStore | None = None,
     ) -> None:
         """Initialize connection with the OpenMotics API.
 
@@ -49,8 +123,23 @@ class Api:
             server: str
             port: int
             ssl: bool
-            request_timeout: int
+            request_timeout: timeout (seconds) of a single HTTP request
             user_agent: str
+            hooks: instrumentation hooks, see instrumentation.RequestHooks
+            tracer: OpenTelemetry compatible tracer, see tracing
+            serializer: JSON serializer, orjson based if installed by default
+            conditional_requests: remember ETag/Last-Modified validators and
+                revalidate GET requests, see cache.ResponseCache. Off by
+                default, it keeps a copy of every cached response.
+            router: send requests to the local gateway of an installation
+                when it is reachable, see routing.LocalRouter
+            breaker: fail fast on installations that keep failing, see
+                breaker.CircuitBreaker
+            hedging: hedge slow GET requests, see hedging.HedgingPolicy
+            scheduler: share the rate limit by priority and installation,
+                see scheduler.PriorityScheduler
+            state: keep the state of the entities read and commanded, see
+                state.StateStore
         """
         self.token = None
         self.client = None
@@ -63,6 +152,19 @@ class Api:
 
         self.request_timeout = request_timeout
         self.user_agent = user_agent
+        self.hooks: list[RequestHooks] = list(hooks or [])
+        self.tracer = tracer
+        self.serializer = serializer or default_serializer()
+        self.response_cache = ResponseCache() if conditional_requests else None
+        self.router = router
+        self.breaker = breaker
+        self.hedging = hedging
+        self.scheduler = scheduler
+        self.state = state
+        self._local = threading.local()
+        self._urls: dict[tuple[URL, str], URL] = {}
+        self._installations: dict[int, Installation] = {}
+        self._push_sources: tuple[Any, ...] = ()
 
         if user_agent is None:
             self.user_agent = f"PythonOpenMoticsAPI/{__version__}"
@@ -98,9 +200,63 @@ class Api:
         """
         return WebSocket(api_client=self)
 
+    def add_push_source(self, source: Any) -> None:
+        """Register an event stream, for example a websocket.WebSocketPool.
+
+        Args:
+            source: has a pushes(installation_id) method
+        """
+        self._push_sources += (source,)
+
+    def remove_push_source(self, source: Any) -> None:
+        """Unregister an event stream added with add_push_source.
+
+        Args:
+            source: the event stream
+        """
+        self._push_sources = tuple(
+            item for item in self._push_sources if item is not source
+        )
+
+    def pushes(self, installation_id: int) -> bool:
+        """Return if an event stream keeps the state of an installation current.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            True if the client has a StateStore and a connected WebSocket
+            or push source watches the installation
+        """
+        if self.state is None:
+            return False
+        sources = self._push_sources
+        websocket = self.__dict__.get("websocket")  # only when created
+        if websocket is not None:
+            sources += (websocket,)
+        return any(source.pushes(installation_id) for source in sources)
+
+    def installation(self, installation_id: int) -> Installation:
+        """Return the handle of an installation.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            Installation, with the paths of the installation built once
+        """
+        handle = self._installations.get(installation_id)
+        if handle is None:
+            handle = self._installations.setdefault(
+                installation_id, Installation(self, installation_id)
+            )
+        return handle
+
     def join_url(self, base: URL, path: str) -> URL:
         """Join URL and path together.
 
+        Joined URLs are kept, parsing a path again is costly.
+
         Args:
             base: URL object
             path: path
@@ -108,11 +264,15 @@ class Api:
         Returns:
             URL object
         """
-        if path.startswith("/"):
+        key = (base, path)
+        url = self._urls.get(key)
+        if url is None:
+            if len(self._urls) >= MAX_URLS:
+                self._urls.clear()
             # Remove trailing /
-            path = path[1:]
-        self.url = base / path
-        return self.url
+            url = self._urls[key] = base / (path[1:] if path.startswith("/") else path)
+        self.url = url
+        return url
 
     def get_token(self):
         """Get Token.
@@ -139,14 +299,325 @@ class Api:
         """
         raise NotImplementedError()  # noqa: DAR401
 
+    def add_hook(self, hook: RequestHooks) -> None:
+        """Register an instrumentation hook.
+
+        Args:
+            hook: RequestHooks
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHooks) -> None:
+        """Unregister an instrumentation hook.
+
+        Args:
+            hook: RequestHooks
+        """
+        self.hooks.remove(hook)
+
+    def _emit(self, name: str, event: Any) -> None:
+        """Call the name method of all hooks with event.
+
+        Args:
+            name: hook method, for example "on_response"
+            event: the event to pass to the hooks
+        """
+        for hook in self.hooks:
+            try:
+                getattr(hook, name)(event)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Instrumentation hook %r failed on %s", hook, name)
+
+    def _set_span_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute on the span of the current request.
+
+        Args:
+            key: attribute name
+            value: attribute value
+        """
+        span = getattr(self._local, "span", None)
+        if span is not None:
+            span.set_attribute(key, value)
+
+    def _sampled(self, event: RequestEvent) -> bool:
+        """Check if any hook wants the phase timings of a request.
+
+        Args:
+            event: RequestEvent
+
+        Returns:
+            True if at least one hook samples the request
+        """
+        sampled = False
+        for hook in self.hooks:
+            try:
+                sampled = hook.sample(event) or sampled
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Instrumentation hook %r failed on sample", hook)
+        return sampled
+
+    def _ensure_token(self) -> None:
+        """Fetch a token, or refresh the current one if it expired.
+
+        Raises:
+            Exception: the error of get_token or of the token refresh
+        """
+        if self.token is None:
+            reason = "fetch"
+            refresh = self.get_token
+        else:
+            token = getattr(self.session, "token", None)
+            if not token or not token.is_expired(
+                leeway=getattr(self.session, "leeway", 60)
+            ):
+                return
+            reason = "refresh"
+            refresh = self.session.ensure_active_token
+
+        deadlines.check("getting a token")
+        if not self.hooks:
+            refresh()
+            return
+
+        start = time.perf_counter()
+        error = None
+        try:
+            refresh()
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._emit(
+                "on_auth_refresh",
+                AuthRefreshEvent(
+                    reason=reason, duration=time.perf_counter() - start, error=error
+                ),
+            )
+
+    def _circuit(self, path: str) -> ContextManager[None]:
+        """Return the circuit breaker guard for a call.
+
+        Args:
+            path: api path
+
+        Returns:
+            a context manager raising OpenMoticsCircuitOpenError when the
+            circuit of the installation is open
+        """
+        if self.breaker is None:
+            return nullcontext()
+        installation_id = gateway_installation_id(path)
+        if installation_id is None:
+            return nullcontext()
+        return self.breaker.guard(installation_id)
+
+    def __request(
+        self,
+        method: str = "GET",
+        url: str = "",
+        params: Any | None = None,
+        json: Any | None = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """Handle a request to an OpenMotics installation.
+
+        Wraps all attempts of a request in the state store, the circuit
+        breaker and a single tracing span, when configured.
+
+        Args:
+            url: Request URI, for example `/json/si`.
+            method: HTTP method to use for the request.E.g., "GET" or "POST".
+            params: parameters to query
+            json: Dictionary of data to send to the installation.
+            **kwargs: other arguments
+
+        Returns:
+            A Python dictionary (JSON decoded) with the response from the
+            OpenMotics installation.
+        """
+        payload = json
+        if json is not None:
+            # Encode once, not on every retry.
+            kwargs["content"] = self.encode_body(json)
+            json = None
+
+        if self.state is not None:
+            return self.state.track(
+                method,
+                url,
+                payload,
+                lambda: self.__guarded_send(method, url, params, json, **kwargs),
+            )
+        return self.__guarded_send(method, url, params, json, **kwargs)
+
+    def __guarded_send(
+        self,
+        method: str,
+        url: str,
+        params: Any | None = None,
+        json: Any | None = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """Send a request through the circuit breaker and tracing span.
+
+        Args:
+            method: HTTP method
+            url: api path
+            params: parameters to query
+            json: request body
+            **kwargs: other arguments
+
+        Returns:
+            the decoded response
+        """
+        with self._circuit(url):
+            if self.tracer is None:
+                return self.__dispatch(method, url, params, json, **kwargs)
+            return self.__traced_send(method, url, params, json, **kwargs)
+
+    def __traced_send(
+        self,
+        method: str,
+        url: str,
+        params: Any | None = None,
+        json: Any | None = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """Send a request in a tracing span.
+
+        Args:
+            method: HTTP method
+            url: api path
+            params: parameters to query
+            json: request body
+            **kwargs: other arguments
+
+        Returns:
+            the decoded response
+        """
+        endpoint = endpoint_template(url)
+        with tracing.span(
+            self.tracer,
+            f"{method} {endpoint}",
+            **{
+                tracing.ATTR_METHOD: method,
+                tracing.ATTR_URL: str(self.join_url(self.base_url, url)),
+                tracing.ATTR_ENDPOINT: endpoint,
+                tracing.ATTR_INSTALLATION_ID: installation_id_from_path(url),
+                tracing.ATTR_RETRIES: 0,
+            },
+        ) as span:
+            self._local.span = span
+            self._local.retries = 0
+            try:
+                return self.__dispatch(method, url, params, json, **kwargs)
+            finally:
+                self._local.span = None
+
+    def __dispatch(
+        self,
+        method: str,
+        url: str,
+        params: Any | None = None,
+        json: Any | None = None,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """Send a request, hedged if it is a GET and hedging is enabled.
+
+        Args:
+            method: HTTP method
+            url: api path
+            params: parameters to query
+            json: request body
+            **kwargs: other arguments
+
+        Returns:
+            the decoded response
+        """
+        if self.hedging is None or method != "GET":
+            return self.__send(method, url, params, json, **kwargs)
+
+        span = getattr(self._local, "span", None)
+
+        def attempt() -> dict[str, Any]:
+            self._local.span = span
+            self._local.retries = 0
+            try:
+                return self.__send(method, url, params, json, **kwargs)
+            finally:
+                self._local.span = None
+
+        return self.hedging.call(endpoint_template(url), attempt)
+
+    def encode_body(self, body: Any) -> bytes:
+        """Encode a request body with the serializer.
+
+        Args:
+            body: object to send as JSON. A str or bytes is taken to be an
+                already encoded JSON document.
+
+        Returns:
+            the encoded body
+        """
+        if isinstance(body, bytes):
+            return body
+        if isinstance(body, str):
+            return body.encode("utf8")
+        return self.serializer.dumps(body)
+
+    def span(self, name: str, **attributes: Any) -> ContextManager[Any]:
+        """Start a tracing span for a higher level operation.
+
+        Args:
+            name: name of the span
+            **attributes: span attributes
+
+        Returns:
+            a context manager yielding the span (None without tracer)
+        """
+        return tracing.span(self.tracer, name, **attributes)
+
+    def deadline(self, timeout: float | None) -> ContextManager[float | None]:
+        """Bound the total time of the calls in a block, see deadlines.
+
+        Args:
+            timeout: seconds from now, None for no (extra) deadline
+
+        Returns:
+            a context manager yielding the deadline (time.monotonic())
+        """
+        return deadlines.deadline(timeout)
+
+    def priority(self, value: Priority) -> ContextManager[Priority]:
+        """Set the priority class of the calls in a block, see scheduler.
+
+        Args:
+            value: Priority
+
+        Returns:
+            a context manager yielding the priority
+        """
+        return scheduler.priority(value)
+
     # pylint: disable=too-many-arguments
     @backoff.on_exception(
-        backoff.expo, OpenMoticsConnectionError, max_tries=3, logger=None
+        backoff.expo,
+        OpenMoticsConnectionError,
+        max_tries=3,
+        max_time=deadlines.remaining,
+        logger=None,
+        on_backoff=_on_backoff,
     )
     @backoff.on_exception(
-        backoff.expo, OpenMoticsRateLimitError, base=60, max_tries=6, logger=None
+        backoff.expo,
+        OpenMoticsRateLimitError,
+        base=60,
+        max_tries=6,
+        max_time=deadlines.remaining,
+        logger=None,
+        on_backoff=_on_backoff,
     )
-    def __request(
+    def __send(
         self,
         method: str = "GET",
         url: str = "",
@@ -154,7 +625,7 @@ class Api:
         json: Any | None = None,
         **kwargs,
     ) -> dict[str, Any]:
-        """Handle a request to an OpenMotics installation.
+        """Send a single request, retried on connection and rate limit errors.
 
         A generic method for sending/handling HTTP requests done against
         the OpenMotics installation.
@@ -172,18 +643,61 @@ class Api:
 
         Raises:
             OpenMoticsAuthenticationError: blabla
+            OpenMoticsConnectionTimeoutError: the request timed out
+            OpenMoticsDeadlineExceededError: the deadline of the call passed
             OpenMoticsError: blabla
-            OpenMoticsRateLimitError: blabla
         """
+        deadlines.check(f"{method} {url}")
         uri = self.join_url(self.base_url, url)
 
-        if self.token is None:
-            self.get_token()
+        scheduled = 0.0
+        if self.scheduler is not None:
+            scheduled = self.scheduler.acquire(
+                scheduler.request_priority(method, url), installation_id_from_path(url)
+            )
+
+        event = phases = None
+        if self.hooks:
+            event = RequestEvent(
+                method=method, url=str(uri), endpoint=endpoint_template(url)
+            )
+            self._emit("on_request_start", event)
+            if self._sampled(event):
+                phases = PhaseTimings(
+                    rate_limit=getattr(self._local, "rate_limit_wait", 0.0) + scheduled
+                )
+                kwargs["extensions"] = {"trace": phases.trace}
+            self._local.rate_limit_wait = 0.0
+
+        if phases is None:
+            self._ensure_token()
+        else:
+            auth_start = time.perf_counter()
+            self._ensure_token()
+            phases.auth = time.perf_counter() - auth_start
+        deadlines.check(f"{method} {url}")
+        timeout = deadlines.timeout(self.request_timeout)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
 
         headers = {
             "User-Agent": self.user_agent,
             "Accept": "application/json",
         }
+        if "content" in kwargs:
+            headers["Content-Type"] = "application/json"
+
+        response_cache = self.response_cache
+        cache_key = cached = None
+        if (
+            method == "GET"
+            and response_cache is not None
+            and response_cache.cacheable(url)
+        ):
+            cache_key = response_cache.key(str(uri), params)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                headers.update(cached.conditional_headers())
 
         logger.debug(
             "Request: method = %s, url = %s, params = %s, json = %s, t = %s",
@@ -194,26 +708,192 @@ class Api:
             int(time.time() * 1000),
         )
 
+        resp = None
+        error = None
         try:
-            resp = self.session.request(
+            try:
+                if phases is not None:
+                    phases.sent()
+                if self.router is not None:
+                    resp = self.__send_local(
+                        self.router, method, url, headers, params, **kwargs
+                    )
+                if resp is None:
+                    resp = self.session.request(
+                        method,
+                        url=str(uri),
+                        headers=headers,
+                        params=params,
+                        json=json,
+                        **kwargs,
+                    )
+
+            except OAuthError as exc:
+                raise OpenMoticsAuthenticationError(
+                    f"Error occurred while communicating with the OpenMotics "
+                    f"API: {exc}"
+                ) from exc
+            except httpx.TimeoutException as exc:
+                # A timeout shortened to the deadline is not retried.
+                if timeout != self.request_timeout or deadlines.expired():
+                    raise OpenMoticsDeadlineExceededError(
+                        f"Deadline exceeded during {method} {url}: {exc}"
+                    ) from exc
+                raise OpenMoticsConnectionTimeoutError(
+                    f"Timeout while communicating with the OpenMotics API: {exc}"
+                ) from exc
+            except OpenMoticsError:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                raise OpenMoticsError(
+                    f"Unknown error occurred while communicating with the OpenMotics "
+                    f"API: {exc}"
+                ) from exc
+
+            if phases is not None:
+                phases.received()
+            if self.tracer is not None:
+                self._set_span_attribute(tracing.ATTR_STATUS_CODE, resp.status_code)
+            if response_cache is None or cache_key is None:
+                return self.__handle_response(method, url, resp, phases)
+
+            if cached is not None:
+                hit = resp.status_code == 304
+                response_cache.record(hit)
+                if self.tracer is not None:
+                    self._set_span_attribute(tracing.ATTR_CACHE_HIT, hit)
+                if hit:
+                    return copy.deepcopy(cached.data)
+            response_data = self.__handle_response(method, url, resp, phases)
+            if resp.status_code == 200:
+                response_cache.store(cache_key, resp.headers, response_data)
+            return response_data
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            if event is not None:
+                self._emit(
+                    "on_response",
+                    ResponseEvent(
+                        request=event,
+                        status_code=resp.status_code if resp is not None else None,
+                        duration=time.perf_counter() - event.start,
+                        request_bytes=len(resp.request.content)
+                        if resp is not None
+                        else 0,
+                        response_bytes=resp.num_bytes_downloaded
+                        if resp is not None
+                        else 0,
+                        error=error,
+                        phases=phases,
+                    ),
+                )
+
+    def __send_local(
+        self,
+        router: LocalRouter,
+        method: str,
+        url: str,
+        headers: dict[str, Any],
+        params: Any | None = None,
+        **kwargs,
+    ) -> httpx.Response | None:
+        """Send a request to the local gateway of its installation.
+
+        A gateway that can not be connected to or rejects the token is
+        marked unhealthy, and the request goes to the cloud instead. Other
+        failures can happen after the gateway ran the request, only GET
+        requests are sent to the cloud again then.
+
+        Args:
+            router: the LocalRouter of the client
+            method: HTTP method
+            url: api path
+            headers: request headers
+            params: parameters to query
+            **kwargs: other arguments for httpx
+
+        Returns:
+            the response of the gateway, None if the cloud has to be used
+
+        Raises:
+            OpenMoticsError: a command failed in a way that may have
+                applied it
+        """
+        installation_id = installation_id_from_path(url)
+        base = router.base_url(installation_id)
+        if self.tracer is not None:
+            self._set_span_attribute(
+                tracing.ATTR_ROUTE, "cloud" if base is None else "local"
+            )
+        if installation_id is None or base is None:
+            return None
+
+        token = self.token
+        if isinstance(token, dict):
+            token = token.get("access_token")
+        timeout = kwargs.pop("timeout", None)
+        if timeout is None or timeout > router.request_timeout:
+            timeout = router.request_timeout
+        try:
+            resp = router.client.request(
                 method,
-                url=str(uri),
-                headers=headers,
+                str(self.join_url(base, url)),
+                headers={**headers, "Authorization": f"Bearer {token}"},
                 params=params,
-                json=json,
+                timeout=timeout,
                 **kwargs,
             )
+        except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+            logger.debug("Local gateway can not be reached: %s", exc)
+            resp = None
+        except httpx.HTTPError as exc:
+            if method != "GET":
+                router.mark(installation_id, False)
+                raise OpenMoticsError(
+                    f"Local gateway request {method} {url} failed, "
+                    f"it may have been applied: {exc}"
+                ) from exc
+            logger.debug("Local gateway request failed: %s", exc)
+            resp = None
+        if resp is not None and resp.status_code >= 500 and method != "GET":
+            router.mark(installation_id, False)
+            return resp
+        if resp is None or resp.status_code in {401, 403} or resp.status_code >= 500:
+            if resp is not None:
+                resp.close()
+            router.mark(installation_id, False)
+            if self.tracer is not None:
+                self._set_span_attribute(tracing.ATTR_ROUTE, "cloud")
+            return None
+        router.mark(installation_id, True)
+        return resp
 
-        except OAuthError as exc:
-            raise OpenMoticsAuthenticationError(
-                f"Error occurred while communicating with the OpenMotics " f"API: {exc}"
-            ) from exc
-        except Exception as exc:  # pylint: disable=broad-except
-            raise OpenMoticsError(
-                f"Unknown error occurred while communicating with the OpenMotics "
-                f"API: {exc}"
-            ) from exc
+    def __handle_response(
+        self,
+        method: str,
+        url: str,
+        resp: Any,
+        phases: PhaseTimings | None = None,
+    ) -> Any:
+        """Check the status of a response and decode its body.
 
+        Args:
+            method: HTTP method of the request
+            url: api path of the request
+            resp: the httpx response
+            phases: PhaseTimings to record the decode time in, if sampled
+
+        Returns:
+            The "data" member of a JSON response, the text of any other
+            response.
+
+        Raises:
+            OpenMoticsAuthenticationError: on HTTP 401 or 403
+            OpenMoticsError: on any other HTTP 4xx or 5xx
+            OpenMoticsRateLimitError: on HTTP 429
+        """
         if resp.status_code in {401, 403}:
             raise OpenMoticsAuthenticationError(
                 "The provided OpenMotics API key is not valid"
@@ -227,12 +907,19 @@ class Api:
 
             if resp.status_code == 429:
                 logger.error("Rate limit error has occurred with the OpenMotics API")
+                if self.hooks:
+                    self._emit(
+                        "on_rate_limited",
+                        RateLimitEvent(
+                            method=method,
+                            endpoint=endpoint_template(url),
+                            retry_after=resp.headers.get("Retry-After"),
+                        ),
+                    )
                 raise OpenMoticsRateLimitError()
 
             if content_type == "application/json":
-                raise OpenMoticsError(
-                    resp.status_code, json.loads(contents.decode("utf8"))
-                )
+                raise OpenMoticsError(resp.status_code, self.serializer.loads(contents))
             raise OpenMoticsError(
                 resp.status_code, {"message": contents.decode("utf8")}
             )
@@ -242,12 +929,257 @@ class Api:
             return {"": ""}
 
         if "application/json" in content_type:
-            response_data = resp.json().get("data")
+            if phases is None:
+                return self.serializer.decode_data(resp.content)
+            decode_start = time.perf_counter()
+            response_data = self.serializer.decode_data(resp.content)
+            phases.decode = time.perf_counter() - decode_start
             return response_data
 
-        return resp.text()
+        return resp.text
+
+    def iter_get(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> Iterator[Any]:
+        """Http Get, streaming the elements of a list response.
+
+        The "data" array of the response is decoded incrementally while the
+        body is downloaded, so the first element is available before the
+        download finishes and the full list is never held in memory.
+        Streamed requests are not retried.
+
+        Args:
+            path: api path
+            params: request parameter
+            timeout: seconds the whole call may take, see deadlines
 
-    def get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        Yields:
+            the elements of the "data" array of the response
+        """
+        with self.deadline(timeout):
+            yield from self.__iter_get(path, params)
+
+    def __iter_get(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+    ) -> Iterator[Any]:
+        """Stream the elements of a list response in a tracing span, see iter_get.
+
+        Args:
+            path: api path
+            params: request parameter
+
+        Yields:
+            the elements of the "data" array of the response
+        """
+        endpoint = endpoint_template(path)
+        with tracing.span(
+            self.tracer,
+            f"GET {endpoint}",
+            **{
+                tracing.ATTR_METHOD: "GET",
+                tracing.ATTR_URL: str(self.join_url(self.base_url, path)),
+                tracing.ATTR_ENDPOINT: endpoint,
+                tracing.ATTR_INSTALLATION_ID: installation_id_from_path(path),
+            },
+        ) as span:
+            yield from self.__stream(path, params, span)
+
+    def __stream(
+        self,
+        path: str,
+        params: dict[str, Any] | None,
+        span: Any,
+    ) -> Iterator[Any]:
+        """Stream the elements of a list response, see iter_get.
+
+        Scheduled, routed and tracked in the state store like the other
+        requests, but not retried or hedged.
+
+        Args:
+            path: api path
+            params: request parameter
+            span: tracing span of the call, None without tracer
+
+        Yields:
+            the elements of the "data" array of the response
+
+        Raises:
+            OpenMoticsAuthenticationError: blabla
+            OpenMoticsConnectionTimeoutError: the request timed out
+            OpenMoticsDeadlineExceededError: the deadline of the call passed
+            OpenMoticsError: blabla
+        """
+        deadlines.check(f"GET {path}")
+        uri = self.join_url(self.base_url, path)
+        if self.scheduler is not None:
+            self.scheduler.acquire(
+                scheduler.request_priority("GET", path),
+                installation_id_from_path(path),
+            )
+        self._ensure_token()
+        deadlines.check(f"GET {path}")
+        stream_kwargs = {}
+        timeout = deadlines.timeout(self.request_timeout)
+        if timeout is not None:
+            stream_kwargs["timeout"] = timeout
+        headers = {
+            "User-Agent": self.user_agent,
+            "Accept": "application/json",
+        }
+        state = self.state
+        listing = list_path(path) if state is not None else None
+
+        event = None
+        if self.hooks:
+            event = RequestEvent(
+                method="GET", url=str(uri), endpoint=endpoint_template(path)
+            )
+            self._emit("on_request_start", event)
+
+        resp = None
+        error = None
+        try:
+            with ExitStack() as stack:
+                stack.enter_context(self._circuit(path))
+                started = time.monotonic()
+                if self.router is not None:
+                    resp = self.__stream_local(
+                        self.router, stack, path, headers, params, span
+                    )
+                try:
+                    if resp is None:
+                        resp = stack.enter_context(
+                            self.session.stream(
+                                "GET",
+                                str(uri),
+                                headers=headers,
+                                params=params,
+                                **stream_kwargs,
+                            )
+                        )
+                except OAuthError as exc:
+                    raise OpenMoticsAuthenticationError(
+                        f"Error occurred while communicating with the OpenMotics "
+                        f"API: {exc}"
+                    ) from exc
+                except httpx.TimeoutException as exc:
+                    if timeout != self.request_timeout or deadlines.expired():
+                        raise OpenMoticsDeadlineExceededError(
+                            f"Deadline exceeded during GET {path}: {exc}"
+                        ) from exc
+                    raise OpenMoticsConnectionTimeoutError(
+                        f"Timeout while communicating with the OpenMotics API: {exc}"
+                    ) from exc
+                except Exception as exc:  # pylint: disable=broad-except
+                    raise OpenMoticsError(
+                        f"Unknown error occurred while communicating with the "
+                        f"OpenMotics API: {exc}"
+                    ) from exc
+                if span is not None:
+                    span.set_attribute(tracing.ATTR_STATUS_CODE, resp.status_code)
+
+                content_type = resp.headers.get("Content-Type", "")
+                if resp.status_code != 200 or "application/json" not in content_type:
+                    resp.read()
+                    data = self.__handle_response("GET", path, resp)
+                    if isinstance(data, list):
+                        yield from data
+                    elif data is not None:
+                        yield data
+                    return
+                try:
+                    for element in iter_json_array(resp.iter_bytes()):
+                        if state is not None and listing is not None:
+                            state.update(*listing, element, started)
+                        yield element
+                except ValueError as exc:
+                    raise OpenMoticsError(
+                        f"Invalid response from the OpenMotics API: {exc}"
+                    ) from exc
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            if event is not None:
+                self._emit(
+                    "on_response",
+                    ResponseEvent(
+                        request=event,
+                        status_code=resp.status_code if resp is not None else None,
+                        duration=time.perf_counter() - event.start,
+                        response_bytes=resp.num_bytes_downloaded
+                        if resp is not None
+                        else 0,
+                        error=error,
+                    ),
+                )
+
+    def __stream_local(
+        self,
+        router: LocalRouter,
+        stack: ExitStack,
+        path: str,
+        headers: dict[str, Any],
+        params: dict[str, Any] | None,
+        span: Any,
+    ) -> httpx.Response | None:
+        """Open a streamed GET on the local gateway of its installation.
+
+        Reads are safe to repeat, any failure before the body is streamed
+        falls back to the cloud.
+
+        Args:
+            router: the LocalRouter of the client
+            stack: ExitStack closing the response
+            path: api path
+            headers: request headers
+            params: parameters to query
+            span: tracing span of the call, None without tracer
+
+        Returns:
+            the response of the gateway, None if the cloud has to be used
+        """
+        installation_id = installation_id_from_path(path)
+        base = router.base_url(installation_id)
+        if installation_id is not None and base is not None:
+            token = self.token
+            if isinstance(token, dict):
+                token = token.get("access_token")
+            try:
+                resp = stack.enter_context(
+                    router.client.stream(
+                        "GET",
+                        str(self.join_url(base, path)),
+                        headers={**headers, "Authorization": f"Bearer {token}"},
+                        params=params,
+                        timeout=deadlines.timeout(router.request_timeout),
+                    )
+                )
+            except httpx.HTTPError as exc:
+                logger.debug("Local gateway request failed: %s", exc)
+            else:
+                if resp.status_code not in {401, 403} and resp.status_code < 500:
+                    router.mark(installation_id, True)
+                    if span is not None:
+                        span.set_attribute(tracing.ATTR_ROUTE, "local")
+                    return resp
+                resp.close()
+            router.mark(installation_id, False)
+        if span is not None:
+            span.set_attribute(tracing.ATTR_ROUTE, "cloud")
+        return None
+
+    def get(
+        self,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
         """Http Get.
 
         Requests the server to return specified resources.
@@ -255,14 +1187,22 @@ class Api:
         Args:
             path: api path
             params: request parameter
+            timeout: seconds the call may take including retries, see
+                deadlines
 
         Returns:
             response: response body
         """
-        return self.__request("GET", path, params, None)
+        if timeout is None:
+            return self.__request("GET", path, params, None)
+        with self.deadline(timeout):
+            return self.__request("GET", path, params, None)
 
     def post(
-        self, path: str, json: str | dict[str, Any] | None = None
+        self,
+        path: str,
+        json: str | dict[str, Any] | None = None,
+        timeout: float | None = None,
     ) -> dict[str, Any]:
         """Http Post.
 
@@ -271,11 +1211,16 @@ class Api:
         Args:
             path: api path
             json: request body
+            timeout: seconds the call may take including retries, see
+                deadlines
 
         Returns:
             response: response body
         """
-        return self.__request("POST", path, None, json)
+        if timeout is None:
+            return self.__request("POST", path, None, json)
+        with self.deadline(timeout):
+            return self.__request("POST", path, None, json)
 
     def root(self):
         """Return user information.
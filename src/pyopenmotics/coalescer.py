@@ -0,0 +1,222 @@
+"""Coalescing of rapid commands to the same entity.
+
+Dragging a dimmer or shutter slider produces many commands per second for
+one entity. A CommandCoalescer keeps at most one command in flight per
+entity. A command submitted while another one is in flight waits, and is
+replaced when a newer command for the same entity comes in, so only the
+latest value is sent. Commands of one entity are delivered in order,
+different entities are handled in parallel:
+
+    coalescer = CommandCoalescer(client, on_settled=update_ui)
+    for value in slider_values:
+        coalescer.set_light(21, 3, value)
+
+on_settled(key, result, error) is called when the last command of an
+entity has been applied and nothing is pending for it.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Hashable
+
+if TYPE_CHECKING:
+    from .client import Api  # pylint: disable=R0401
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Command:
+    """A submitted command and the futures waiting for its result."""
+
+    function: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    context: contextvars.Context
+    futures: list[Future] = field(default_factory=list)
+
+
+@dataclass
+class _Entity:
+    """Commands of one entity."""
+
+    in_flight: _Command
+    pending: _Command | None = None
+
+
+class CommandCoalescer:
+    """Send at most one command per entity, the latest value wins."""
+
+    def __init__(
+        self,
+        api_client: Api,
+        max_workers: int = 8,
+        on_settled: Callable[[Hashable, Any, BaseException | None], None] | None = None,
+    ):
+        """Init the coalescer.
+
+        Args:
+            api_client: Api
+            max_workers: entities handled in parallel
+            on_settled: called with (key, result, error) when an entity has
+                no more commands in flight or pending
+        """
+        self.api_client = api_client
+        self.on_settled = on_settled
+        self.submitted = 0
+        self.sent = 0
+        self._entities: dict[Hashable, _Entity] = {}
+        self._settling = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="openmotics-command"
+        )
+
+    def submit(
+        self, key: Hashable, function: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Future:
+        """Submit a command for an entity.
+
+        A pending command of the same entity is replaced, its future gets
+        the result of the command replacing it.
+
+        Args:
+            key: identifies the entity, for example ("lights", 21, 3)
+            function: the command, for example Lights.turn_on
+            *args: arguments of function
+            **kwargs: keyword arguments of function
+
+        Returns:
+            a Future with the result of the command
+        """
+        future: Future = Future()
+        command = _Command(function, args, kwargs, contextvars.copy_context(), [future])
+        with self._lock:
+            self.submitted += 1
+            entity = self._entities.get(key)
+            if entity is None:
+                self._entities[key] = _Entity(command)
+            else:
+                if entity.pending is not None:
+                    command.futures.extend(entity.pending.futures)
+                entity.pending = command
+                return future
+        self._executor.submit(self._run, key, command)
+        return future
+
+    def set_light(
+        self, installation_id: int, light_id: int, value: int, **kwargs: Any
+    ) -> Future:
+        """Dim a light, see Lights.turn_on.
+
+        Args:
+            installation_id: int
+            light_id: int
+            value: <0 - 100>
+            **kwargs: other arguments of Lights.turn_on
+
+        Returns:
+            a Future with the updated light
+        """
+        return self.submit(
+            ("lights", installation_id, light_id),
+            self.api_client.base.installations.lights.turn_on,
+            installation_id,
+            light_id,
+            value=value,
+            **kwargs,
+        )
+
+    def set_shutter_position(
+        self, installation_id: int, shutter_id: int, position: int
+    ) -> Future:
+        """Move a shutter, see Shutters.change_position.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+            position: <0 - 100>
+
+        Returns:
+            a Future with the updated shutter
+        """
+        return self.submit(
+            ("shutters", installation_id, shutter_id),
+            self.api_client.base.installations.shutters.change_position,
+            installation_id,
+            shutter_id,
+            position,
+        )
+
+    @property
+    def coalesced(self) -> int:
+        """Return the number of commands replaced before they were sent.
+
+        Returns:
+            int
+        """
+        with self._lock:
+            pending = sum(
+                entity.pending is not None for entity in self._entities.values()
+            )
+            in_flight = len(self._entities)
+            return self.submitted - self.sent - in_flight - pending
+
+    def wait_settled(self, timeout: float | None = None) -> bool:
+        """Wait until no commands are in flight or pending.
+
+        Args:
+            timeout: seconds to wait, None to wait forever
+
+        Returns:
+            True if all entities settled
+        """
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: not self._entities and not self._settling, timeout
+            )
+
+    def close(self) -> None:
+        """Send the pending commands and stop the worker threads."""
+        self.wait_settled()
+        self._executor.shutdown()
+
+    def _run(self, key: Hashable, command: _Command | None) -> None:
+        result = error = None
+        while command is not None:
+            try:
+                result = command.context.run(
+                    command.function, *command.args, **command.kwargs
+                )
+                error = None
+            except Exception as exc:  # pylint: disable=broad-except
+                result, error = None, exc
+            for future in command.futures:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+            with self._lock:
+                self.sent += 1
+                entity = self._entities[key]
+                command = entity.pending
+                if command is None:
+                    del self._entities[key]
+                    self._settling += 1
+                else:
+                    entity.in_flight, entity.pending = command, None
+
+        try:
+            if self.on_settled is not None:
+                self.on_settled(key, result, error)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("on_settled callback failed for %s", key)
+        finally:
+            with self._lock:
+                self._settling -= 1
+                self._idle.notify_all()
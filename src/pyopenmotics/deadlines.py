@@ -0,0 +1,102 @@
+"""Per call deadlines.
+
+A deadline bounds the total time of a call, including its retries,
+rate limit waits and sub-requests:
+
+    with client.deadline(0.8):
+        status = client.base.installations.status_by_id(21)
+
+or, for a single call, client.get(path, timeout=0.8). Deadlines nest, the
+earliest one wins. They are kept in a contextvar, so they also apply to
+the attempts the client runs on other threads (see hedging).
+
+When the deadline has passed, calls raise OpenMoticsDeadlineExceededError.
+That error is not retried.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from .exceptions import OpenMoticsDeadlineExceededError
+
+_DEADLINE: ContextVar[float | None] = ContextVar("openmotics_deadline", default=None)
+
+
+@contextmanager
+def deadline(timeout: float | None) -> Iterator[float | None]:
+    """Run the calls in the block with a deadline.
+
+    Args:
+        timeout: seconds from now, None for no (extra) deadline
+
+    Yields:
+        the deadline in time.monotonic() seconds, None without deadline
+    """
+    current = _DEADLINE.get()
+    if timeout is None:
+        yield current
+        return
+    new = time.monotonic() + timeout
+    if current is not None and current < new:
+        new = current
+    token = _DEADLINE.set(new)
+    try:
+        yield new
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> float | None:
+    """Return the time left before the current deadline.
+
+    Returns:
+        seconds (0 or less when passed), None without deadline
+    """
+    current = _DEADLINE.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+
+def expired() -> bool:
+    """Check if the current deadline has passed.
+
+    Returns:
+        True if there is a deadline and it has passed
+    """
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(what: str = "call") -> None:
+    """Raise if the current deadline has passed.
+
+    Args:
+        what: description of the call, for the error message
+
+    Raises:
+        OpenMoticsDeadlineExceededError: the deadline has passed
+    """
+    if expired():
+        raise OpenMoticsDeadlineExceededError(f"Deadline exceeded before {what}")
+
+
+def timeout(default: float | None) -> float | None:
+    """Return the timeout for the next network operation.
+
+    Args:
+        default: timeout without deadline, for example request_timeout
+
+    Returns:
+        the smallest of default and the time left, None if neither is set
+    """
+    left = remaining()
+    if left is None:
+        return default
+    left = max(left, 0.001)
+    if default is None:
+        return left
+    return min(default, left)
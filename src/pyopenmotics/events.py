@@ -0,0 +1,360 @@
+"""Fan out of state change events to subscribers.
+
+An EventBus delivers events to any number of subscribers, each with its own
+bounded queue, so a slow subscriber does not hold up the others or grow
+memory without limit. What happens when a queue is full is chosen per
+subscriber:
+
+    BLOCK        the publisher waits for room, up to block_timeout, and
+                 drops the event after that. This is backpressure on the
+                 publisher: the current event reaches the other
+                 subscribers first, but the next events reach nobody until
+                 the BLOCK subscriber made room
+    DROP_OLDEST  the oldest queued event is dropped
+    COALESCE     a queued event of the same entity is replaced by the new
+                 one, the oldest event is dropped if there is none
+
+    bus = EventBus()
+    store = StateStore(on_change=bus.on_state_change)
+    ui = bus.subscribe(installation_ids={21}, kinds={"outputs"},
+                       overflow=COALESCE)
+    for event in ui:
+        push(event.installation_id, event.entity_id, event.data["status"])
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Iterable, Iterator
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+
+@dataclass(frozen=True)
+class Event:
+    """A change of an entity.
+
+    Attributes:
+        installation_id: int
+        kind: entity kind, for example "outputs"
+        entity_id: int, None for events about the whole installation
+        data: the entity object, or the event payload
+        published: time.monotonic() the event was published
+    """
+
+    installation_id: int
+    kind: str
+    entity_id: int | None
+    data: dict[str, Any] = field(default_factory=dict)
+    published: float = field(default_factory=time.monotonic)
+
+
+class Subscription:
+    """Bounded queue of the events matching a subscriber's filters."""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        bus: EventBus,
+        installation_ids: frozenset[int] | None,
+        kinds: frozenset[str] | None,
+        maxsize: int,
+        overflow: str,
+        block_timeout: float | None,
+    ):
+        """Init the subscription, use EventBus.subscribe.
+
+        Args:
+            bus: EventBus
+            installation_ids: installations to receive events of, None for all
+            kinds: entity kinds to receive events of, None for all
+            maxsize: maximum number of queued events
+            overflow: BLOCK, DROP_OLDEST or COALESCE
+            block_timeout: seconds BLOCK waits for room, None for no limit
+
+        Raises:
+            ValueError: unknown overflow policy
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        self.bus = bus
+        self.installation_ids = installation_ids
+        self.kinds = kinds
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.max_lag = 0.0
+        self._queue: OrderedDict[Hashable, Event] = OrderedDict()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def matches(self, event: Event) -> bool:
+        """Return if the event passes the kind filter of the subscription.
+
+        Args:
+            event: Event
+
+        Returns:
+            bool
+        """
+        return self.kinds is None or event.kind in self.kinds
+
+    def put(self, event: Event) -> bool:
+        """Queue an event, applying the overflow policy when full.
+
+        Args:
+            event: Event
+
+        Returns:
+            False if the event was dropped
+        """
+        with self._cond:
+            if self.closed:
+                return False
+            key: Hashable = next(self._seq)
+            if self.overflow == COALESCE and event.entity_id is not None:
+                key = (event.installation_id, event.kind, event.entity_id)
+                if key in self._queue:
+                    # Keep the position of the queued event, so an entity
+                    # that changes all the time is not pushed back forever.
+                    self._queue[key] = event
+                    self.coalesced += 1
+                    return True
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == BLOCK:
+                    if (
+                        not self._cond.wait_for(
+                            lambda: len(self._queue) < self.maxsize or self.closed,
+                            self.block_timeout,
+                        )
+                        or self.closed
+                    ):
+                        self.dropped += 1
+                        return False
+                else:
+                    self._queue.popitem(last=False)
+                    self.dropped += 1
+            self._queue[key] = event
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float | None = None) -> Event | None:
+        """Return the next event.
+
+        Args:
+            timeout: seconds to wait for an event, None to wait forever
+
+        Returns:
+            Event, None on timeout or when the subscription was closed
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            if not self._queue:
+                return None
+            _, event = self._queue.popitem(last=False)
+            self.delivered += 1
+            self.max_lag = max(self.max_lag, time.monotonic() - event.published)
+            self._cond.notify_all()
+            return event
+
+    def __iter__(self) -> Iterator[Event]:
+        """Yield events until the subscription is closed.
+
+        Yields:
+            Event
+        """
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    @property
+    def depth(self) -> int:
+        """Return the number of queued events.
+
+        Returns:
+            int
+        """
+        with self._cond:
+            return len(self._queue)
+
+    @property
+    def lag(self) -> float:
+        """Return the age of the oldest queued event.
+
+        Returns:
+            seconds, 0 when nothing is queued
+        """
+        with self._cond:
+            if not self._queue:
+                return 0.0
+            oldest = min(event.published for event in self._queue.values())
+            return time.monotonic() - oldest
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the metrics of the subscription.
+
+        Returns:
+            dict with depth, lag, max_depth, max_lag, delivered, dropped
+            and coalesced
+        """
+        lag = self.lag
+        with self._cond:
+            return {
+                "overflow": self.overflow,
+                "depth": len(self._queue),
+                "lag": lag,
+                "max_depth": self.max_depth,
+                "max_lag": self.max_lag,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+    def close(self) -> None:
+        """Stop receiving events, waiting readers and publishers return."""
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class EventBus:
+    """Publish events to subscriptions, filtered by installation and kind."""
+
+    def __init__(self) -> None:
+        """Init the bus."""
+        self.published = 0
+        # Subscriptions by installation id, None for all installations.
+        self._routes: dict[int | None, tuple[Subscription, ...]] = {}
+        self._lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments
+    def subscribe(
+        self,
+        installation_ids: Iterable[int] | None = None,
+        kinds: Iterable[str] | None = None,
+        maxsize: int = 1000,
+        overflow: str = DROP_OLDEST,
+        block_timeout: float | None = 1.0,
+    ) -> Subscription:
+        """Subscribe to events.
+
+        Args:
+            installation_ids: installations to receive events of, None for all
+            kinds: entity kinds to receive events of, None for all
+            maxsize: maximum number of queued events
+            overflow: BLOCK, DROP_OLDEST or COALESCE
+            block_timeout: seconds BLOCK waits for room, None for no limit
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(
+            self,
+            frozenset(installation_ids) if installation_ids is not None else None,
+            frozenset(kinds) if kinds is not None else None,
+            maxsize,
+            overflow,
+            block_timeout,
+        )
+        with self._lock:
+            for installation_id in self._route_keys(subscription):
+                routes = self._routes.get(installation_id, ())
+                self._routes[installation_id] = routes + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription.
+
+        Args:
+            subscription: Subscription
+        """
+        with self._lock:
+            for installation_id in self._route_keys(subscription):
+                routes = tuple(
+                    item
+                    for item in self._routes.get(installation_id, ())
+                    if item is not subscription
+                )
+                if routes:
+                    self._routes[installation_id] = routes
+                else:
+                    self._routes.pop(installation_id, None)
+
+    @staticmethod
+    def _route_keys(subscription: Subscription) -> Iterable[int | None]:
+        """Return the route keys of a subscription, None for all installations.
+
+        Args:
+            subscription: Subscription
+
+        Returns:
+            the installation ids, an empty filter matches no installation
+        """
+        if subscription.installation_ids is None:
+            return [None]
+        return subscription.installation_ids
+
+    def publish(self, event: Event) -> int:
+        """Deliver an event to the matching subscriptions.
+
+        BLOCK subscriptions are delivered after the others, a full one
+        makes the publisher wait.
+
+        Args:
+            event: Event
+
+        Returns:
+            the number of subscriptions that queued the event
+        """
+        # Tuples are replaced, not changed, reading them needs no lock.
+        routes = self._routes
+        subscriptions = routes.get(event.installation_id, ()) + routes.get(None, ())
+        with self._lock:
+            self.published += 1
+        matching = [item for item in subscriptions if item.matches(event)]
+        # BLOCK subscriptions last, a full one only holds up the publisher.
+        return sum(
+            item.put(event) for item in matching if item.overflow != BLOCK
+        ) + sum(item.put(event) for item in matching if item.overflow == BLOCK)
+
+    def on_state_change(self, key: tuple[int, str, int], state: Any) -> None:
+        """Publish a change of a state.StateStore, use it as its on_change.
+
+        Args:
+            key: (installation_id, kind, entity_id)
+            state: state.EntityState
+        """
+        installation_id, kind, entity_id = key
+        self.publish(Event(installation_id, kind, entity_id, state.data))
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the metrics of all subscriptions.
+
+        Returns:
+            dict with the number of published events and a list of
+            subscription metrics
+        """
+        with self._lock:
+            subscriptions = {
+                id(item): item for routes in self._routes.values() for item in routes
+            }
+        return {
+            "published": self.published,
+            "subscriptions": [item.snapshot() for item in subscriptions.values()],
+        }
@@ -19,3 +19,11 @@ class OpenMoticsRateLimitError(OpenMoticsConnectionError):
 
 class OpenMoticsAuthenticationError(OpenMoticsConnectionError):
     """OpenMotics API Authentication exception."""
+
+
+class OpenMoticsCircuitOpenError(OpenMoticsError):
+    """OpenMotics installation circuit open exception."""
+
+
+class OpenMoticsDeadlineExceededError(OpenMoticsError):
+    """OpenMotics API call deadline exceeded exception."""
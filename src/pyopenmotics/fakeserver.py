@@ -0,0 +1,812 @@
+"""Local stand-in for the OpenMotics cloud API.
+
+A small, dependency free HTTP server that mimics the parts of the OpenMotics
+cloud API used by this library: the OAuth2 token endpoint, installations,
+outputs, lights, shutters, sensors (including historical data), groupactions
+and inputs.
+
+It is intended for tests, benchmarks and load tests. Latency, error rates,
+rate limiting (HTTP 429) and the size of the fleet are configurable so
+production load patterns can be reproduced offline.
+
+Run it from the command line with:
+
+    python -m pyopenmotics.fakeserver --installations 50 --outputs 200
+
+and point a client to it:
+
+    BackendClient("id", "secret", server="127.0.0.1", port=8080, ssl=False)
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import random
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from .const import OM_API_BASE_PATH
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "h": 3600,
+    "D": 86400,
+    "M": 2592000,
+}
+
+
+@dataclass
+class FakeServerConfig:
+    """Configuration of the fake OpenMotics API.
+
+    Attributes:
+        installations: number of installations in the fleet
+        outputs: number of outputs per installation
+        lights: number of lights per installation
+        shutters: number of shutters per installation
+        sensors: number of sensors per installation
+        groupactions: number of groupactions per installation
+        inputs: number of inputs per installation
+        latency: fixed delay (seconds) added to every response
+        jitter: random extra delay (seconds) between 0 and jitter
+        error_rate: fraction of API calls answered with HTTP 500
+        rate_limit_rate: fraction of API calls answered with HTTP 429
+        offline_installations: installation ids answered with HTTP 503
+        token_lifetime: lifetime (seconds) of issued access tokens
+        max_history_points: upper bound on points in a historical response
+        etags: send ETag headers with GET responses and answer matching
+            If-None-Match requests with 304 Not Modified
+        compress_min_size: gzip response bodies of at least this many bytes
+            when the client accepts it, 0 disables compression
+        seed: seed for the random generator, for reproducible runs
+    """
+
+    installations: int = 1
+    outputs: int = 10
+    lights: int = 4
+    shutters: int = 2
+    sensors: int = 4
+    groupactions: int = 3
+    inputs: int = 4
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    offline_installations: set[int] = field(default_factory=set)
+    token_lifetime: int = 3600
+    max_history_points: int = 100000
+    etags: bool = True
+    compress_min_size: int = 1024
+    seed: int | None = None
+
+
+class FakeOpenMotics:
+    """In-memory state of a fleet of OpenMotics installations."""
+
+    def __init__(self, config: FakeServerConfig):
+        """Init the fake fleet.
+
+        Args:
+            config: FakeServerConfig
+        """
+        self.config = config
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.tokens: dict[str, float] = {}
+        self.installations: dict[int, dict[str, Any]] = {}
+        self.entities: dict[int, dict[str, dict[int, dict[str, Any]]]] = {}
+        self.requests: dict[str, int] = {}
+
+        for installation_id in range(1, config.installations + 1):
+            self.installations[installation_id] = self._installation(installation_id)
+            self.entities[installation_id] = {
+                "outputs": self._many(installation_id, config.outputs, self._output),
+                "lights": self._many(installation_id, config.lights, self._light),
+                "shutters": self._many(installation_id, config.shutters, self._shutter),
+                "sensors": self._many(installation_id, config.sensors, self._sensor),
+                "groupactions": self._many(
+                    installation_id, config.groupactions, self._groupaction
+                ),
+                "inputs": self._many(installation_id, config.inputs, self._input),
+            }
+
+    @staticmethod
+    def _many(
+        installation_id: int,
+        count: int,
+        factory: Callable[[int, int], dict[str, Any]],
+    ) -> dict[int, dict[str, Any]]:
+        return {i: factory(installation_id, i) for i in range(count)}
+
+    @staticmethod
+    def _location(installation_id: int) -> dict[str, Any]:
+        return {
+            "floor_coordinates": {"x": None, "y": None},
+            "installation_id": installation_id,
+            "gateway_id": 1000 + installation_id,
+            "floor_id": None,
+            "room_id": None,
+        }
+
+    def _installation(self, installation_id: int) -> dict[str, Any]:
+        features = {
+            name: {"available": True, "used": used, "metadata": None}
+            for name, used in (
+                ("outputs", self.config.outputs > 0),
+                ("thermostats", False),
+                ("energy", True),
+                ("apps", False),
+                ("shutters", self.config.shutters > 0),
+                ("consumption", False),
+                ("scheduler", True),
+                ("ems", False),
+            )
+        }
+        return {
+            "id": installation_id,
+            "name": f"Installation {installation_id}",
+            "description": "",
+            "gateway_model": "openmotics",
+            "_acl": {
+                "configure": {"allowed": True},
+                "view": {"allowed": True},
+                "control": {"allowed": True},
+            },
+            "_version": 1.0,
+            "user_role": {"role": "ADMIN", "user_id": 1},
+            "registration_key": f"fake-{installation_id:05d}",
+            "platform": "CLASSIC",
+            "building_roles": [],
+            "version": "1.16.5",
+            "network": {
+                "local_ip_address": (
+                    f"10.0.{installation_id // 250}.{installation_id % 250 + 1}"
+                )
+            },
+            "flags": {
+                "UNREAD_NOTIFICATIONS": 0,
+                "ONLINE": installation_id not in self.config.offline_installations,
+            },
+            "features": features,
+            "gateway_features": [
+                "metrics",
+                "dirty_flag",
+                "scheduling",
+                "shutter_positions",
+                "100_steps_dimmer",
+                "input_states",
+            ],
+        }
+
+    def _output(self, installation_id: int, output_id: int) -> dict[str, Any]:
+        dimmable = output_id % 3 == 0
+        return {
+            "name": f"Output {output_id}",
+            "type": "LIGHT" if output_id % 2 == 0 else "OUTLET",
+            "capabilities": ["ON_OFF", "RANGE"] if dimmable else ["ON_OFF"],
+            "location": self._location(installation_id),
+            "metadata": None,
+            "status": {
+                "on": False,
+                "locked": False,
+                "manual_override": False,
+                **({"value": 0} if dimmable else {}),
+            },
+            "last_state_change": time.time(),
+            "id": output_id,
+            "_version": 1.0,
+        }
+
+    def _light(self, installation_id: int, light_id: int) -> dict[str, Any]:
+        return {
+            "name": f"Light {light_id}",
+            "capabilities": ["ON_OFF", "RANGE", "WHITE_TEMP", "FULL_COLOR"],
+            "location": self._location(installation_id),
+            "metadata": None,
+            "status": {
+                "on": False,
+                "value": 0,
+                "locked": False,
+                "manual_override": False,
+            },
+            "last_state_change": time.time(),
+            "id": light_id,
+            "_version": 1.0,
+        }
+
+    def _shutter(self, installation_id: int, shutter_id: int) -> dict[str, Any]:
+        return {
+            "name": f"Shutter {shutter_id}",
+            "capabilities": ["UP_DOWN", "POSITION", "RELATIVE_POSITION"],
+            "configuration": {"steps": 100, "timer_up": 30, "timer_down": 30},
+            "location": self._location(installation_id),
+            "metadata": None,
+            "status": {
+                "state": "STOPPED",
+                "position": 0,
+                "preset_position": None,
+                "locked": False,
+                "manual_override": False,
+            },
+            "last_state_change": time.time(),
+            "id": shutter_id,
+            "_version": 1.0,
+        }
+
+    def _sensor(self, installation_id: int, sensor_id: int) -> dict[str, Any]:
+        return {
+            "name": f"Sensor {sensor_id}",
+            "physical_quantity": "temperature",
+            "unit": "celcius",
+            "location": self._location(installation_id),
+            "status": {"value": 20.0 + sensor_id % 5},
+            "last_state_change": time.time(),
+            "id": sensor_id,
+            "_version": 1.0,
+        }
+
+    def _groupaction(self, installation_id: int, groupaction_id: int) -> dict[str, Any]:
+        return {
+            "name": f"Scene {groupaction_id}",
+            "actions": [161, groupaction_id, 160, groupaction_id + 1],
+            "usage": "SCENE" if groupaction_id % 2 == 0 else None,
+            "location": {"installation_id": installation_id},
+            "id": groupaction_id,
+            "_version": 1.0,
+        }
+
+    def _input(self, installation_id: int, input_id: int) -> dict[str, Any]:
+        return {
+            "name": f"Input {input_id}",
+            "location": self._location(installation_id),
+            "status": {"on": False},
+            "last_state_change": time.time(),
+            "id": input_id,
+            "_version": 1.0,
+        }
+
+    def issue_token(self) -> dict[str, Any]:
+        """Create a new bearer token.
+
+        Returns:
+            an OAuth2 token response
+        """
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.tokens[token] = time.time() + self.config.token_lifetime
+        return {
+            "access_token": token,
+            "token_type": "Bearer",
+            "expires_in": self.config.token_lifetime,
+            "scope": "control view",
+        }
+
+    def token_valid(self, authorization: str | None) -> bool:
+        """Check the Authorization header.
+
+        Args:
+            authorization: value of the Authorization header
+
+        Returns:
+            True if the header holds a known, unexpired bearer token
+        """
+        if not authorization or not authorization.startswith("Bearer "):
+            return False
+        with self.lock:
+            expires = self.tokens.get(authorization[7:])
+        return expires is not None and expires > time.time()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler dispatching on the routes of the fake API."""
+
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment, Nagle + delayed ACK would add
+    # ~40ms to every response otherwise.
+    disable_nagle_algorithm = True
+    wbufsize = 65536
+    server: FakeOpenMoticsServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self) -> None:  # noqa: N802
+        self.server.dispatch(self, "GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.server.dispatch(self, "POST")
+
+    def send_json(
+        self,
+        status: int,
+        body: Any,
+        headers: dict[str, str] | None = None,
+        etag: bool = False,
+    ) -> None:
+        payload = json.dumps(body).encode("utf8")
+        headers = dict(headers or {})
+        if etag:
+            headers["ETag"] = f'"{hashlib.sha1(payload).hexdigest()[:20]}"'
+            if headers["ETag"] in self.headers.get("If-None-Match", ""):
+                self.send_response(304)
+                self.send_header("ETag", headers["ETag"])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        min_size = self.server.config.compress_min_size
+        if (
+            min_size
+            and len(payload) >= min_size
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        ):
+            payload = gzip.compress(payload, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_empty(self, status: int = 204) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class FakeOpenMoticsServer(ThreadingHTTPServer):
+    """Threaded HTTP server serving the fake OpenMotics API.
+
+    Usage:
+        with FakeOpenMoticsServer(FakeServerConfig(installations=10)) as server:
+            client = BackendClient(
+                "id", "secret", server=server.host, port=server.port, ssl=False
+            )
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        config: FakeServerConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """Init the server, binding to host and port (0 picks a free port).
+
+        Args:
+            config: FakeServerConfig
+            host: str
+            port: int
+        """
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeServerConfig()
+        self.fleet = FakeOpenMotics(self.config)
+        self.base_path = OM_API_BASE_PATH
+        self._thread: threading.Thread | None = None
+        self.routes: list[tuple[str, re.Pattern[str], Callable[..., Any]]] = [
+            ("GET", re.compile(r"/"), self._root),
+            ("GET", re.compile(r"/base/discovery"), self._discovery),
+            ("GET", re.compile(r"/base/installations"), self._installations),
+            (
+                "GET",
+                re.compile(r"/base/installations/(?P<installation_id>\d+)"),
+                self._installation,
+            ),
+            (
+                "GET",
+                re.compile(
+                    r"/base/installations/(?P<installation_id>\d+)"
+                    r"/sensors/(?P<entity_id>\d+)/historical"
+                ),
+                self._historical,
+            ),
+            (
+                "POST",
+                re.compile(
+                    r"/base/installations/(?P<installation_id>\d+)/outputs/turn_off"
+                ),
+                self._all_outputs_off,
+            ),
+            (
+                "GET",
+                re.compile(
+                    r"/base/installations/(?P<installation_id>\d+)/(?P<kind>\w+)"
+                ),
+                self._entities,
+            ),
+            (
+                "GET",
+                re.compile(
+                    r"/base/installations/(?P<installation_id>\d+)"
+                    r"/(?P<kind>\w+)/(?P<entity_id>\d+)"
+                ),
+                self._entity,
+            ),
+            (
+                "POST",
+                re.compile(
+                    r"/base/installations/(?P<installation_id>\d+)"
+                    r"/(?P<kind>\w+)/(?P<entity_id>\d+)/(?P<action>\w+)"
+                ),
+                self._action,
+            ),
+        ]
+
+    @property
+    def host(self) -> str:
+        """Return the host the server is bound to.
+
+        Returns:
+            host
+        """
+        return str(self.server_address[0])
+
+    @property
+    def port(self) -> int:
+        """Return the port the server is bound to.
+
+        Returns:
+            port
+        """
+        return int(self.server_address[1])
+
+    @property
+    def url(self) -> str:
+        """Return the base url of the API, for example http://127.0.0.1:8080/api/v1.1.
+
+        Returns:
+            base url
+        """
+        return f"http://{self.host}:{self.port}{self.base_path}"
+
+    def start(self) -> FakeOpenMoticsServer:
+        """Serve requests from a background thread.
+
+        Returns:
+            the server itself
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="fake-openmotics",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> FakeOpenMoticsServer:
+        """Start serving, see start.
+
+        Returns:
+            the server itself
+        """
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop serving, see stop.
+
+        Args:
+            *exc_info: the exception leaving the with block, if any
+        """
+        self.stop()
+
+    def _delay(self) -> None:
+        delay = self.config.latency
+        if self.config.jitter:
+            with self.fleet.lock:
+                delay += self.fleet.random.uniform(0, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.fleet.lock:
+            return self.fleet.random.random() < rate
+
+    def dispatch(self, handler: _Handler, method: str) -> None:
+        """Route a request to the matching endpoint.
+
+        Args:
+            handler: the request handler
+            method: GET or POST
+        """
+        parts = urlsplit(handler.path)
+        path = parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+
+        if not path.startswith(self.base_path):
+            handler.send_json(404, {"_error": "Not found"})
+            return
+        prefix = len(self.base_path)
+        path = path[prefix:].rstrip("/") or "/"
+
+        with self.fleet.lock:
+            self.fleet.requests[path] = self.fleet.requests.get(path, 0) + 1
+
+        self._delay()
+
+        if path == "/authentication/oauth2/token" and method == "POST":
+            handler.send_json(200, self.fleet.issue_token())
+            return
+
+        if not self.fleet.token_valid(handler.headers.get("Authorization")):
+            handler.send_json(401, {"_error": "Invalid or expired token"})
+            return
+
+        if self._roll(self.config.rate_limit_rate):
+            handler.send_json(
+                429, {"_error": "Too many requests"}, headers={"Retry-After": "1"}
+            )
+            return
+
+        if self._roll(self.config.error_rate):
+            handler.send_json(500, {"_error": "Injected server error"})
+            return
+
+        for route_method, pattern, endpoint in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None or route_method != method:
+                continue
+            arguments = match.groupdict()
+            installation_id = arguments.get("installation_id")
+            if installation_id is not None:
+                installation_id = int(installation_id)
+                if installation_id not in self.fleet.installations:
+                    handler.send_json(404, {"_error": "Unknown installation"})
+                    return
+                if (
+                    installation_id in self.config.offline_installations
+                    and endpoint != self._installation
+                ):
+                    # The cloud still knows offline installations, only
+                    # calls needing the gateway fail.
+                    handler.send_json(503, {"_error": "Gateway is offline"})
+                    return
+                arguments["installation_id"] = installation_id
+            if "entity_id" in arguments:
+                arguments["entity_id"] = int(arguments["entity_id"])
+            payload = json.loads(body) if body else {}
+            status, data = endpoint(query=query, payload=payload, **arguments)
+            if status == 204:
+                handler.send_empty()
+            elif status >= 400:
+                handler.send_json(status, {"_error": data})
+            else:
+                handler.send_json(
+                    status,
+                    {"data": data, "_acl": None, "_error": None},
+                    etag=method == "GET" and self.config.etags,
+                )
+            return
+
+        handler.send_json(404, {"_error": f"No route for {method} {path}"})
+
+    def _root(self, **_: Any) -> tuple[int, Any]:
+        return 200, {"id": 1, "first_name": "John", "last_name": "Doe"}
+
+    def _discovery(self, **_: Any) -> tuple[int, Any]:
+        return 200, []
+
+    def _installations(self, **_: Any) -> tuple[int, Any]:
+        return 200, list(self.fleet.installations.values())
+
+    def _installation(self, installation_id: int, **_: Any) -> tuple[int, Any]:
+        return 200, self.fleet.installations[installation_id]
+
+    def _entities(
+        self, installation_id: int, kind: str, query: dict[str, str], **_: Any
+    ) -> tuple[int, Any]:
+        entities = self.fleet.entities[installation_id].get(kind)
+        if entities is None:
+            return 404, f"Unknown entity type {kind}"
+        result = list(entities.values())
+        filters = json.loads(query["filter"]) if "filter" in query else {}
+        if "usage" in query:
+            filters["usage"] = query["usage"]
+        for key, value in filters.items():
+            if isinstance(value, str):
+                result = [entity for entity in result if entity.get(key) == value]
+        return 200, result
+
+    def _entity(
+        self, installation_id: int, kind: str, entity_id: int, **_: Any
+    ) -> tuple[int, Any]:
+        entity = self.fleet.entities[installation_id].get(kind, {}).get(entity_id)
+        if entity is None:
+            return 404, f"Unknown {kind} {entity_id}"
+        return 200, entity
+
+    def _historical(
+        self,
+        installation_id: int,
+        entity_id: int,
+        query: dict[str, str],
+        **_: Any,
+    ) -> tuple[int, Any]:
+        sensor = self.fleet.entities[installation_id]["sensors"].get(entity_id)
+        if sensor is None:
+            return 404, f"Unknown sensor {entity_id}"
+        step = RESOLUTIONS.get(query.get("resolution", "5m"), 300)
+        try:
+            end = int(float(query["end"]))
+        except (KeyError, ValueError):
+            end = int(time.time())
+        try:
+            start = int(float(query["start"]))
+        except (KeyError, ValueError):
+            start = end - 86400
+        count = min(max((end - start) // step, 0), self.config.max_history_points)
+        tags = {
+            "sensor_id": str(entity_id),
+            "sensor_name": sensor["name"],
+            "gateway_id": 1000 + installation_id,
+        }
+        unix = query.get("time_format") == "unix"
+        points = []
+        for i in range(count):
+            timestamp = start + i * step
+            points.append(
+                {
+                    "time": timestamp
+                    if unix
+                    else time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)),
+                    "tags": tags,
+                    "values": {"temperature": round(20 + (i % 50) / 10, 1)},
+                }
+            )
+        return 200, points
+
+    def _all_outputs_off(self, installation_id: int, **_: Any) -> tuple[int, Any]:
+        with self.fleet.lock:
+            for output in self.fleet.entities[installation_id]["outputs"].values():
+                output["status"]["on"] = False
+                output["last_state_change"] = time.time()
+        return 204, None
+
+    # pylint: disable=too-many-arguments,too-many-branches
+    def _action(
+        self,
+        installation_id: int,
+        kind: str,
+        entity_id: int,
+        action: str,
+        payload: dict[str, Any],
+        **_: Any,
+    ) -> tuple[int, Any]:
+        entity = self.fleet.entities[installation_id].get(kind, {}).get(entity_id)
+        if entity is None:
+            return 404, f"Unknown {kind} {entity_id}"
+        if not isinstance(payload, dict):
+            return 400, "Request body must be a JSON object"
+        status = entity.get("status", {})
+        with self.fleet.lock:
+            if kind in ("outputs", "lights") and action == "turn_on":
+                status["on"] = True
+                if payload.get("value") is not None and "value" in status:
+                    status["value"] = payload["value"]
+            elif kind in ("outputs", "lights") and action == "turn_off":
+                status["on"] = False
+            elif kind == "outputs" and action == "toggle":
+                status["on"] = not status["on"]
+            elif action == "location":
+                entity["location"]["floor_id"] = payload.get("floor_id")
+                entity["location"]["floor_coordinates"] = payload.get(
+                    "floor_coordinates", {"x": None, "y": None}
+                )
+            elif kind == "shutters" and action in ("up", "down", "stop"):
+                status["state"] = {
+                    "up": "GOING_UP",
+                    "down": "GOING_DOWN",
+                    "stop": "STOPPED",
+                }[action]
+                if action != "stop":
+                    status["position"] = 0 if action == "up" else 99
+            elif kind == "shutters" and action == "change_position":
+                status["position"] = payload["position"]
+            elif kind == "shutters" and action == "change_relative_position":
+                status["position"] = min(
+                    max(status["position"] + payload["offset"], 0), 99
+                )
+            elif kind == "shutters" and action in ("lock", "unlock"):
+                status["locked"] = action == "lock"
+            elif kind == "shutters" and action == "preset":
+                status["preset_position"] = payload["position"]
+            elif kind == "shutters" and action == "move":
+                if status.get("preset_position") is not None:
+                    status["position"] = status["preset_position"]
+            elif kind == "groupactions" and action == "trigger":
+                outputs = self.fleet.entities[installation_id]["outputs"]
+                actions = entity["actions"]
+                for action_type, number in zip(actions[::2], actions[1::2]):
+                    # 161 turns an output on, 160 turns it off.
+                    if action_type in (160, 161) and number in outputs:
+                        outputs[number]["status"]["on"] = action_type == 161
+                return 204, None
+            else:
+                return 404, f"Unknown action {action} for {kind}"
+            entity["last_state_change"] = time.time()
+        return 200, entity
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the fake OpenMotics API from the command line.
+
+    Args:
+        argv: command line arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    defaults = FakeServerConfig()
+    for name in (
+        "installations",
+        "outputs",
+        "lights",
+        "shutters",
+        "sensors",
+        "groupactions",
+        "inputs",
+    ):
+        parser.add_argument(f"--{name}", type=int, default=getattr(defaults, name))
+    for name in ("latency", "jitter", "error-rate", "rate-limit-rate"):
+        parser.add_argument(
+            f"--{name}", type=float, default=getattr(defaults, name.replace("-", "_"))
+        )
+    parser.add_argument("--offline", type=int, nargs="*", default=[])
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = FakeServerConfig(
+        installations=args.installations,
+        outputs=args.outputs,
+        lights=args.lights,
+        shutters=args.shutters,
+        sensors=args.sensors,
+        groupactions=args.groupactions,
+        inputs=args.inputs,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        offline_installations=set(args.offline),
+        seed=args.seed,
+    )
+    server = FakeOpenMoticsServer(config, host=args.host, port=args.port)
+    print(f"Fake OpenMotics API listening on {server.url}")  # noqa: T001
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Precomputed features of installations.
+
+An Installation object lists its features as a dict of dicts and its gateway
+features as a list. FeatureSet turns them into integer bitsets once, so
+checking a feature is a single dict lookup and bitwise and:
+
+    features = FeatureSet.from_installation(installation)
+    features.used("outputs")            # available and used
+    features.gateway("shutter_positions")
+    features.needs("shutters")          # is the endpoint worth calling
+
+Every feature name gets a bit the first time it is seen, shared by all
+installations.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+# The feature an entity section depends on, None for sections every
+# installation has. Lights are outputs, they need the outputs feature.
+SECTION_FEATURES: dict[str, str | None] = {
+    "outputs": "outputs",
+    "lights": "outputs",
+    "shutters": "shutters",
+    "sensors": None,
+    "groupactions": None,
+    "inputs": None,
+}
+
+_BITS: dict[str, int] = {}
+_BITS_LOCK = threading.Lock()
+
+
+def feature_bit(name: str) -> int:
+    """Return the bit of a feature name.
+
+    Args:
+        name: feature or gateway feature name
+
+    Returns:
+        int with a single bit set
+    """
+    bit = _BITS.get(name)
+    if bit is None:
+        with _BITS_LOCK:
+            bit = _BITS.setdefault(name, 1 << len(_BITS))
+    return bit
+
+
+def _mask(names: Iterable[str]) -> int:
+    mask = 0
+    for name in names:
+        mask |= feature_bit(name)
+    return mask
+
+
+@dataclass(frozen=True)
+class FeatureSet:
+    """Features of an installation, as bitsets.
+
+    Attributes:
+        available_mask: features that are available
+        used_mask: features that are available and used
+        gateway_mask: gateway features
+    """
+
+    available_mask: int = 0
+    used_mask: int = 0
+    gateway_mask: int = 0
+
+    @classmethod
+    def from_installation(cls, installation: dict[str, Any]) -> FeatureSet:
+        """Build the features of an Installation object.
+
+        Args:
+            installation: as returned by Installations.by_id
+
+        Returns:
+            FeatureSet
+        """
+        features = installation.get("features") or {}
+        return cls(
+            available_mask=_mask(
+                name for name, feature in features.items() if feature.get("available")
+            ),
+            used_mask=_mask(
+                name
+                for name, feature in features.items()
+                if feature.get("available") and feature.get("used")
+            ),
+            gateway_mask=_mask(installation.get("gateway_features") or []),
+        )
+
+    def available(self, name: str) -> bool:
+        """Return if a feature is available.
+
+        Args:
+            name: for example "thermostats"
+
+        Returns:
+            bool
+        """
+        return bool(self.available_mask & _BITS.get(name, 0))
+
+    def used(self, name: str) -> bool:
+        """Return if a feature is available and used, see util.feature_used.
+
+        Args:
+            name: for example "outputs"
+
+        Returns:
+            bool
+        """
+        return bool(self.used_mask & _BITS.get(name, 0))
+
+    def gateway(self, name: str) -> bool:
+        """Return if the gateway has a feature.
+
+        Args:
+            name: for example "shutter_positions"
+
+        Returns:
+            bool
+        """
+        return bool(self.gateway_mask & _BITS.get(name, 0))
+
+    def needs(self, section: str) -> bool:
+        """Return if an entity section can have entities.
+
+        Args:
+            section: for example "shutters"
+
+        Returns:
+            False if reading the section is not needed
+        """
+        feature = SECTION_FEATURES.get(section)
+        return feature is None or self.used(feature)
@@ -0,0 +1,278 @@
+"""Hedged GET requests.
+
+A few slow responses dominate the tail latency of reads. With a
+HedgingPolicy, a GET that has not been answered within the observed
+latency percentile of its endpoint is sent a second time, and whichever
+attempt answers first is used:
+
+    client = BackendClient("id", "secret", hedging=HedgingPolicy(percentile=95))
+
+The extra load is capped by a budget: every request earns budget hedges
+(0.05 = at most one hedge per 20 requests, in the long run). Until an
+endpoint has min_samples observations its requests are not hedged.
+
+HTTP requests can not be interrupted: a hedge still queued when the first
+attempt answers is cancelled and its budget returned, but a losing attempt
+that was already sent is abandoned. It runs to completion, holding a
+connection and its share of the rate limits, and its result is dropped.
+Every hedge is paid for with budget, so at most one attempt per hedge is
+abandoned; the abandoned attempts are counted in snapshot().
+
+The first attempt runs on a thread of its own, so a hedged request never
+queues behind other requests. Only hedges run on the max_workers threads of
+the policy. Requests that could not be hedged anyway, and requests made
+while max_primaries first attempts are running, run unhedged on the
+calling thread.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from .instrumentation import LatencyHistogram
+
+
+class HedgingPolicy:
+    """Send a second GET when the first one is slower than usual."""
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_delay: float = 0.01,
+        max_delay: float = 2.0,
+        budget: float = 0.05,
+        max_burst: float = 10.0,
+        min_samples: int = 20,
+        max_workers: int = 16,
+        max_primaries: int = 64,
+    ):
+        """Init the policy.
+
+        Args:
+            percentile: latency percentile of an endpoint after which a
+                request is hedged
+            min_delay: lower bound (seconds) of the hedge delay
+            max_delay: upper bound (seconds) of the hedge delay
+            budget: hedges earned per request
+            max_burst: maximum number of saved up hedges
+            min_samples: observations needed before an endpoint is hedged
+            max_workers: threads running the hedges
+            max_primaries: first attempts running on threads of their own,
+                further requests are not hedged
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.max_burst = max_burst
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.max_primaries = max_primaries
+        self.latencies: dict[str, LatencyHistogram] = {}
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.abandoned = 0
+        self._primaries = 0
+        self._tokens = max_burst
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Return the executor running the attempts.
+
+        Returns:
+            ThreadPoolExecutor
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="openmotics-hedge",
+                    )
+        return self._executor
+
+    def close(self) -> None:
+        """Stop the executor threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def delay(self, endpoint: str) -> float | None:
+        """Return the time to wait before hedging a request.
+
+        Args:
+            endpoint: endpoint template
+
+        Returns:
+            seconds, None if the endpoint is not hedged (yet)
+        """
+        with self._lock:
+            histogram = self.latencies.get(endpoint)
+            if histogram is None or histogram.count < self.min_samples:
+                return None
+            millis = histogram.percentile(self.percentile)
+        return min(max(millis / 1000, self.min_delay), self.max_delay)
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        """Add the latency of a successful attempt.
+
+        Args:
+            endpoint: endpoint template
+            seconds: duration of the attempt
+        """
+        with self._lock:
+            histogram = self.latencies.get(endpoint)
+            if histogram is None:
+                histogram = self.latencies[endpoint] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the hedging counters.
+
+        Returns:
+            dict with requests, hedges, hedge wins, abandoned attempts and
+            the current delay per endpoint
+        """
+        with self._lock:
+            endpoints = list(self.latencies)
+            counters: dict[str, Any] = {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "abandoned": self.abandoned,
+            }
+        counters["delays"] = {endpoint: self.delay(endpoint) for endpoint in endpoints}
+        return counters
+
+    def call(self, endpoint: str, attempt: Callable[[], Any]) -> Any:
+        """Run attempt, hedged with a second attempt when it is slow.
+
+        Args:
+            endpoint: endpoint template, the latencies are kept per endpoint
+            attempt: the request, called once or twice
+
+        Returns:
+            the result of the first successful attempt
+
+        Raises:
+            Exception: the error of the first attempt, when every attempt failed
+        """
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self._tokens + self.budget, self.max_burst)
+
+        delay = self.delay(endpoint)
+        if delay is None or not self._has_token() or not self._take_primary():
+            start = time.perf_counter()
+            result = attempt()
+            self.observe(endpoint, time.perf_counter() - start)
+            return result
+
+        primary = self._start(endpoint, attempt)
+        futures = {primary}
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._take_token():
+            futures.add(self._submit(endpoint, attempt))
+
+        pending = futures
+        failed: Future | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._abandon(pending)
+                    if future is not primary:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                failed = failed or future
+        assert failed is not None
+        try:
+            return failed.result()
+        except Exception:
+            # Every attempt failed, raise the error of the first one.
+            raise
+
+    def _has_token(self) -> bool:
+        with self._lock:
+            return self._tokens >= 1
+
+    def _take_primary(self) -> bool:
+        with self._lock:
+            if self._primaries >= self.max_primaries:
+                return False
+            self._primaries += 1
+            return True
+
+    def _abandon(self, losers: set[Future]) -> None:
+        """Drop the attempts that lost, cancelling the hedges not sent yet.
+
+        Args:
+            losers: the attempts still pending
+        """
+        for loser in losers:
+            with self._lock:
+                if loser.cancel():
+                    self.hedges -= 1
+                    self._tokens = min(self._tokens + 1, self.max_burst)
+                else:
+                    self.abandoned += 1
+
+    def _take_token(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+
+    def _start(self, endpoint: str, attempt: Callable[[], Any]) -> Future:
+        """Run the first attempt on a thread of its own, see _take_primary.
+
+        Args:
+            endpoint: endpoint template
+            attempt: the request
+
+        Returns:
+            Future of the attempt
+        """
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        context = contextvars.copy_context()
+
+        def run() -> None:
+            try:
+                result = context.run(attempt)
+            except BaseException as exc:  # pylint: disable=broad-except
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._primaries -= 1
+
+        self._observe_when_done(endpoint, future)
+        threading.Thread(target=run, name="openmotics-request", daemon=True).start()
+        return future
+
+    def _submit(self, endpoint: str, attempt: Callable[[], Any]) -> Future:
+        # Run in a copy of the context, so tracing spans stay parented.
+        future = self.executor.submit(contextvars.copy_context().run, attempt)
+        self._observe_when_done(endpoint, future)
+        return future
+
+    def _observe_when_done(self, endpoint: str, future: Future) -> None:
+        start = time.perf_counter()
+
+        def observe(done: Future) -> None:
+            if not done.cancelled() and done.exception() is None:
+                self.observe(endpoint, time.perf_counter() - start)
+
+        future.add_done_callback(observe)
@@ -0,0 +1,442 @@
+"""Instrumentation hooks for the OpenMotics API client.
+
+Hooks are registered on an Api object and are called for every request:
+
+    collector = MetricsCollector()
+    client = BackendClient("id", "secret", hooks=[collector])
+    ...
+    print(collector.snapshot())
+
+When no hooks are registered the client skips building the events, so the
+instrumentation costs no more than a truth test per request.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds (in milliseconds) of the latency histogram buckets.
+LATENCY_BUCKETS_MS = (
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+    500.0,
+    1000.0,
+    2500.0,
+    5000.0,
+    10000.0,
+    float("inf"),
+)
+
+
+@dataclass
+class RequestEvent:
+    """A request is about to be sent.
+
+    Attributes:
+        method: HTTP method
+        url: full url of the request
+        endpoint: endpoint template, see util.endpoint_template
+        start: time.perf_counter() at the start of the request
+    """
+
+    method: str
+    url: str
+    endpoint: str
+    start: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class PhaseTimings:
+    """Breakdown (in seconds) of where the time of a request was spent.
+
+    Only measured for requests sampled by a hook, see RequestHooks.sample.
+
+    Attributes:
+        rate_limit: waiting before the request could be sent because of
+            rate limiting
+        auth: fetching or refreshing the access token
+        connect: acquiring a pooled connection, including opening a new
+            connection (TCP and TLS) when none is available
+        server: sending the request and waiting for the response headers
+        transfer: downloading the response body
+        decode: decoding the JSON body
+    """
+
+    rate_limit: float = 0.0
+    auth: float = 0.0
+    connect: float = 0.0
+    server: float = 0.0
+    transfer: float = 0.0
+    decode: float = 0.0
+    _marks: dict[str, float] = field(default_factory=dict, repr=False)
+
+    PHASES = ("rate_limit", "auth", "connect", "server", "transfer", "decode")
+
+    def trace(self, name: str, info: dict[str, Any]) -> None:
+        """Record a httpcore trace event, used as httpx "trace" extension.
+
+        Args:
+            name: event name, for example "http11.send_request_headers.started"
+            info: event details (unused)
+        """
+        if name.startswith(("http11.", "http2.")):
+            name = name.split(".", 1)[1]
+        self._marks.setdefault(name, time.perf_counter())
+
+    def sent(self) -> None:
+        """Mark the moment the request is handed to the HTTP client."""
+        self._marks["request.started"] = time.perf_counter()
+
+    def received(self) -> None:
+        """Derive connect, server and transfer from the trace events."""
+        marks = self._marks
+        started = marks.get("request.started")
+        headers_sent = marks.get("send_request_headers.started")
+        headers_received = marks.get("receive_response_headers.complete")
+        body_received = marks.get("receive_response_body.complete")
+        if started is not None and headers_sent is not None:
+            self.connect = headers_sent - started
+        if headers_sent is not None and headers_received is not None:
+            self.server = headers_received - headers_sent
+        if headers_received is not None and body_received is not None:
+            self.transfer = body_received - headers_received
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the phases as a plain dict.
+
+        Returns:
+            dict of phase name to seconds
+        """
+        return {phase: getattr(self, phase) for phase in self.PHASES}
+
+
+@dataclass
+class ResponseEvent:
+    """A request finished, successfully or not.
+
+    Attributes:
+        request: the RequestEvent of this request
+        status_code: HTTP status code, None if no response was received
+        duration: seconds from the start of the request until the response
+            was handled (including decoding)
+        request_bytes: size of the request body
+        response_bytes: number of bytes downloaded
+        error: the exception raised to the caller, if any
+        phases: time spent per phase, for sampled requests only
+    """
+
+    request: RequestEvent
+    status_code: int | None
+    duration: float
+    request_bytes: int = 0
+    response_bytes: int = 0
+    error: BaseException | None = None
+    phases: PhaseTimings | None = None
+
+
+@dataclass
+class RetryEvent:
+    """A failed request will be retried.
+
+    Attributes:
+        method: HTTP method
+        endpoint: endpoint template
+        tries: number of attempts done so far
+        wait: seconds to wait before the next attempt
+        elapsed: seconds spent since the first attempt
+        error: the exception that caused the retry
+    """
+
+    method: str
+    endpoint: str
+    tries: int
+    wait: float
+    elapsed: float
+    error: BaseException | None = None
+
+
+@dataclass
+class RateLimitEvent:
+    """The OpenMotics API answered with HTTP 429.
+
+    Attributes:
+        method: HTTP method
+        endpoint: endpoint template
+        retry_after: value of the Retry-After header, if any
+    """
+
+    method: str
+    endpoint: str
+    retry_after: str | None = None
+
+
+@dataclass
+class AuthRefreshEvent:
+    """An access token was fetched or refreshed.
+
+    Attributes:
+        reason: "fetch" for a new token, "refresh" for an expired one
+        duration: seconds spent getting the token
+        error: the exception raised while getting the token, if any
+    """
+
+    reason: str
+    duration: float
+    error: BaseException | None = None
+
+
+class RequestHooks:
+    """Base class for instrumentation hooks.
+
+    Override the methods for the events you are interested in. Hooks are
+    called synchronously from the thread doing the request, so they should
+    be fast. Exceptions raised by a hook are logged and otherwise ignored.
+    """
+
+    def sample(self, event: RequestEvent) -> bool:
+        """Decide whether the phase timings of a request are measured.
+
+        Measuring phases adds a trace callback to the HTTP request, so it is
+        only done when at least one hook asks for it.
+
+        Args:
+            event: RequestEvent
+
+        Returns:
+            True to attach PhaseTimings to the ResponseEvent
+        """
+        return False
+
+    def on_request_start(self, event: RequestEvent) -> None:
+        """Handle the start of a request.
+
+        Args:
+            event: RequestEvent
+        """
+
+    def on_response(self, event: ResponseEvent) -> None:
+        """Handle the end of a request.
+
+        Args:
+            event: ResponseEvent
+        """
+
+    def on_retry(self, event: RetryEvent) -> None:
+        """Handle a retry.
+
+        Args:
+            event: RetryEvent
+        """
+
+    def on_rate_limited(self, event: RateLimitEvent) -> None:
+        """Handle a HTTP 429 response.
+
+        Args:
+            event: RateLimitEvent
+        """
+
+    def on_auth_refresh(self, event: AuthRefreshEvent) -> None:
+        """Handle a token fetch or refresh.
+
+        Args:
+            event: AuthRefreshEvent
+        """
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_MS):
+        """Init the histogram.
+
+        Args:
+            buckets: upper bounds of the buckets in milliseconds
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add a measurement.
+
+        Args:
+            seconds: latency in seconds
+        """
+        millis = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, millis)] += 1
+        self.count += 1
+        self.total += millis
+        self.min = min(self.min, millis)
+        self.max = max(self.max, millis)
+
+    def percentile(self, pct: float) -> float:
+        """Estimate a percentile from the buckets.
+
+        Args:
+            pct: percentile between 0 and 100
+
+        Returns:
+            the upper bound (ms) of the bucket holding the percentile,
+            capped by the largest observed value
+        """
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a plain dict.
+
+        Returns:
+            count, mean, min, max, percentile estimates and bucket counts
+        """
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "min_ms": self.min if self.count else 0.0,
+            "max_ms": self.max,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(self.buckets, self.counts)
+                if count
+            },
+        }
+
+
+class EndpointMetrics:
+    """Metrics of a single endpoint template."""
+
+    def __init__(self) -> None:
+        """Init the metrics."""
+        self.latency = LatencyHistogram()
+        self.status_codes: Counter[str] = Counter()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a plain dict.
+
+        Returns:
+            dict
+        """
+        return {
+            "latency": self.latency.as_dict(),
+            "status_codes": dict(self.status_codes),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class MetricsCollector(RequestHooks):
+    """Collect per endpoint latency histograms and counters.
+
+    Metrics are keyed by "<method> <endpoint template>", for example
+    "POST /base/installations/{installation_id}/outputs/{id}/turn_on".
+    """
+
+    def __init__(self) -> None:
+        """Init the collector."""
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.auth = LatencyHistogram()
+        self.auth_errors = 0
+
+    def _metrics(self, method: str, endpoint: str) -> EndpointMetrics:
+        key = f"{method} {endpoint}"
+        metrics = self.endpoints.get(key)
+        if metrics is None:
+            metrics = self.endpoints[key] = EndpointMetrics()
+        return metrics
+
+    def on_response(self, event: ResponseEvent) -> None:
+        """Record latency, status code and byte counts.
+
+        Args:
+            event: ResponseEvent
+        """
+        with self._lock:
+            metrics = self._metrics(event.request.method, event.request.endpoint)
+            metrics.latency.observe(event.duration)
+            metrics.status_codes[str(event.status_code or "error")] += 1
+            metrics.request_bytes += event.request_bytes
+            metrics.response_bytes += event.response_bytes
+            if event.error is not None:
+                metrics.errors += 1
+
+    def on_retry(self, event: RetryEvent) -> None:
+        """Count a retry.
+
+        Args:
+            event: RetryEvent
+        """
+        with self._lock:
+            self._metrics(event.method, event.endpoint).retries += 1
+
+    def on_rate_limited(self, event: RateLimitEvent) -> None:
+        """Count a rate limited response.
+
+        Args:
+            event: RateLimitEvent
+        """
+        with self._lock:
+            self._metrics(event.method, event.endpoint).rate_limited += 1
+
+    def on_auth_refresh(self, event: AuthRefreshEvent) -> None:
+        """Record the time spent getting tokens.
+
+        Args:
+            event: AuthRefreshEvent
+        """
+        with self._lock:
+            self.auth.observe(event.duration)
+            if event.error is not None:
+                self.auth_errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a plain (JSON serializable) dict.
+
+        Returns:
+            dict with the metrics per endpoint and of authentication
+        """
+        with self._lock:
+            return {
+                "endpoints": {
+                    key: metrics.as_dict()
+                    for key, metrics in sorted(self.endpoints.items())
+                },
+                "auth": {**self.auth.as_dict(), "errors": self.auth_errors},
+            }
+
+    def reset(self) -> None:
+        """Forget all collected metrics."""
+        with self._lock:
+            self.endpoints.clear()
+            self.auth = LatencyHistogram()
+            self.auth_errors = 0
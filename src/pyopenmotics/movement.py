@@ -0,0 +1,529 @@
+"""Local estimate of shutter movements.
+
+Shutters take tens of seconds to move, polling by_id to show the progress
+costs a request per shutter per second. A MovementEstimator sends the
+commands that start a movement, and then interpolates the position and
+the time left locally:
+
+    movements = MovementEstimator(client, on_confirmed=update_ui)
+    movements.change_position(21, 1, 50)
+    movements.position(21, 1)  # 12, while moving
+    movements.eta(21, 1)  # seconds left, 0 when stopped
+
+When the movement should be finished it reads the shutter once to confirm.
+The travel time of a shutter starts at the timer_up and timer_down of its
+configuration and is learned from the observed movements: from the
+last_state_change of a confirmed arrival and from positions reported
+while moving. With a StateStore on the client, reads and events of shutters
+are observed too, so movements started by someone else are followed.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Tuple
+
+from .exceptions import OpenMoticsError
+
+if TYPE_CHECKING:
+    from .client import Api  # pylint: disable=R0401
+    from .state import EntityState
+
+logger = logging.getLogger(__name__)
+
+ShutterKey = Tuple[int, int]
+
+UP = "up"
+DOWN = "down"
+MOVING = {"GOING_UP": UP, "GOING_DOWN": DOWN}
+
+
+@dataclass
+class _Movement:
+    """A movement in progress."""
+
+    start: int
+    target: int | None
+    direction: str
+    duration: float
+    started: float
+    started_at: float
+    confirms: int = 0
+    timer: threading.Timer | None = None
+
+
+@dataclass
+class _Shutter:
+    """What is known about a shutter."""
+
+    steps: int
+    travel: dict[str, float]
+    position: int | None = None
+    preset: int | None = None
+    learned: set[str] = field(default_factory=set)
+    movement: _Movement | None = None
+
+
+class MovementEstimator:
+    """Estimate shutter positions while they move, confirm with one read."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        api_client: Api,
+        travel_time: float = 30.0,
+        smoothing: float = 0.3,
+        margin: float = 1.0,
+        max_confirms: int = 3,
+        on_confirmed: Callable[[ShutterKey, Any, BaseException | None], None]
+        | None = None,
+    ):
+        """Init the estimator.
+
+        Args:
+            api_client: Api
+            travel_time: seconds of a full travel when the configuration of a
+                shutter has no timer_up or timer_down
+            smoothing: weight of a new observation in the learned travel time
+            margin: seconds the confirming read waits after the estimated end
+            max_confirms: reads before giving up on a movement that does not end
+            on_confirmed: called with ((installation_id, shutter_id), shutter,
+                error) after a confirming read
+        """
+        self.api_client = api_client
+        self.travel_time = travel_time
+        self.smoothing = smoothing
+        self.margin = margin
+        self.max_confirms = max_confirms
+        self.on_confirmed = on_confirmed
+        self.confirms = 0
+        self._shutters: dict[ShutterKey, _Shutter] = {}
+        self._lock = threading.Lock()
+        if api_client.state is not None:
+            api_client.state.add_listener(self._on_change)
+
+    def up(  # noqa: C0103
+        self,
+        installation_id: int,
+        shutter_id: int,
+    ) -> dict[str, Any]:
+        """Move a shutter up, see Shutters.up.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+
+        Returns:
+            Returns a shutter with id
+        """
+        shutters = self.api_client.base.installations.shutters
+        return self._move(
+            (installation_id, shutter_id),
+            lambda shutter: 0,
+            lambda: shutters.up(installation_id, shutter_id),
+        )
+
+    def down(self, installation_id: int, shutter_id: int) -> dict[str, Any]:
+        """Move a shutter down, see Shutters.down.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+
+        Returns:
+            Returns a shutter with id
+        """
+        shutters = self.api_client.base.installations.shutters
+        return self._move(
+            (installation_id, shutter_id),
+            lambda shutter: shutter.steps - 1,
+            lambda: shutters.down(installation_id, shutter_id),
+        )
+
+    def change_position(
+        self, installation_id: int, shutter_id: int, position: int
+    ) -> dict[str, Any]:
+        """Move a shutter to a position, see Shutters.change_position.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+            position: int
+
+        Returns:
+            Returns a shutter with id
+        """
+        shutters = self.api_client.base.installations.shutters
+        return self._move(
+            (installation_id, shutter_id),
+            lambda shutter: position,
+            lambda: shutters.change_position(installation_id, shutter_id, position),
+        )
+
+    def move_to_preset(self, installation_id: int, shutter_id: int) -> dict[str, Any]:
+        """Move a shutter to its preset position, see Shutters.move_to_preset.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+
+        Returns:
+            Returns a shutter with id
+        """
+        shutters = self.api_client.base.installations.shutters
+        return self._move(
+            (installation_id, shutter_id),
+            lambda shutter: shutter.preset,
+            lambda: shutters.move_to_preset(installation_id, shutter_id),
+        )
+
+    def stop(self, installation_id: int, shutter_id: int) -> dict[str, Any]:
+        """Stop a shutter, see Shutters.stop.
+
+        The position is kept at the estimate until the next observation.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+
+        Returns:
+            Returns a shutter with id
+        """
+        key = (installation_id, shutter_id)
+        result = self.api_client.base.installations.shutters.stop(*key)
+        with self._lock:
+            shutter = self._shutters.get(key)
+            if shutter is not None and shutter.movement is not None:
+                shutter.position = self._estimate(shutter)
+                self._end(shutter)
+        return result
+
+    def position(self, installation_id: int, shutter_id: int) -> int | None:
+        """Return the estimated position of a shutter.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+
+        Returns:
+            int, None if the position was never observed
+        """
+        with self._lock:
+            shutter = self._shutters.get((installation_id, shutter_id))
+            if shutter is None:
+                return None
+            if shutter.movement is None:
+                return shutter.position
+            return self._estimate(shutter)
+
+    def eta(self, installation_id: int, shutter_id: int) -> float:
+        """Return the estimated seconds until a shutter stops.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+
+        Returns:
+            float, 0 when the shutter is not moving
+        """
+        with self._lock:
+            shutter = self._shutters.get((installation_id, shutter_id))
+            if shutter is None or shutter.movement is None:
+                return 0.0
+            movement = shutter.movement
+            return max(movement.duration - (time.monotonic() - movement.started), 0.0)
+
+    def travel(self, installation_id: int, shutter_id: int, direction: str) -> float:
+        """Return the estimated seconds of a full travel of a shutter.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+            direction: UP or DOWN
+
+        Returns:
+            float
+        """
+        with self._lock:
+            shutter = self._shutters.get((installation_id, shutter_id))
+            if shutter is None:
+                return self.travel_time
+            return shutter.travel[direction]
+
+    def moving(self) -> int:
+        """Return the number of shutters moving.
+
+        Returns:
+            int
+        """
+        with self._lock:
+            return sum(
+                shutter.movement is not None for shutter in self._shutters.values()
+            )
+
+    def observe(self, installation_id: int, shutter: dict[str, Any]) -> None:
+        """Update the estimate with a shutter object from a read or an event.
+
+        Args:
+            installation_id: int
+            shutter: shutter object, as returned by the API
+        """
+        key = (installation_id, shutter["id"])
+        status = shutter.get("status") or {}
+        position = status.get("position")
+        direction = MOVING.get(status.get("state", ""))
+        with self._lock:
+            known = self._shutter(key, shutter)
+            if "preset_position" in status:
+                known.preset = status["preset_position"]
+            movement = known.movement
+            if movement is None:
+                if direction is not None and known.position is not None:
+                    # Started by someone else, follow it to the end.
+                    target = 0 if direction == UP else known.steps - 1
+                    self._start(key, known, known.position, target)
+                elif position is not None:
+                    known.position = position
+                return
+            if direction is None:
+                if position is not None:
+                    if movement.target is None or position == movement.target:
+                        self._learn_arrival(known, shutter, position)
+                    known.position = position
+                self._end(known)
+            elif (
+                position is not None
+                and movement.target is not None
+                and min(movement.start, movement.target)
+                < position
+                < max(movement.start, movement.target)
+            ):
+                self._learn_progress(known, position)
+
+    def confirm(self, installation_id: int, shutter_id: int) -> None:
+        """Read a moving shutter now, instead of when it should have stopped.
+
+        Args:
+            installation_id: int
+            shutter_id: int
+        """
+        key = (installation_id, shutter_id)
+        with self._lock:
+            shutter = self._shutters.get(key)
+            movement = shutter.movement if shutter is not None else None
+            if movement is None:
+                return
+            if movement.timer is not None:
+                movement.timer.cancel()
+        self._confirm(key, movement)
+
+    def close(self) -> None:
+        """Cancel the pending confirming reads and stop observing the store."""
+        if self.api_client.state is not None:
+            self.api_client.state.remove_listener(self._on_change)
+        with self._lock:
+            for shutter in self._shutters.values():
+                if shutter.movement is not None:
+                    self._end(shutter)
+
+    def _move(
+        self,
+        key: ShutterKey,
+        target: Callable[[_Shutter], int | None],
+        send: Callable[[], dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Send a command and start the estimate of its movement.
+
+        Args:
+            key: (installation_id, shutter_id)
+            target: returns the target position of the shutter
+            send: sends the command
+
+        Returns:
+            the result of send
+        """
+        with self._lock:
+            shutter = self._shutters.get(key)
+            start = None
+            if shutter is not None:
+                start = (
+                    self._estimate(shutter)
+                    if shutter.movement is not None
+                    else shutter.position
+                )
+        result = send()
+        with self._lock:
+            shutter = self._shutter(key, result if isinstance(result, dict) else None)
+            end = target(shutter)
+            if start is None:
+                # Unknown position, assume a full travel.
+                start = 0 if end is None or end > 0 else shutter.steps - 1
+            self._start(key, shutter, start, end)
+        return result
+
+    def _shutter(self, key: ShutterKey, data: dict[str, Any] | None) -> _Shutter:
+        """Return what is known about a shutter, learning its configuration.
+
+        Args:
+            key: (installation_id, shutter_id)
+            data: shutter object, None if not available
+
+        Returns:
+            _Shutter
+        """
+        configuration = (data or {}).get("configuration") or {}
+        shutter = self._shutters.get(key)
+        if shutter is None:
+            shutter = self._shutters[key] = _Shutter(
+                steps=100, travel={UP: self.travel_time, DOWN: self.travel_time}
+            )
+        if configuration.get("steps"):
+            shutter.steps = configuration["steps"]
+        for direction in (UP, DOWN):
+            timer = configuration.get(f"timer_{direction}")
+            if timer and direction not in shutter.learned:
+                shutter.travel[direction] = float(timer)
+        return shutter
+
+    def _start(
+        self, key: ShutterKey, shutter: _Shutter, start: int, target: int | None
+    ) -> None:
+        if shutter.movement is not None:
+            self._end(shutter)
+        if target is None:
+            direction = UP if start > (shutter.steps - 1) / 2 else DOWN
+            distance = shutter.steps - 1
+        else:
+            direction = UP if target < start else DOWN
+            distance = abs(target - start)
+        movement = shutter.movement = _Movement(
+            start=start,
+            target=target,
+            direction=direction,
+            duration=shutter.travel[direction] * distance / max(shutter.steps - 1, 1),
+            started=time.monotonic(),
+            started_at=time.time(),
+        )
+        self._schedule(key, movement, movement.duration + self.margin)
+
+    def _schedule(self, key: ShutterKey, movement: _Movement, delay: float) -> None:
+        movement.timer = threading.Timer(delay, self._confirm, (key, movement))
+        movement.timer.daemon = True
+        movement.timer.start()
+
+    def _end(self, shutter: _Shutter) -> None:
+        if shutter.movement is not None and shutter.movement.timer is not None:
+            shutter.movement.timer.cancel()
+        shutter.movement = None
+
+    def _confirm(self, key: ShutterKey, movement: _Movement) -> None:
+        """Read a shutter that should have finished its movement.
+
+        Args:
+            key: (installation_id, shutter_id)
+            movement: the movement to confirm
+        """
+        with self._lock:
+            shutter = self._shutters[key]
+            if shutter.movement is not movement:
+                return
+            movement.confirms += 1
+            self.confirms += 1
+        try:
+            result = self.api_client.base.installations.shutters.by_id(*key)
+        except OpenMoticsError as err:
+            logger.warning("Confirming the movement of shutter %s failed: %s", key, err)
+            with self._lock:
+                if shutter.movement is movement:
+                    self._end(shutter)
+            if self.on_confirmed is not None:
+                self.on_confirmed(key, None, err)
+            return
+        self.observe(key[0], result)
+        with self._lock:
+            if shutter.movement is movement:
+                if movement.confirms >= self.max_confirms:
+                    self._end(shutter)
+                else:
+                    self._schedule(
+                        key,
+                        movement,
+                        max(
+                            movement.duration - (time.monotonic() - movement.started), 0
+                        )
+                        + self.margin,
+                    )
+                    return
+        if self.on_confirmed is not None:
+            self.on_confirmed(key, result, None)
+
+    def _estimate(self, shutter: _Shutter) -> int:
+        movement = shutter.movement
+        assert movement is not None
+        end = movement.target
+        if end is None:
+            end = 0 if movement.direction == UP else shutter.steps - 1
+        if movement.duration <= 0:
+            return end
+        done = min((time.monotonic() - movement.started) / movement.duration, 1.0)
+        return round(movement.start + (end - movement.start) * done)
+
+    def _learn(self, shutter: _Shutter, direction: str, travel: float) -> None:
+        """Blend an observed full travel time into the estimate.
+
+        Args:
+            shutter: _Shutter
+            direction: UP or DOWN
+            travel: seconds of a full travel, derived from an observation
+        """
+        current = shutter.travel[direction]
+        if not current / 4 <= travel <= current * 4:
+            # Not a movement of this shutter, for example a stale timestamp.
+            return
+        shutter.travel[direction] = current + self.smoothing * (travel - current)
+        shutter.learned.add(direction)
+
+    def _learn_arrival(
+        self, shutter: _Shutter, data: dict[str, Any], position: int
+    ) -> None:
+        movement = shutter.movement
+        assert movement is not None
+        changed = data.get("last_state_change")
+        distance = abs(position - movement.start)
+        if not isinstance(changed, (int, float)) or not distance:
+            return
+        elapsed = changed - movement.started_at
+        if elapsed > 0:
+            self._learn(
+                shutter,
+                movement.direction,
+                elapsed * (shutter.steps - 1) / distance,
+            )
+            movement.duration = elapsed
+
+    def _learn_progress(self, shutter: _Shutter, position: int) -> None:
+        movement = shutter.movement
+        assert movement is not None and movement.target is not None
+        elapsed = time.monotonic() - movement.started
+        if elapsed <= 0:
+            return
+        self._learn(
+            shutter,
+            movement.direction,
+            elapsed * (shutter.steps - 1) / abs(position - movement.start),
+        )
+        # Re-plan the rest of the movement from the observed position.
+        left = abs(movement.target - position) / max(shutter.steps - 1, 1)
+        movement.duration = elapsed + shutter.travel[movement.direction] * left
+
+    def _on_change(self, key: tuple[int, str, int], state: EntityState) -> None:
+        """Observe shutters changed in the state store.
+
+        Args:
+            key: (installation_id, kind, entity_id)
+            state: EntityState
+        """
+        if key[1] == "shutters" and not state.optimistic:
+            self.observe(key[0], state.data)
@@ -0,0 +1,101 @@
+"""Sampling profiler for the OpenMotics API client.
+
+The profiler is an instrumentation hook that measures, for a sample of the
+requests, where their time is spent: rate limiting, authentication,
+acquiring a connection, the server, downloading and decoding the body. The
+phases are aggregated per endpoint:
+
+    profiler = SamplingProfiler(sample_rate=0.1)
+    client = BackendClient("id", "secret", hooks=[profiler])
+    ...
+    for endpoint, phases in profiler.report().items():
+        print(endpoint, phases["server"]["mean_ms"], phases["decode"]["mean_ms"])
+"""
+from __future__ import annotations
+
+import random
+import threading
+from typing import Any
+
+from .instrumentation import (
+    LatencyHistogram,
+    PhaseTimings,
+    RequestEvent,
+    RequestHooks,
+    ResponseEvent,
+)
+
+
+class SamplingProfiler(RequestHooks):
+    """Aggregate the phase timings of sampled requests per endpoint."""
+
+    def __init__(self, sample_rate: float = 1.0, seed: int | None = None):
+        """Init the profiler.
+
+        Args:
+            sample_rate: fraction (0 - 1) of the requests to profile
+            seed: seed for the sampling decisions, for reproducible runs
+        """
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, dict[str, LatencyHistogram]] = {}
+
+    def sample(self, event: RequestEvent) -> bool:
+        """Sample sample_rate of the requests.
+
+        Args:
+            event: RequestEvent
+
+        Returns:
+            True if the request is profiled
+        """
+        if self.sample_rate >= 1:
+            return True
+        return self._random.random() < self.sample_rate
+
+    def on_response(self, event: ResponseEvent) -> None:
+        """Add the phases of a sampled request to its endpoint.
+
+        Args:
+            event: ResponseEvent
+        """
+        if event.phases is None:
+            return
+        key = f"{event.request.method} {event.request.endpoint}"
+        with self._lock:
+            histograms = self.endpoints.get(key)
+            if histograms is None:
+                histograms = self.endpoints[key] = {
+                    phase: LatencyHistogram()
+                    for phase in (*PhaseTimings.PHASES, "total")
+                }
+            for phase, seconds in event.phases.as_dict().items():
+                histograms[phase].observe(seconds)
+            histograms["total"].observe(event.duration + event.phases.rate_limit)
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """Return the aggregated phases per endpoint.
+
+        Every phase holds the statistics of LatencyHistogram.as_dict (without
+        the buckets) and its share of the total time.
+
+        Returns:
+            dict of endpoint to phase to statistics
+        """
+        report: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            for key, histograms in sorted(self.endpoints.items()):
+                total = histograms["total"].total
+                report[key] = {}
+                for phase, histogram in histograms.items():
+                    stats = histogram.as_dict()
+                    del stats["buckets"]
+                    stats["share"] = histogram.total / total if total else 0.0
+                    report[key][phase] = stats
+        return report
+
+    def reset(self) -> None:
+        """Forget all profiled requests."""
+        with self._lock:
+            self.endpoints.clear()
@@ -0,0 +1,253 @@
+"""Route requests to the local gateway of an installation.
+
+Installations report the LAN address of their gateway in
+network.local_ip_address. With a LocalRouter the client sends the reads and
+commands of an installation straight to that gateway while it is
+reachable, and falls back to the cloud when it is not:
+
+    client = BackendClient("id", "secret", router=LocalRouter(verify=False))
+    client.base.installations.all()  # learns the gateway addresses
+    client.base.installations.lights.turn_on(21, 3)  # sent over the LAN
+
+The health of every gateway is kept per installation. A gateway is probed
+with a TCP connect in a background thread when its health is unknown or
+older than probe_interval, requests never wait for a probe. Until a probe
+succeeds the requests of the installation go to the cloud. refresh probes
+the gateways up front, for example right after learning them.
+"""
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from yarl import URL
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GatewayHealth:
+    """Reachability of the local gateway of an installation.
+
+    Attributes:
+        host: LAN address of the gateway
+        port: port of the gateway API
+        healthy: result of the last probe or request, None if never checked
+        checked: time.monotonic() of the last probe or request
+        failures: consecutive failed probes and requests
+        probing: a background probe is running
+    """
+
+    host: str
+    port: int
+    healthy: bool | None = None
+    checked: float = 0.0
+    failures: int = 0
+    probing: bool = False
+
+
+class LocalRouter:
+    """Pick the local gateway or the cloud for each installation."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        scheme: str = "https",
+        port: int = 443,
+        base_path: str = "",
+        probe_interval: float = 60.0,
+        probe_timeout: float = 0.5,
+        request_timeout: float = 2.0,
+        verify: bool | str = True,
+    ):
+        """Init the router.
+
+        Args:
+            scheme: http or https
+            port: default port of the gateway API
+            base_path: path prefix of the gateway API, the local API is
+                served without the /api/v1.1 prefix of the cloud
+            probe_interval: seconds before a gateway is checked again
+            probe_timeout: seconds to wait for a TCP connect when probing
+            request_timeout: timeout (seconds) of requests to a gateway
+            verify: verify the TLS certificate of the gateways, or the path
+                of a CA bundle. Gateways usually have a self-signed
+                certificate.
+        """
+        self.scheme = scheme
+        self.port = port
+        self.base_path = base_path
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.request_timeout = request_timeout
+        self.verify = verify
+        self.gateways: dict[int, GatewayHealth] = {}
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+
+    @property
+    def client(self) -> httpx.Client:
+        """Return the HTTP client used for the gateways.
+
+        Returns:
+            httpx.Client
+        """
+        if self._client is None:
+            self._client = httpx.Client(
+                verify=self.verify, timeout=self.request_timeout
+            )
+        return self._client
+
+    def close(self) -> None:
+        """Close the connections to the gateways."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def add_gateway(
+        self, installation_id: int, host: str, port: int | None = None
+    ) -> None:
+        """Register the local gateway of an installation.
+
+        The health of a known gateway is kept unless its address changed.
+
+        Args:
+            installation_id: int
+            host: LAN address of the gateway
+            port: port of the gateway API, the router default if None
+        """
+        port = port or self.port
+        with self._lock:
+            gateway = self.gateways.get(installation_id)
+            if gateway is None or (gateway.host, gateway.port) != (host, port):
+                self.gateways[installation_id] = GatewayHealth(host, port)
+
+    def learn(self, installations: Any) -> None:
+        """Register the gateways of Installation objects.
+
+        Args:
+            installations: an Installation object or a list of them, as
+                returned by Installations.all and Installations.by_id
+        """
+        if isinstance(installations, dict):
+            installations = [installations]
+        for installation in installations or []:
+            if not isinstance(installation, dict):
+                continue
+            host = (installation.get("network") or {}).get("local_ip_address")
+            if host and installation.get("id") is not None:
+                self.add_gateway(installation["id"], host)
+
+    def base_url(self, installation_id: int | None) -> URL | None:
+        """Return the base url of the gateway to use for an installation.
+
+        Starts a background probe of the gateway if its health is unknown
+        or outdated, the last known health is used meanwhile.
+
+        Args:
+            installation_id: int, None for calls not about an installation
+
+        Returns:
+            the gateway base url, None to use the cloud
+        """
+        if installation_id is None:
+            return None
+        gateway = self.gateways.get(installation_id)
+        if gateway is None:
+            return None
+        healthy = gateway.healthy
+        if time.monotonic() - gateway.checked >= self.probe_interval:
+            self._probe_in_background(gateway)
+        if not healthy:
+            return None
+        return URL.build(
+            scheme=self.scheme,
+            host=gateway.host,
+            port=gateway.port,
+            path=self.base_path,
+        )
+
+    def refresh(self, wait: bool = True) -> None:
+        """Probe the gateways whose health is unknown or outdated.
+
+        Args:
+            wait: return when the probes are done
+        """
+        now = time.monotonic()
+        threads = [
+            self._probe_in_background(gateway)
+            for gateway in list(self.gateways.values())
+            if now - gateway.checked >= self.probe_interval
+        ]
+        if wait:
+            for thread in threads:
+                if thread is not None:
+                    thread.join()
+
+    def probe(self, gateway: GatewayHealth) -> bool:
+        """Check that the gateway accepts connections.
+
+        Args:
+            gateway: GatewayHealth
+
+        Returns:
+            True if a TCP connection could be opened
+        """
+        try:
+            with socket.create_connection(
+                (gateway.host, gateway.port), timeout=self.probe_timeout
+            ):
+                return True
+        except OSError as exc:
+            logger.debug("Gateway %s is unreachable: %s", gateway.host, exc)
+            return False
+
+    def _probe_in_background(self, gateway: GatewayHealth) -> threading.Thread | None:
+        """Start a probe of a gateway, unless one is running.
+
+        Args:
+            gateway: GatewayHealth
+
+        Returns:
+            the probing thread, None if a probe was running already
+        """
+        with self._lock:
+            if gateway.probing:
+                return None
+            gateway.probing = True
+
+        def run() -> None:
+            try:
+                self._record(gateway, self.probe(gateway))
+            finally:
+                gateway.probing = False
+
+        thread = threading.Thread(
+            target=run, name=f"openmotics-probe-{gateway.host}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def mark(self, installation_id: int, healthy: bool) -> None:
+        """Record the outcome of a request sent to a gateway.
+
+        Args:
+            installation_id: int
+            healthy: False if the gateway failed the request
+        """
+        gateway = self.gateways.get(installation_id)
+        if gateway is not None:
+            self._record(gateway, healthy)
+
+    def _record(self, gateway: GatewayHealth, healthy: bool) -> None:
+        with self._lock:
+            if not healthy and gateway.healthy is not False:
+                logger.info("Routing via the cloud, gateway %s failed", gateway.host)
+            gateway.healthy = healthy
+            gateway.checked = time.monotonic()
+            gateway.failures = 0 if healthy else gateway.failures + 1
@@ -0,0 +1,162 @@
+"""Decoding of GroupAction action lists.
+
+A GroupAction (scene) holds a flat list of (action type, action number)
+pairs, executed in order by the gateway. decode_actions turns the list into
+the entities the scene affects and, where it is deterministic, their state
+after the scene ran:
+
+    prediction = decode_actions([161, 3, 160, 4, 101, 1])
+    prediction.effects  # output 3 on, output 4 off, shutter 1 down
+
+Shutters are predicted in the state they end in, not the GOING_UP or
+GOING_DOWN they report while moving. The position of a shutter that went
+down depends on its configuration, see Effect.resolve.
+
+Only the action types of the classic OpenMotics action table that set a
+known state are decoded. Any other action makes the prediction incomplete,
+and the caller has to refresh the whole installation.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Sequence
+
+# Action type -> (entity kind, status the action ends in), the BA_SHUTTER_*
+# and BA_LIGHT_* basic actions of the gateway.
+ACTION_TYPES: dict[int, tuple[str, dict[str, Any] | None]] = {
+    100: ("shutters", {"state": "UP", "position": 0}),
+    101: ("shutters", {"state": "DOWN"}),
+    102: ("shutters", {"state": "STOPPED"}),
+    160: ("outputs", {"on": False}),
+    161: ("outputs", {"on": True}),
+    162: ("outputs", None),  # toggle
+}
+# Output X on at a dimmer value of 10% (176) up to 100% (185).
+ACTION_TYPES.update(
+    {
+        176 + step: ("outputs", {"on": True, "value": (step + 1) * 10})
+        for step in range(10)
+    }
+)
+ACTION_GROUPACTION = 2
+MAX_NESTING = 8
+
+
+@dataclass(frozen=True)
+class Effect:
+    """Expected effect of a scene on an entity.
+
+    Attributes:
+        kind: "outputs" or "shutters"
+        entity_id: id of the entity
+        status: the status fields after the scene ran, None if they can
+            not be predicted (for example a toggle of an unknown state)
+    """
+
+    kind: str
+    entity_id: int
+    status: dict[str, Any] | None
+
+    def resolve(self, entity: Mapping[str, Any] | None) -> dict[str, Any] | None:
+        """Return the status, completed with what depends on the entity.
+
+        A shutter that went down ends at the last step of its configuration.
+
+        Args:
+            entity: the entity object as last known, None if unknown
+
+        Returns:
+            the status fields after the scene ran, None if unpredictable
+        """
+        if (
+            self.kind != "shutters"
+            or self.status is None
+            or self.status.get("state") != "DOWN"
+        ):
+            return self.status
+        steps = ((entity or {}).get("configuration") or {}).get("steps")
+        if not steps:
+            return self.status
+        return {**self.status, "position": steps - 1}
+
+
+@dataclass
+class ScenePrediction:
+    """Decoded actions of a GroupAction.
+
+    Attributes:
+        effects: the final effect per entity, in order of first action
+        complete: False if the scene has actions that were not decoded
+        unknown: the undecoded (action type, action number) pairs
+    """
+
+    effects: list[Effect] = field(default_factory=list)
+    complete: bool = True
+    unknown: list[tuple[int, int]] = field(default_factory=list)
+
+    def affected(self) -> set[tuple[str, int]]:
+        """Return the entities the scene affects.
+
+        Returns:
+            set of (kind, entity id)
+        """
+        return {(effect.kind, effect.entity_id) for effect in self.effects}
+
+
+def decode_actions(
+    actions: Sequence[int],
+    groupactions: Mapping[int, Sequence[int]] | None = None,
+) -> ScenePrediction:
+    """Decode an action list into the effects of the scene.
+
+    Args:
+        actions: flat list of action type, action number pairs
+        groupactions: action lists of the other groupactions of the
+            installation, by id, to decode nested groupactions
+
+    Returns:
+        ScenePrediction
+    """
+    prediction = ScenePrediction()
+    effects: dict[tuple[str, int], dict[str, Any] | None] = {}
+    _decode(actions, groupactions or {}, prediction, effects, ())
+    prediction.effects = [
+        Effect(kind, entity_id, status) for (kind, entity_id), status in effects.items()
+    ]
+    return prediction
+
+
+def _decode(
+    actions: Sequence[int],
+    groupactions: Mapping[int, Sequence[int]],
+    prediction: ScenePrediction,
+    effects: dict[tuple[str, int], dict[str, Any] | None],
+    stack: tuple[int, ...],
+) -> None:
+    for index in range(0, len(actions) - 1, 2):
+        action_type, number = actions[index], actions[index + 1]
+        if action_type == ACTION_GROUPACTION:
+            nested = groupactions.get(number)
+            if nested is None or number in stack or len(stack) >= MAX_NESTING:
+                prediction.complete = False
+                prediction.unknown.append((action_type, number))
+            else:
+                _decode(nested, groupactions, prediction, effects, stack + (number,))
+            continue
+        decoded = ACTION_TYPES.get(action_type)
+        if decoded is None:
+            prediction.complete = False
+            prediction.unknown.append((action_type, number))
+            continue
+        kind, status = decoded
+        key = (kind, number)
+        if status is None:
+            # Toggle: predictable only if the scene set the state before.
+            previous = effects.get(key)
+            if previous is not None and "on" in previous:
+                status = {**previous, "on": not previous["on"]}
+        elif kind == "outputs" and effects.get(key) is not None:
+            # Keeps the dimmer value when an output is only turned on.
+            status = {**effects[key], **status}
+        effects.pop(key, None)
+        effects[key] = status
@@ -0,0 +1,203 @@
+"""Priority scheduling of requests under a shared rate limit.
+
+All requests of a client share the rate limit of the OpenMotics API. A
+PriorityScheduler hands out that budget (a token bucket of rate requests
+per second) by priority class first, and within a class fairly across
+installations (weighted fair queueing), so a burst of polls for one
+installation does not delay a light switch somewhere else:
+
+    client = BackendClient("id", "secret", scheduler=PriorityScheduler(rate=10))
+    with client.priority(Priority.BACKGROUND):
+        for installation in installations:
+            client.base.installations.outputs.all(installation["id"])
+
+Without an explicit priority, commands (POST) are INTERACTIVE, reads (GET)
+are UI_READ and historical data is BACKFILL. The time a request waits for
+the scheduler is reported as its rate_limit phase.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Iterator
+
+from . import deadlines
+from .exceptions import OpenMoticsDeadlineExceededError
+
+
+class Priority(IntEnum):
+    """Priority classes, lower values are served first."""
+
+    INTERACTIVE = 0
+    UI_READ = 1
+    BACKGROUND = 2
+    BACKFILL = 3
+
+
+_PRIORITY: ContextVar[Priority | None] = ContextVar("openmotics_priority", default=None)
+
+
+@contextmanager
+def priority(value: Priority) -> Iterator[Priority]:
+    """Run the calls in the block with a priority class.
+
+    Args:
+        value: Priority
+
+    Yields:
+        the priority
+    """
+    token = _PRIORITY.set(Priority(value))
+    try:
+        yield Priority(value)
+    finally:
+        _PRIORITY.reset(token)
+
+
+def request_priority(method: str, path: str) -> Priority:
+    """Return the priority of a request.
+
+    Args:
+        method: HTTP method
+        path: api path
+
+    Returns:
+        the priority set with priority(), or the default for the request
+    """
+    current = _PRIORITY.get()
+    if current is not None:
+        return current
+    if method != "GET":
+        return Priority.INTERACTIVE
+    if path.split("?", 1)[0].rstrip("/").endswith("/historical"):
+        return Priority.BACKFILL
+    return Priority.UI_READ
+
+
+class PriorityScheduler:
+    """Token bucket handing out requests by priority and installation."""
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: float = 10.0,
+        weights: dict[int, float] | None = None,
+    ):
+        """Init the scheduler.
+
+        Args:
+            rate: requests per second
+            burst: requests that can be sent at once after an idle period
+            weights: share of the budget per installation id, 1 by default
+        """
+        self.rate = rate
+        self.burst = burst
+        self.weights = dict(weights or {})
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._queue: list[list[Any]] = []
+        self._finish: dict[int | None, float] = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.waits: dict[str, list[float]] = {
+            cls.name: [0, 0.0] for cls in Priority  # count, seconds
+        }
+
+    def acquire(self, cls: Priority, installation_id: int | None = None) -> float:
+        """Wait until a request may be sent.
+
+        Args:
+            cls: priority class of the request
+            installation_id: installation of the request, None if none
+
+        Returns:
+            seconds waited
+
+        Raises:
+            OpenMoticsDeadlineExceededError: the deadline of the call passed
+                while waiting
+        """
+        start = time.monotonic()
+        with self._condition:
+            self._refill()
+            if not self._queue and self._tokens >= 1:
+                self._tokens -= 1
+                self._record(cls, 0.0)
+                return 0.0
+
+            weight = (
+                1.0
+                if installation_id is None
+                else self.weights.get(installation_id, 1.0)
+            )
+            finish = (
+                max(self._virtual_time, self._finish.get(installation_id, 0.0))
+                + 1 / weight
+            )
+            self._finish[installation_id] = finish
+            entry = [int(cls), finish, next(self._sequence)]
+            heapq.heappush(self._queue, entry)
+            queued = True
+            try:
+                while True:
+                    self._refill()
+                    head = self._queue[0] is entry
+                    if head and self._tokens >= 1:
+                        heapq.heappop(self._queue)
+                        queued = False
+                        self._tokens -= 1
+                        self._virtual_time = max(self._virtual_time, finish)
+                        waited = time.monotonic() - start
+                        self._record(cls, waited)
+                        return waited
+                    timeout = (1 - self._tokens) / self.rate if head else None
+                    remaining = deadlines.remaining()
+                    if remaining is not None:
+                        if remaining <= 0:
+                            raise OpenMoticsDeadlineExceededError(
+                                "Deadline exceeded waiting for the rate limit"
+                            )
+                        timeout = (
+                            remaining if timeout is None else min(timeout, remaining)
+                        )
+                    self._condition.wait(timeout)
+            finally:
+                if queued:
+                    # Interrupted, for example by the deadline.
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                self._condition.notify_all()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the queue length and the waits per priority class.
+
+        Returns:
+            dict with queued requests and count / mean wait per class
+        """
+        with self._condition:
+            return {
+                "queued": len(self._queue),
+                "classes": {
+                    name: {
+                        "count": count,
+                        "mean_wait_ms": total / count * 1000 if count else 0.0,
+                    }
+                    for name, (count, total) in self.waits.items()
+                },
+            }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record(self, cls: Priority, waited: float) -> None:
+        stats = self.waits[Priority(cls).name]
+        stats[0] += 1
+        stats[1] += waited
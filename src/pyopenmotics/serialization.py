@@ -0,0 +1,109 @@
+"""JSON serialization for the OpenMotics API client.
+
+All request bodies are encoded and all response bodies are decoded through
+a Serializer, so the JSON library can be swapped in one place. orjson is
+used when it is installed (pip install pyopenmotics[speedups]), the
+standard library json module otherwise.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class Serializer:
+    """Encode and decode JSON with the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj as UTF-8 JSON.
+
+        Args:
+            obj: object to encode
+
+        Returns:
+            the JSON document
+        """
+        return json.dumps(obj, separators=(",", ":")).encode("utf8")
+
+    def dumps_str(self, obj: Any) -> str:
+        """Encode obj as a JSON string, for example for a query parameter.
+
+        Args:
+            obj: object to encode
+
+        Returns:
+            the JSON document
+        """
+        return self.dumps(obj).decode("utf8")
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode a JSON document.
+
+        Args:
+            data: the JSON document
+
+        Returns:
+            the decoded object
+        """
+        return json.loads(data)
+
+    def decode_data(self, content: bytes) -> Any:
+        """Decode a response body and return its "data" member.
+
+        Args:
+            content: response body
+
+        Returns:
+            the "data" member of the response, or the whole response if it
+            is not an object
+        """
+        document = self.loads(content)
+        if isinstance(document, dict):
+            return document.get("data")
+        return document
+
+
+class OrjsonSerializer(Serializer):
+    """Encode and decode JSON with orjson."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode obj as UTF-8 JSON.
+
+        Args:
+            obj: object to encode
+
+        Returns:
+            the JSON document
+        """
+        return orjson.dumps(obj)
+
+    def loads(self, data: bytes | str) -> Any:
+        """Decode a JSON document.
+
+        Args:
+            data: the JSON document
+
+        Returns:
+            the decoded object
+        """
+        return orjson.loads(data)
+
+
+def default_serializer() -> Serializer:
+    """Return the fastest available serializer.
+
+    Returns:
+        an OrjsonSerializer if orjson is installed, a Serializer otherwise
+    """
+    if orjson is not None:
+        return OrjsonSerializer()
+    return Serializer()
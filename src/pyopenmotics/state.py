@@ -0,0 +1,431 @@
+"""Local state of the entities of installations, with optimistic updates.
+
+A StateStore keeps the last known state of every entity (output, light,
+shutter, ...) the client read. When a command is sent, its expected effect
+is applied to the local state right away and marked optimistic, so a UI can
+show the new state without polling by_id again. The optimistic state is
+replaced by the next authoritative state (a command response, a read or an
+event) and rolled back when the command fails:
+
+    store = StateStore(on_change=lambda key, state: refresh_ui(key))
+    client = BackendClient("id", "secret", state=store)
+    client.base.installations.outputs.all(21)
+    client.base.installations.outputs.turn_on(21, 3)
+    store.get(21, "outputs", 3).optimistic  # True until confirmed
+
+Reads that were started before a command finished can not tell whether
+they saw its effect, they do not replace optimistic state.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+EntityKey = Tuple[int, str, int]
+
+_PATH = re.compile(
+    r"/?base/installations/(?P<installation_id>\d+)/(?P<kind>\w+)"
+    r"(?:/(?P<entity_id>\d+))?(?:/(?P<action>\w+))?/?"
+)
+
+
+@dataclass
+class EntityState:
+    """Last known state of an entity.
+
+    Attributes:
+        data: the entity object, as returned by the API
+        optimistic: True if data holds the expected result of a command
+            that is not confirmed by an authoritative state yet
+        pending: commands in flight for the entity
+        confirmed_at: time.monotonic() the last command finished
+        version: incremented on every change
+    """
+
+    data: dict[str, Any]
+    optimistic: bool = False
+    pending: int = 0
+    confirmed_at: float = 0.0
+    version: int = 0
+
+
+@dataclass
+class _Applied:
+    """An optimistic update, to roll back when its command fails."""
+
+    key: EntityKey
+    version: int
+    previous: dict[str, Any] | None
+    optimistic: bool
+
+
+def list_path(path: str) -> tuple[int, str] | None:
+    """Return the installation and kind of a path listing entities.
+
+    Args:
+        path: api path, for example "/base/installations/21/outputs"
+
+    Returns:
+        (installation_id, kind), None for other paths
+    """
+    match = _PATH.fullmatch(path.split("?", 1)[0])
+    if match is None or match["entity_id"] is not None or match["action"]:
+        return None
+    return int(match["installation_id"]), match["kind"]
+
+
+def predict(
+    kind: str, action: str, payload: Any, status: dict[str, Any] | None
+) -> dict[str, Any] | None:
+    """Return the expected status change of a command.
+
+    Args:
+        kind: entity kind, for example "outputs"
+        action: command, for example "turn_on"
+        payload: request body of the command
+        status: current status of the entity, None if unknown
+
+    Returns:
+        the status fields the command changes, None if unknown
+    """
+    payload = payload if isinstance(payload, dict) else {}
+    if kind in ("outputs", "lights"):
+        if action == "turn_on":
+            change: dict[str, Any] = {"on": True}
+            if payload.get("value") is not None:
+                change["value"] = payload["value"]
+            return change
+        if action == "turn_off":
+            return {"on": False}
+        if action == "toggle" and status is not None and "on" in status:
+            return {"on": not status["on"]}
+    if kind == "shutters":
+        if action == "change_position" and "position" in payload:
+            return {"position": payload["position"]}
+        if action in ("up", "down", "stop"):
+            return {
+                "state": {"up": "GOING_UP", "down": "GOING_DOWN"}.get(action, "STOPPED")
+            }
+        if action in ("lock", "unlock"):
+            return {"locked": action == "lock"}
+    return None
+
+
+class StateStore:
+    """Thread safe store of entity states."""
+
+    def __init__(
+        self,
+        on_change: Callable[[EntityKey, EntityState], None] | None = None,
+    ):
+        """Init the store.
+
+        Args:
+            on_change: called with (key, state) after an entity changed,
+                key is (installation_id, kind, entity_id)
+        """
+        self.on_change = on_change
+        self._listeners: tuple[Callable[[EntityKey, EntityState], None], ...] = ()
+        self._entities: dict[EntityKey, EntityState] = {}
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[EntityKey, EntityState], None]) -> None:
+        """Call a listener after an entity changed, besides on_change.
+
+        Args:
+            listener: called with (key, state)
+        """
+        with self._lock:
+            self._listeners += (listener,)
+
+    def remove_listener(
+        self, listener: Callable[[EntityKey, EntityState], None]
+    ) -> None:
+        """Remove a listener added with add_listener.
+
+        Args:
+            listener: the listener
+        """
+        with self._lock:
+            self._listeners = tuple(
+                item for item in self._listeners if item != listener
+            )
+
+    def get(
+        self, installation_id: int, kind: str, entity_id: int
+    ) -> EntityState | None:
+        """Return the state of an entity.
+
+        Args:
+            installation_id: int
+            kind: entity kind, for example "outputs"
+            entity_id: int
+
+        Returns:
+            EntityState, None if the entity is unknown
+        """
+        with self._lock:
+            return self._entities.get((installation_id, kind, entity_id))
+
+    def entities(self, installation_id: int, kind: str) -> dict[int, EntityState]:
+        """Return the states of all known entities of a kind.
+
+        Args:
+            installation_id: int
+            kind: entity kind, for example "outputs"
+
+        Returns:
+            dict of entity id to EntityState
+        """
+        with self._lock:
+            return {
+                key[2]: state
+                for key, state in self._entities.items()
+                if key[0] == installation_id and key[1] == kind
+            }
+
+    def track(
+        self,
+        method: str,
+        path: str,
+        payload: Any,
+        send: Callable[[], Any],
+    ) -> Any:
+        """Send a request, keeping the store in sync with it.
+
+        Reads of entities update the store, commands are applied
+        optimistically before they are sent.
+
+        Args:
+            method: HTTP method
+            path: api path
+            payload: request body
+            send: sends the request and returns the decoded response
+
+        Returns:
+            the result of send
+
+        Raises:
+            Exception: the error of send, after the optimistic changes were
+                rolled back
+        """
+        match = _PATH.fullmatch(path.split("?", 1)[0])
+        if match is None:
+            return send()
+        installation_id = int(match["installation_id"])
+        kind = match["kind"]
+        entity_id = match["entity_id"]
+        entity_id = int(entity_id) if entity_id is not None else None
+        action = match["action"]
+
+        if method == "GET":
+            started = time.monotonic()
+            data = send()
+            if action is None:
+                self.update(installation_id, kind, data, started)
+            return data
+
+        if action is None:
+            return send()
+        applied = self._apply(installation_id, kind, entity_id, action, payload)
+        try:
+            result = send()
+        except Exception:
+            self._settle(applied, None, failed=True)
+            raise
+        self._settle(applied, result)
+        return result
+
+    def update(
+        self,
+        installation_id: int,
+        kind: str,
+        entities: Any,
+        started: float | None = None,
+    ) -> None:
+        """Store authoritative entity objects, from a read or an event.
+
+        Args:
+            installation_id: int
+            kind: entity kind, for example "outputs"
+            entities: an entity object or a list of them
+            started: time.monotonic() the read was started. Entities with a
+                command in flight or finished after it are not replaced.
+        """
+        if isinstance(entities, dict):
+            entities = [entities]
+        if not isinstance(entities, list):
+            return
+        changed = []
+        with self._lock:
+            for entity in entities:
+                if not isinstance(entity, dict) or entity.get("id") is None:
+                    continue
+                key = (installation_id, kind, entity["id"])
+                state = self._entities.get(key)
+                if state is not None and (
+                    state.pending
+                    or (started is not None and started < state.confirmed_at)
+                ):
+                    continue
+                if state is None:
+                    state = self._entities[key] = EntityState(_copy(entity))
+                elif not state.optimistic and state.data == entity:
+                    continue
+                else:
+                    state.data = _copy(entity)
+                    state.optimistic = False
+                state.version += 1
+                changed.append((key, state))
+        self._notify(changed)
+
+    def assume(
+        self,
+        installation_id: int,
+        kind: str,
+        entity_id: int,
+        change: dict[str, Any],
+    ) -> None:
+        """Apply the predicted status change of a command that succeeded.
+
+        Used for effects the command response does not report, for example
+        the outputs switched by a groupaction. The state is optimistic until
+        the next read or event.
+
+        Args:
+            installation_id: int
+            kind: entity kind, for example "outputs"
+            entity_id: int
+            change: the status fields the command changed
+        """
+        key = (installation_id, kind, entity_id)
+        with self._lock:
+            state = self._entities.get(key)
+            if state is None:
+                state = self._entities[key] = EntityState({"id": entity_id})
+            state.data = {
+                **state.data,
+                "status": {**(state.data.get("status") or {}), **change},
+            }
+            state.optimistic = True
+            state.confirmed_at = time.monotonic()
+            state.version += 1
+        self._notify([(key, state)])
+
+    def clear(self) -> None:
+        """Forget all entity states."""
+        with self._lock:
+            self._entities.clear()
+
+    def _apply(
+        self,
+        installation_id: int,
+        kind: str,
+        entity_id: int | None,
+        action: str,
+        payload: Any,
+    ) -> list[_Applied]:
+        applied = []
+        changed = []
+        with self._lock:
+            if entity_id is None:
+                # Commands on all entities, for example outputs/turn_off.
+                keys = [
+                    key
+                    for key in self._entities
+                    if key[0] == installation_id and key[1] == kind
+                ]
+            else:
+                keys = [(installation_id, kind, entity_id)]
+            for key in keys:
+                state = self._entities.get(key)
+                status = state.data.get("status") if state is not None else None
+                change = predict(kind, action, payload, status)
+                if change is None:
+                    if state is not None:
+                        state.pending += 1
+                        applied.append(_Applied(key, -1, None, state.optimistic))
+                    continue
+                if state is None:
+                    state = self._entities[key] = EntityState(
+                        {"id": key[2], "status": {}}
+                    )
+                previous = state.data
+                state.data = {
+                    **previous,
+                    "status": {**(previous.get("status") or {}), **change},
+                }
+                applied.append(
+                    _Applied(key, state.version + 1, previous, state.optimistic)
+                )
+                state.optimistic = True
+                state.pending += 1
+                state.version += 1
+                changed.append((key, state))
+        self._notify(changed)
+        return applied
+
+    def _settle(
+        self, applied: list[_Applied], result: Any, failed: bool = False
+    ) -> None:
+        changed = []
+        confirmed = result if isinstance(result, dict) and "status" in result else None
+        now = time.monotonic()
+        with self._lock:
+            for item in applied:
+                state = self._entities.get(item.key)
+                if state is None:
+                    continue
+                state.pending -= 1
+                state.confirmed_at = now
+                if failed:
+                    if item.previous is not None and state.version == item.version:
+                        state.data = item.previous
+                        state.optimistic = item.optimistic
+                        state.version += 1
+                        changed.append((item.key, state))
+                    continue
+                if (
+                    confirmed is not None
+                    and not state.pending
+                    and confirmed.get("id") == item.key[2]
+                ):
+                    state.data = _copy(confirmed)
+                    state.optimistic = False
+                    state.version += 1
+                    changed.append((item.key, state))
+        self._notify(changed)
+
+    def _notify(self, changed: list[tuple[Hashable, EntityState]]) -> None:
+        callbacks = self._listeners
+        if self.on_change is not None:
+            callbacks = (self.on_change,) + callbacks
+        if not callbacks:
+            return
+        for key, state in changed:
+            for callback in callbacks:
+                try:
+                    callback(key, state)  # type: ignore[arg-type]
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception("State change callback failed for %s", key)
+
+
+def _copy(entity: dict[str, Any]) -> dict[str, Any]:
+    """Copy an entity, so the store does not share its status with callers.
+
+    Args:
+        entity: entity object
+
+    Returns:
+        a copy with its own status dict
+    """
+    status = entity.get("status")
+    if isinstance(status, dict):
+        return {**entity, "status": dict(status)}
+    return dict(entity)
@@ -0,0 +1,165 @@
+"""Incremental decoding of large list responses.
+
+The OpenMotics API wraps every result in an object like
+{"data": [...], "_acl": ..., "_error": ...}. For large lists (thousands of
+outputs, long sensor histories) iter_json_array parses the "data" array
+from the response stream while it is downloaded and yields the elements
+one at a time, so the whole list never has to be held in memory.
+
+The structure in front of the array is scanned in Python, the elements are
+decoded one by one with json.JSONDecoder.raw_decode. orjson can not decode
+a prefix of a document, so the serializer is not used here.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_STRUCTURE = re.compile(rb'[\[\]{}",:]')
+_STRING_END = re.compile(rb'[\\"]')
+_SEPARATORS = re.compile(r"[\s,]*")
+_TERMINATORS = frozenset(",]} \t\r\n")
+
+
+class _ArrayScanner:
+    """State machine finding and decoding the elements under key."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, key: bytes):
+        self.key = key
+        self.buffer = bytearray()
+        self.pos = 0
+        self.depth = 0
+        self.string_start: int | None = None
+        self.last_string = b""
+        self.current_key = b""
+        # "array" or "object" once the value under key is found
+        self.mode: str | None = None
+        self.text = ""
+        self.text_decoder = codecs.getincrementaldecoder("utf8")()
+        self.decoder = json.JSONDecoder()
+        self.done = False
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Add a chunk of the body, return the elements it completed.
+
+        Args:
+            chunk: next part of the response body
+
+        Returns:
+            the decoded elements completed by this chunk
+        """
+        if self.mode is None:
+            self.buffer += chunk
+            self._find_value()
+            if self.mode is None:
+                return []
+            chunk = bytes(self.buffer[self.pos :])
+            self.buffer.clear()
+        self.text += self.text_decoder.decode(chunk)
+        return self._decode_elements()
+
+    def _find_value(self) -> None:
+        """Scan the document up to the start of the value under key."""
+        buffer = self.buffer
+        while self.mode is None:
+            if self.string_start is not None:
+                match = _STRING_END.search(buffer, self.pos)
+                if match is None:
+                    self.pos = len(buffer)
+                    return
+                if match.group() == b"\\":
+                    if match.end() >= len(buffer):
+                        self.pos = match.start()
+                        return
+                    self.pos = match.end() + 1
+                    continue
+                if self.depth == 1:
+                    self.last_string = bytes(buffer[self.string_start : match.start()])
+                self.string_start = None
+                self.pos = match.end()
+                continue
+
+            match = _STRUCTURE.search(buffer, self.pos)
+            if match is None:
+                self.pos = len(buffer)
+                return
+            char = match.group()
+            self.pos = match.end()
+            if char == b'"':
+                self.string_start = self.pos
+            elif char == b":":
+                if self.depth == 1:
+                    self.current_key = self.last_string
+            elif char in (b"[", b"{"):
+                self.depth += 1
+                if self.depth == 2 and self.current_key == self.key:
+                    if char == b"[":
+                        self.mode = "array"
+                    else:
+                        self.mode = "object"
+                        self.pos = match.start()
+            elif char in (b"]", b"}"):
+                self.depth -= 1
+
+    def _decode_elements(self) -> list[Any]:
+        """Decode the complete elements at the start of the text buffer.
+
+        Returns:
+            the decoded elements
+        """
+        text = self.text
+        pos = 0
+        elements = []
+        while not self.done:
+            pos = _SEPARATORS.match(text, pos).end()
+            if pos >= len(text):
+                break
+            if self.mode == "array" and text[pos] == "]":
+                self.done = True
+                break
+            try:
+                element, end = self.decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                break
+            if end >= len(text) or text[end] not in _TERMINATORS:
+                # A number at the end of the buffer might not be complete.
+                break
+            elements.append(element)
+            pos = end
+            if self.mode == "object":
+                self.done = True
+        self.text = text[pos:]
+        return elements
+
+    def close(self) -> None:
+        """Check that the value under key was complete.
+
+        Raises:
+            ValueError: the document ended in the middle of the value
+        """
+        if self.mode is not None and not self.done:
+            raise ValueError(f"Incomplete JSON document near: {self.text[:80]!r}")
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str = "data") -> Iterator[Any]:
+    """Yield the elements of the array under key of a streamed JSON object.
+
+    If the value under key is an object instead of an array, it is yielded
+    as a single element. Nothing is yielded when key is missing or null.
+
+    Args:
+        chunks: the response body, in chunks
+        key: top level key holding the array
+
+    Yields:
+        the decoded elements, in order
+    """
+    scanner = _ArrayScanner(key.encode("utf8"))
+    for chunk in chunks:
+        yield from scanner.feed(chunk)
+        if scanner.done:
+            return
+    scanner.close()
@@ -0,0 +1,274 @@
+"""Persisted snapshot of the configuration of installations.
+
+Installations, their outputs, lights, shutters, sensors, groupactions and
+inputs rarely change, but reading them for a whole fleet takes a request
+per installation and section. A TopologySnapshot keeps them in a JSON file,
+so a restarted service can serve from the file right away:
+
+    topology = TopologySnapshot(client, "/var/cache/openmotics.json")
+    for installation in topology.installations():
+        outputs = topology.entities(installation["id"], "outputs")
+
+The first read after loading the file starts a revalidation in a background
+thread. It lists the installations again and only reads the sections of
+installations whose _version changed, or that are new, and of those only the
+sections their features use, at the BACKGROUND priority of the scheduler.
+The file is written again when something changed.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Sequence
+
+from .exceptions import OpenMoticsError
+from .scheduler import Priority
+
+if TYPE_CHECKING:
+    from .client import Api  # pylint: disable=R0401
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 1
+SECTIONS = ("outputs", "lights", "shutters", "sensors", "groupactions", "inputs")
+
+
+class TopologySnapshot:
+    """Configuration of all installations, persisted between restarts."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        api_client: Api,
+        path: str | os.PathLike,
+        sections: Sequence[str] = SECTIONS,
+        revalidate_after: float = 300.0,
+    ):
+        """Init the snapshot and load the file, if any.
+
+        Args:
+            api_client: Api
+            path: the snapshot file
+            sections: the sections of an installation to keep
+            revalidate_after: seconds after which a read starts a new
+                background revalidation
+        """
+        self.api_client = api_client
+        self.path = os.fspath(path)
+        self.sections = tuple(sections)
+        self.revalidate_after = revalidate_after
+        self.revalidations = 0
+        self.refreshed = 0
+        self.failed = 0
+        self._installations: dict[int, dict[str, Any]] = {}
+        self._validated = 0.0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.load()
+
+    def load(self) -> bool:
+        """Load the snapshot file.
+
+        A missing, unreadable or outdated file leaves the snapshot empty.
+
+        Returns:
+            True if the file was loaded
+        """
+        try:
+            with open(self.path, "rb") as file:
+                data = self.api_client.serializer.loads(file.read())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable topology snapshot %s", self.path)
+            return False
+        if not isinstance(data, dict) or data.get("format") != FORMAT:
+            return False
+        installations = {
+            int(installation_id): item
+            for installation_id, item in data.get("installations", {}).items()
+            if set(self.sections) <= set(item.get("sections", {}))
+        }
+        with self._lock:
+            self._installations = installations
+            self._validated = 0.0
+        self._learn([item["installation"] for item in installations.values()])
+        return True
+
+    def save(self) -> None:
+        """Write the snapshot file, replacing it atomically."""
+        with self._lock:
+            data = {
+                "format": FORMAT,
+                "saved": time.time(),
+                "installations": {
+                    str(installation_id): item
+                    for installation_id, item in self._installations.items()
+                },
+            }
+        content = self.api_client.serializer.dumps(data)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        replaced = False
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(content)
+            os.replace(tmp_path, self.path)
+            replaced = True
+        finally:
+            if not replaced:
+                os.unlink(tmp_path)
+
+    def installations(self) -> list[dict[str, Any]]:
+        """Return all Installation objects.
+
+        Reads them from the API when the snapshot is empty.
+
+        Returns:
+            list of Installation objects, as returned by Installations.by_id
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return [item["installation"] for item in self._installations.values()]
+
+    def entities(self, installation_id: int, section: str) -> list[dict[str, Any]]:
+        """Return the entities of a section of an installation.
+
+        Args:
+            installation_id: int
+            section: for example "outputs"
+
+        Returns:
+            list of entity objects, empty for an unknown installation
+        """
+        self._ensure_loaded()
+        with self._lock:
+            item = self._installations.get(installation_id)
+            return list(item["sections"][section]) if item is not None else []
+
+    def revalidate(self, wait: bool = False) -> threading.Thread:
+        """Start a revalidation in a background thread.
+
+        Args:
+            wait: wait until it finished
+
+        Returns:
+            the revalidation thread
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._validated = time.monotonic()
+                self._thread = threading.Thread(
+                    target=self._revalidate,
+                    name="openmotics-topology",
+                    daemon=True,
+                )
+                self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join()
+        return thread
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            cold = not self._installations and not self._validated
+            stale = (
+                not self._validated
+                or time.monotonic() - self._validated >= self.revalidate_after
+            )
+        if cold:
+            self.revalidate(wait=True)
+        elif stale:
+            self.revalidate()
+
+    def _revalidate(self) -> None:
+        try:
+            # Bulk reads, served after the interactive requests.
+            with self.api_client.priority(Priority.BACKGROUND):
+                changed = self._refresh()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Revalidating the topology snapshot failed")
+            return
+        if changed:
+            try:
+                self.save()
+            except OSError:
+                logger.exception("Writing topology snapshot %s failed", self.path)
+
+    def _refresh(self) -> bool:
+        """Read the installations whose configuration changed.
+
+        An installation that can not be read keeps its previous entry.
+        Without one it is left out, and read again on the next revalidation.
+
+        Returns:
+            True if the snapshot changed
+        """
+        installations = self.api_client.base.installations
+        listed = {item["id"]: item for item in installations.all()}
+        with self._lock:
+            self.revalidations += 1
+            known = {
+                installation_id: item["installation"].get("_version")
+                for installation_id, item in self._installations.items()
+            }
+        removed = set(known) - set(listed)
+        changed = False
+        for installation_id, summary in listed.items():
+            if installation_id in known and known[installation_id] == summary.get(
+                "_version"
+            ):
+                continue
+            try:
+                item = self._read(installation_id)
+            except OpenMoticsError as err:
+                logger.warning(
+                    "Reading installation %s failed: %s", installation_id, err
+                )
+                with self._lock:
+                    self.failed += 1
+                continue
+            with self._lock:
+                self._installations[installation_id] = item
+                self.refreshed += 1
+            changed = True
+        with self._lock:
+            for installation_id in removed:
+                self._installations.pop(installation_id, None)
+        return changed or bool(removed)
+
+    def _read(self, installation_id: int) -> dict[str, Any]:
+        """Read an installation and the entities of its sections.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            the snapshot entry of the installation
+        """
+        installations = self.api_client.base.installations
+        installation = installations.by_id(installation_id)
+        features = installations.features(installation_id)
+        return {
+            "installation": installation,
+            "sections": {
+                section: getattr(installations, section).all(installation_id)
+                if features.needs(section)
+                else []
+                for section in self.sections
+            },
+        }
+
+    def _learn(self, installations: list[dict[str, Any]]) -> None:
+        """Register the installations of the file with router and breaker.
+
+        Args:
+            installations: Installation objects
+        """
+        if self.api_client.router is not None:
+            self.api_client.router.learn(installations)
+        if self.api_client.breaker is not None:
+            self.api_client.breaker.learn(installations)
@@ -0,0 +1,80 @@
+"""Optional tracing of OpenMotics API calls.
+
+Any OpenTelemetry compatible tracer can be passed to the client, every API
+call then gets a span and higher level operations such as
+Installations.status_by_id get a parent span for their sub-requests:
+
+    from opentelemetry import trace
+
+    client = BackendClient(
+        "id", "secret", tracer=trace.get_tracer("pyopenmotics")
+    )
+
+Without a tracer no spans are created and nothing is imported.
+"""
+from __future__ import annotations
+
+import functools
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, TypeVar
+
+T = TypeVar("T", bound=Callable[..., Any])
+
+ATTR_METHOD = "http.method"
+ATTR_URL = "http.url"
+ATTR_STATUS_CODE = "http.status_code"
+ATTR_ENDPOINT = "openmotics.endpoint"
+ATTR_INSTALLATION_ID = "openmotics.installation_id"
+ATTR_RETRIES = "openmotics.retries"
+ATTR_CACHE_HIT = "openmotics.cache_hit"
+ATTR_ROUTE = "openmotics.route"
+
+
+def span(tracer: Any, name: str, **attributes: Any) -> ContextManager[Any]:
+    """Start a span as the current span, if there is a tracer.
+
+    Args:
+        tracer: an OpenTelemetry compatible tracer, or None
+        name: name of the span
+        **attributes: span attributes, None values are left out
+
+    Returns:
+        a context manager yielding the span, or None without tracer
+    """
+    if tracer is None:
+        return nullcontext()
+    return tracer.start_as_current_span(
+        name,
+        attributes={
+            key: value for key, value in attributes.items() if value is not None
+        },
+    )
+
+
+def traced(name: str) -> Callable[[T], T]:
+    """Decorate a method of an api section to run it in its own span.
+
+    The decorated method must belong to an object with an api_client
+    attribute and take the installation id as first argument. The
+    requests done by the method become child spans of this span.
+
+    Args:
+        name: name of the span
+
+    Returns:
+        the decorator
+    """
+
+    def decorator(func: T) -> T:
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            tracer = self.api_client.tracer
+            if tracer is None:
+                return func(self, *args, **kwargs)
+            installation_id = kwargs.get("installation_id", args[0] if args else None)
+            with span(tracer, name, **{ATTR_INSTALLATION_ID: installation_id}):
+                return func(self, *args, **kwargs)
+
+        return wrapper  # type: ignore
+
+    return decorator
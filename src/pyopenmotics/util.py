@@ -1,6 +1,9 @@
 """Collection of small utility functions for OpenMotics API."""
 from __future__ import annotations
 
+from functools import lru_cache
+from typing import Any, Iterable
+
 
 def feature_used(
     features: dict,
@@ -32,3 +35,111 @@ def feature_used(
         if key in ["used"]:
             feat_used = value
     return feat_available and feat_used
+
+
+@lru_cache(maxsize=1024)
+def endpoint_template(path: str) -> str:
+    """Replace the ids in an api path by placeholders.
+
+    Used to group metrics of calls to the same endpoint.
+
+    Args:
+        path: api path, for example /base/installations/21/outputs/70/turn_on
+
+    Returns:
+        the endpoint template, for example
+        /base/installations/{installation_id}/outputs/{id}/turn_on
+    """
+    path = path.split("?", 1)[0]
+    segments = path.strip("/").split("/")
+    for index, segment in enumerate(segments):
+        if segment.isdigit():
+            if index > 0 and segments[index - 1] == "installations":
+                segments[index] = "{installation_id}"
+            else:
+                segments[index] = "{id}"
+    return "/" + "/".join(segments)
+
+
+@lru_cache(maxsize=1024)
+def installation_id_from_path(path: str) -> int | None:
+    """Return the installation id of an api path.
+
+    Args:
+        path: api path, for example /base/installations/21/outputs
+
+    Returns:
+        the installation id, None if the path is not about an installation
+    """
+    segments = path.split("?", 1)[0].strip("/").split("/")
+    if len(segments) > 2 and segments[1] == "installations":
+        if segments[2].isdigit():
+            return int(segments[2])
+    return None
+
+
+@lru_cache(maxsize=1024)
+def gateway_installation_id(path: str) -> int | None:
+    """Return the installation id of an api path served by its gateway.
+
+    Calls below an installation (outputs, sensors, ...) need its gateway,
+    the installation object itself is served by the cloud.
+
+    Args:
+        path: api path, for example /base/installations/21/outputs
+
+    Returns:
+        the installation id, None for other paths
+    """
+    segments = path.split("?", 1)[0].strip("/").split("/")
+    if len(segments) > 3:
+        return installation_id_from_path(path)
+    return None
+
+
+def compile_fields(fields: Iterable[str]) -> dict[str, Any]:
+    """Compile dotted field names into a projection tree.
+
+    Args:
+        fields: field names, nested fields separated by dots, for example
+            ["id", "status.on"]
+
+    Returns:
+        the projection tree, for example {"id": None, "status": {"on": None}}
+    """
+    tree: dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        *parents, leaf = field.split(".")
+        for parent in parents:
+            child = node.get(parent)
+            if child is None:
+                if parent in node:  # the whole parent is included already
+                    break
+                child = node[parent] = {}
+            node = child
+        else:
+            node[leaf] = None
+    return tree
+
+
+def project(entity: Any, tree: dict[str, Any]) -> Any:
+    """Keep only the fields of a projection tree.
+
+    Args:
+        entity: entity object, or a list of them
+        tree: projection tree, see compile_fields
+
+    Returns:
+        a projected copy, fields missing in entity are left out
+    """
+    if isinstance(entity, list):
+        return [project(item, tree) for item in entity]
+    if not isinstance(entity, dict):
+        return entity
+    projected = {}
+    for key, subtree in tree.items():
+        if key in entity:
+            value = entity[key]
+            projected[key] = value if subtree is None else project(value, subtree)
+    return projected
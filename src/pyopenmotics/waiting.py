@@ -0,0 +1,238 @@
+"""Waiting for an entity to reach a state.
+
+StateWaiter.wait_for blocks until an entity satisfies a predicate:
+
+    waiter.wait_for(21, ("shutters", 1), lambda s: s["status"]["position"] == 50)
+
+It resolves from the state store of the client as soon as a read, command
+response or push event changes the entity there. Unless a push source (the
+WebSocket of the client or a WebSocketPool) is connected and watches the
+installation of the entity, it reads the entity with by_id, at adaptive
+intervals: starting at min_interval, growing while the entity does not
+change and back to min_interval when it does. With one, it only reads every
+max_interval as a safety net.
+
+All waiters on the same entity share one watch, they are served by a single
+read per interval.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Tuple
+
+from . import deadlines
+from .exceptions import OpenMoticsDeadlineExceededError
+
+if TYPE_CHECKING:
+    from .client import Api  # pylint: disable=R0401
+    from .state import EntityState
+
+WatchKey = Tuple[int, str, int]
+
+
+@dataclass
+class _Watch:
+    """Latest state of an entity and its waiters."""
+
+    cond: threading.Condition = field(default_factory=threading.Condition)
+    data: dict[str, Any] | None = None
+    version: int = 0
+    waiters: int = 0
+    polling: bool = False
+    interval: float = 0.0
+    next_poll: float = 0.0
+
+
+class StateWaiter:
+    """Wait for entities to reach a state, sharing a watch per entity."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        api_client: Api,
+        min_interval: float = 0.5,
+        max_interval: float = 10.0,
+        backoff: float = 1.5,
+        push: bool | None = None,
+    ):
+        """Init the waiter.
+
+        Args:
+            api_client: Api
+            min_interval: seconds between reads after a change
+            max_interval: maximum seconds between reads
+            backoff: factor the interval grows with while nothing changes
+            push: True if an event stream updates the state store, None to
+                ask the client per installation, see Api.pushes
+        """
+        self.api_client = api_client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.push = push
+        self.polls = 0
+        self._watches: dict[WatchKey, _Watch] = {}
+        self._lock = threading.Lock()
+        if api_client.state is not None:
+            api_client.state.add_listener(self._on_change)
+
+    def pushed(self, installation_id: int) -> bool:
+        """Return if a push source updates the state of an installation.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            bool
+        """
+        if self.push is not None:
+            return self.push
+        return self.api_client.pushes(installation_id)
+
+    def wait_for(
+        self,
+        installation_id: int,
+        entity: tuple[str, int],
+        predicate: Callable[[dict[str, Any]], bool],
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Wait until an entity satisfies a predicate.
+
+        Args:
+            installation_id: int
+            entity: (kind, entity id), for example ("shutters", 1)
+            predicate: called with the entity object
+            timeout: seconds to wait, within the deadline of the caller
+
+        Returns:
+            the entity object satisfying predicate
+
+        Raises:
+            OpenMoticsDeadlineExceededError: the timeout passed first
+        """
+        key = (installation_id, entity[0], entity[1])
+        watch = self._acquire(key)
+        try:
+            with deadlines.deadline(timeout):
+                data = self._wait(key, watch, predicate)
+        finally:
+            self._release(key)
+        if data is None:
+            raise OpenMoticsDeadlineExceededError(
+                f"Waiting for {key[1]} {key[2]} of installation {key[0]}"
+            )
+        return data
+
+    def watching(self) -> int:
+        """Return the number of watched entities.
+
+        Returns:
+            int
+        """
+        with self._lock:
+            return len(self._watches)
+
+    def _wait(
+        self,
+        key: WatchKey,
+        watch: _Watch,
+        predicate: Callable[[dict[str, Any]], bool],
+    ) -> dict[str, Any] | None:
+        """Poll or wait for an entity until it satisfies predicate.
+
+        Args:
+            key: (installation_id, kind, entity_id)
+            watch: the shared watch of the entity
+            predicate: called with the entity object
+
+        Returns:
+            the entity object, None if the deadline passed first
+        """
+        while True:
+            with watch.cond:
+                if watch.data is not None and predicate(watch.data):
+                    return watch.data
+                remaining = deadlines.remaining()
+                if remaining is not None and remaining <= 0:
+                    return None
+                now = time.monotonic()
+                if watch.polling or now < watch.next_poll:
+                    # Another waiter reads, or the next read is not due yet.
+                    wait = None if watch.polling else watch.next_poll - now
+                    if remaining is not None:
+                        wait = remaining if wait is None else min(wait, remaining)
+                    watch.cond.wait(wait)
+                    continue
+                watch.polling = True
+                version = watch.version
+            try:
+                data = self._read(key)
+            finally:
+                with watch.cond:
+                    watch.polling = False
+                    watch.cond.notify_all()
+            with watch.cond:
+                if watch.version == version and data != watch.data:
+                    watch.data = data
+                    watch.version += 1
+                if self.pushed(key[0]):
+                    watch.interval = self.max_interval
+                elif watch.version != version:
+                    watch.interval = self.min_interval
+                else:
+                    watch.interval = min(
+                        self.max_interval, watch.interval * self.backoff
+                    )
+                watch.next_poll = time.monotonic() + watch.interval
+                watch.cond.notify_all()
+
+    def _read(self, key: WatchKey) -> dict[str, Any]:
+        """Read an entity with the by_id of its section.
+
+        Args:
+            key: (installation_id, kind, entity_id)
+
+        Returns:
+            the entity object
+        """
+        self.polls += 1
+        section = getattr(self.api_client.base.installations, key[1])
+        return section.by_id(key[0], key[2])
+
+    def _acquire(self, key: WatchKey) -> _Watch:
+        with self._lock:
+            watch = self._watches.get(key)
+            if watch is None:
+                watch = self._watches[key] = _Watch(interval=self.min_interval)
+                store = self.api_client.state
+                state = store.get(*key) if store is not None else None
+                if state is not None:
+                    watch.data = state.data
+                    if self.pushed(key[0]):
+                        watch.next_poll = time.monotonic() + self.max_interval
+            watch.waiters += 1
+            return watch
+
+    def _release(self, key: WatchKey) -> None:
+        with self._lock:
+            watch = self._watches[key]
+            watch.waiters -= 1
+            if not watch.waiters:
+                del self._watches[key]
+
+    def _on_change(self, key: WatchKey, state: EntityState) -> None:
+        """Update the watch of an entity changed in the state store.
+
+        Args:
+            key: (installation_id, kind, entity_id)
+            state: EntityState
+        """
+        watch = self._watches.get(key)
+        if watch is None:
+            return
+        with watch.cond:
+            watch.data = state.data
+            watch.version += 1
+            watch.cond.notify_all()
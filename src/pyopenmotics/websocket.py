@@ -1,136 +1,604 @@
-"""Asynchronous Python client for OpenMotics API."""
+"""Push events of the OpenMotics API over a WebSocket.
 
-from __future__ import annotations
-
-from typing import TYPE_CHECKING
+The client connects to the events WebSocket of the API, subscribes to the
+installations it watches and turns incoming change events into events of an
+events.EventBus, or updates of the state.StateStore of the client when it
+has one (its on_change then feeds the bus).
 
-# import websocket
-# import async_timeout
-# from yarl import URL
+When the connection drops, the client reconnects with jittered exponential
+backoff. After a reconnect it reads the outputs, lights, shutters and
+inputs of the watched installations once, and passes on as events the
+entities whose last_state_change or _version differ from the last known
+ones: those in the StateStore of the client, or without a store, those of
+the previous read or event. Entities without these fields are always
+passed on, so consumers see every change made while disconnected:
 
-# from .const import OM_API_BASE_PATH, OM_API_HOST
+    bus = EventBus()
+    client.websocket.start([21, 22], bus=bus)
+    for event in bus.subscribe():
+        ...
 
-# from cached_property import cached_property
-# import socket
-# from typing import Any, Callable
-# from typing import Callable
+Needs websocket-client (pip install pyopenmotics[websocket]).
+"""
+from __future__ import annotations
 
-# import aiohttp
+import base64
+import logging
+import random
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterable
 
+from .events import Event, EventBus
+from .exceptions import OpenMoticsError
 
-# from .exceptions import (
-#     OpenMoticsConnectionError,
-#     OpenMoticsConnectionTimeoutError,
-#     OpenMoticsError,
-#     OpenMoticsRateLimitError,
-# )
+try:
+    import websocket as websocket_client
+except ImportError:  # pragma: no cover
+    websocket_client = None
 
 if TYPE_CHECKING:
     from .client import Api  # pylint: disable=R0401
 
+logger = logging.getLogger(__name__)
+
+# Event type -> entity kind
+EVENT_KINDS = {
+    "OUTPUT_CHANGE": "outputs",
+    "LIGHT_CHANGE": "lights",
+    "SHUTTER_CHANGE": "shutters",
+    "INPUT_CHANGE": "inputs",
+    "SENSOR_CHANGE": "sensors",
+}
+BACKFILL_KINDS = ("outputs", "lights", "shutters", "inputs")
+
 
 class WebSocket:
-    """Docstring."""
+    """Event stream of the OpenMotics API, reconnecting with backfill."""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        api_client: Api,
+        connect: Callable[[WebSocket], Any] | None = None,
+        min_backoff: float = 0.5,
+        max_backoff: float = 60.0,
+        on_event: Callable[[Event], None] | None = None,
+    ):
+        """Init the websocket object.
+
+        Args:
+            api_client: Api
+            connect: returns a new connection with send(str), recv() and
+                close() methods, websocket-client by default
+            min_backoff: seconds before the first reconnect attempt
+            max_backoff: maximum seconds between reconnect attempts
+            on_event: called with every Event passed on, besides the state
+                store or bus
+        """
+        self.api_client = api_client
+        self.connect = connect or _connect
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.on_event = on_event
+        self.installation_ids: frozenset[int] = frozenset()
+        self.bus: EventBus | None = None
+        self.ws: Any = None
+        self.connects = 0
+        self.backfilled = 0
+        # (installation_id, kind, entity_id) -> (last_state_change, _version)
+        self._seen: dict[tuple[int, str, int], tuple[Any, Any]] = {}
+        self._primed: set[int] = set()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self) -> str:
+        """Return the url of the events WebSocket.
+
+        Returns:
+            str
+        """
+        base = self.api_client.base_url
+        scheme = "wss" if base.scheme == "https" else "ws"
+        return str(base.with_scheme(scheme) / "ws" / "events")
+
+    @property
+    def connected(self) -> bool:
+        """Return if the WebSocket is connected.
+
+        Returns:
+            bool
+        """
+        return self.ws is not None
+
+    def pushes(self, installation_id: int) -> bool:
+        """Return if the WebSocket is connected and watches an installation.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            bool
+        """
+        return self.ws is not None and installation_id in self.installation_ids
+
+    def start(
+        self, installation_ids: Iterable[int], bus: EventBus | None = None
+    ) -> threading.Thread:
+        """Watch installations in a background thread.
+
+        Args:
+            installation_ids: the installations to receive events of
+            bus: EventBus to publish to, when the client has no StateStore
+
+        Returns:
+            the thread receiving the events
+        """
+        self.installation_ids = frozenset(installation_ids)
+        self.bus = bus
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run, name="openmotics-websocket", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def watch(self, installation_ids: Iterable[int]) -> None:
+        """Change the watched installations of a started stream.
+
+        Args:
+            installation_ids: the installations to receive events of
+        """
+        with self._lock:
+            self.installation_ids = frozenset(installation_ids)
+            if self.ws is None:
+                return  # subscribed to on connect
+            try:
+                self.ws.send(self._subscription())
+            except Exception:  # pylint: disable=broad-except
+                # The receiving thread reconnects, and subscribes again.
+                logger.debug(
+                    "Updating the WebSocket subscription failed", exc_info=True
+                )
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop watching and close the connection.
+
+        Args:
+            timeout: seconds to wait for the thread to finish
+        """
+        self._stop.set()
+        ws = self.ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:  # pylint: disable=broad-except
+                logger.debug("Closing the WebSocket failed", exc_info=True)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Return the jittered delay before a reconnect.
+
+        Args:
+            attempt: number of failed attempts so far
+
+        Returns:
+            seconds
+        """
+        cap = min(self.max_backoff, self.min_backoff * 2 ** min(attempt, 30))
+        return random.uniform(self.min_backoff / 2, cap)  # nosec
+
+    def run(self) -> None:
+        """Receive events until stop is called, reconnecting on errors."""
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                ws = self.connect(self)
+                with self._lock:
+                    self.ws = ws
+                    ws.send(self._subscription())
+                attempt = 0
+                self.connects += 1
+                for installation_id in self.installation_ids:
+                    self._catch_up(installation_id)
+                while not self._stop.is_set():
+                    self.handle_message(ws.recv())
+            except Exception as exc:  # pylint: disable=broad-except
+                if self._stop.is_set():
+                    break
+                delay = self.backoff_delay(attempt)
+                attempt += 1
+                logger.warning(
+                    "WebSocket connection lost (%s), reconnecting in %.1fs", exc, delay
+                )
+                self._stop.wait(delay)
+            finally:
+                self._close()
+
+    def handle_message(self, message: str | bytes) -> None:
+        """Pass a change event on.
+
+        Args:
+            message: a message received on the WebSocket
+
+        Raises:
+            OpenMoticsError: the connection was closed
+        """
+        if not message:
+            # websocket-client returns an empty message when closed
+            raise OpenMoticsError("WebSocket closed")
+        data = self.api_client.serializer.loads(message)
+        if not isinstance(data, dict) or data.get("type") != "EVENT":
+            return
+        event = data.get("data") or {}
+        kind = EVENT_KINDS.get(event.get("type"))
+        entity = event.get("data")
+        if kind is None or not isinstance(entity, dict) or "id" not in entity:
+            return
+        installation_id = (entity.get("location") or {}).get("installation_id")
+        if installation_id is None:
+            installation_id = event.get("installation_id")
+        if installation_id is not None:
+            self._dispatch(installation_id, kind, [entity])
+
+    def backfill(self, installation_id: int, dispatch: bool = True) -> int:
+        """Read the entities of an installation and pass on the changed ones.
+
+        Args:
+            installation_id: int
+            dispatch: False to only remember the entities as seen
+
+        Returns:
+            the number of changed entities
+        """
+        installations = self.api_client.base.installations
+        features = installations.features(installation_id)
+        store = self.api_client.state
+        changed = 0
+        for kind in BACKFILL_KINDS:
+            if not features.needs(kind):
+                continue
+            # Reads update the state store, compare with its state before.
+            known = (
+                {
+                    entity_id: _stamp(state.data)
+                    for entity_id, state in store.entities(
+                        installation_id, kind
+                    ).items()
+                }
+                if store is not None
+                else None
+            )
+            entities = getattr(installations, kind).all(installation_id) or []
+            if dispatch:
+                changed += self._dispatch(installation_id, kind, entities, known)
+            else:
+                for entity in entities:
+                    self._seen[(installation_id, kind, entity["id"])] = _stamp(entity)
+        self.backfilled += changed
+        return changed
+
+    def _catch_up(self, installation_id: int) -> None:
+        """Backfill an installation after a connect, or read it the first time.
+
+        Args:
+            installation_id: int
+        """
+        primed = installation_id in self._primed
+        try:
+            self.backfill(installation_id, dispatch=primed)
+        except OpenMoticsError as err:
+            logger.warning(
+                "Reading installation %s after connecting failed: %s",
+                installation_id,
+                err,
+            )
+            return
+        self._primed.add(installation_id)
+
+    def _dispatch(
+        self,
+        installation_id: int,
+        kind: str,
+        entities: list[dict[str, Any]],
+        known: dict[int, tuple[Any, Any]] | None = None,
+    ) -> int:
+        """Pass on the entities that changed since they were last seen.
+
+        Args:
+            installation_id: int
+            kind: entity kind
+            entities: entity objects
+            known: (last_state_change, _version) per entity id in the state
+                store, None to compare with the entities passed on before
 
-    def __init__(self, api_client: Api):
-        """Docstring."""
+        Returns:
+            the number of changed entities
+        """
+        changed = []
+        for entity in entities:
+            key = (installation_id, kind, entity["id"])
+            seen = _stamp(entity)
+            previous = self._seen.get(key)
+            if known is not None and entity["id"] in known:
+                previous = known[entity["id"]]
+            self._seen[key] = seen
+            if previous == seen and None not in seen:
+                continue
+            changed.append(entity)
+        if not changed:
+            return 0
+        # The state store passes changes on to the bus through on_change.
+        store = self.api_client.state
+        if store is not None:
+            store.update(installation_id, kind, changed)
+        if (store is None and self.bus is not None) or self.on_event is not None:
+            for entity in changed:
+                event = Event(installation_id, kind, entity["id"], entity)
+                if store is None and self.bus is not None:
+                    self.bus.publish(event)
+                if self.on_event is not None:
+                    self.on_event(event)
+        return len(changed)
+
+    def _subscription(self) -> str:
+        """Return the message subscribing to the watched installations.
+
+        Returns:
+            str
+        """
+        return self.api_client.serializer.dumps_str(
+            {
+                "type": "ACTION",
+                "data": {
+                    "action": "set_subscription",
+                    "types": list(EVENT_KINDS),
+                    "installation_ids": sorted(self.installation_ids),
+                },
+            }
+        )
+
+    def _close(self) -> None:
+        with self._lock:
+            ws, self.ws = self.ws, None
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:  # pylint: disable=broad-except
+                logger.debug("Closing the WebSocket failed", exc_info=True)
+
+
+class WebSocketPool:
+    """Events of many installations over a few shared WebSockets.
+
+    Installations are packed onto as few connections as possible, each
+    subscribing to at most per_connection installations. Events are routed
+    to the handlers of their installation with a single dict lookup:
+
+        pool = WebSocketPool(client, bus=bus)
+        pool.watch(installation_ids)
+        pool.add_handler(21, lambda event: print(event))
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        api_client: Api,
+        bus: EventBus | None = None,
+        max_connections: int = 4,
+        per_connection: int = 250,
+        **kwargs: Any,
+    ):
+        """Init the pool.
+
+        Args:
+            api_client: Api
+            bus: EventBus to publish to, when the client has no StateStore
+            max_connections: maximum number of WebSockets
+            per_connection: maximum installations subscribed on one WebSocket
+            **kwargs: arguments of WebSocket, for example max_backoff
+        """
         self.api_client = api_client
+        self.bus = bus
+        self.max_connections = max_connections
+        self.per_connection = per_connection
+        self.kwargs = kwargs
+        self.shards: list[WebSocket] = []
+        self._assignment: dict[int, WebSocket] = {}
+        self._handlers: dict[int, tuple[Callable[[Event], None], ...]] = {}
+        self._lock = threading.Lock()
+        api_client.add_push_source(self)
+
+    def watch(self, installation_ids: Iterable[int]) -> None:
+        """Receive the events of more installations.
+
+        Args:
+            installation_ids: installations to add
+
+        Raises:
+            OpenMoticsError: the pool has no room left for them
+        """
+        with self._lock:
+            new = [
+                installation_id
+                for installation_id in dict.fromkeys(installation_ids)
+                if installation_id not in self._assignment
+            ]
+            room = sum(
+                self.per_connection - len(shard.installation_ids)
+                for shard in self.shards
+            )
+            room += (self.max_connections - len(self.shards)) * self.per_connection
+            if len(new) > room:
+                raise OpenMoticsError(
+                    f"Can not watch {len(new)} more installations, room for {room}"
+                )
+            changed: dict[int, set[int]] = {}
+            created = set()
+            for installation_id in new:
+                index = next(
+                    (
+                        index
+                        for index, shard in enumerate(self.shards)
+                        if len(shard.installation_ids) + len(changed.get(index, ()))
+                        < self.per_connection
+                    ),
+                    None,
+                )
+                if index is None:
+                    self.shards.append(
+                        WebSocket(self.api_client, on_event=self._route, **self.kwargs)
+                    )
+                    index = len(self.shards) - 1
+                    created.add(index)
+                changed.setdefault(index, set()).add(installation_id)
+                self._assignment[installation_id] = self.shards[index]
+            for index, added in changed.items():
+                shard = self.shards[index]
+                if index in created:
+                    shard.start(added, bus=self.bus)
+                else:
+                    shard.watch(shard.installation_ids | added)
+
+    def unwatch(self, installation_ids: Iterable[int]) -> None:
+        """Stop receiving the events of installations.
+
+        Args:
+            installation_ids: installations to remove
+        """
+        with self._lock:
+            removed: dict[int, set[int]] = {}
+            for installation_id in installation_ids:
+                shard = self._assignment.pop(installation_id, None)
+                if shard is not None:
+                    removed.setdefault(id(shard), set()).add(installation_id)
+            for shard in self.shards:
+                if id(shard) in removed:
+                    shard.watch(shard.installation_ids - removed[id(shard)])
+
+    def add_handler(
+        self, installation_id: int, handler: Callable[[Event], None]
+    ) -> None:
+        """Call a handler with the events of an installation.
+
+        Args:
+            installation_id: int
+            handler: called with every Event of the installation
+        """
+        with self._lock:
+            self._handlers[installation_id] = self._handlers.get(
+                installation_id, ()
+            ) + (handler,)
+
+    def remove_handler(
+        self, installation_id: int, handler: Callable[[Event], None]
+    ) -> None:
+        """Remove a handler added with add_handler.
+
+        Args:
+            installation_id: int
+            handler: the handler
+        """
+        with self._lock:
+            handlers = tuple(
+                item
+                for item in self._handlers.get(installation_id, ())
+                if item != handler
+            )
+            if handlers:
+                self._handlers[installation_id] = handlers
+            else:
+                self._handlers.pop(installation_id, None)
+
+    def shard(self, installation_id: int) -> WebSocket | None:
+        """Return the WebSocket receiving the events of an installation.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            WebSocket, None if the installation is not watched
+        """
+        return self._assignment.get(installation_id)
+
+    def pushes(self, installation_id: int) -> bool:
+        """Return if the WebSocket of an installation is connected.
+
+        Args:
+            installation_id: int
+
+        Returns:
+            bool
+        """
+        shard = self._assignment.get(installation_id)
+        return shard is not None and shard.pushes(installation_id)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Close all WebSockets.
+
+        Args:
+            timeout: seconds to wait for each receiving thread
+        """
+        self.api_client.remove_push_source(self)
+        with self._lock:
+            shards, self.shards = self.shards, []
+            self._assignment.clear()
+        for shard in shards:
+            shard.stop(timeout)
+
+    def _route(self, event: Event) -> None:
+        # Tuples are replaced, not changed, reading them needs no lock.
+        for handler in self._handlers.get(event.installation_id, ()):
+            try:
+                handler(event)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Event handler failed for %s", event)
+
+
+def _stamp(entity: dict[str, Any]) -> tuple[Any, Any]:
+    """Return what identifies the state of an entity.
+
+    Args:
+        entity: entity object
+
+    Returns:
+        (last_state_change, _version)
+    """
+    return entity.get("last_state_change"), entity.get("_version")
+
+
+def _connect(websocket: WebSocket) -> Any:
+    """Open the events WebSocket with websocket-client.
+
+    The access token is passed base64 encoded as subprotocol, browsers can
+    not set an Authorization header on WebSockets.
+
+    Args:
+        websocket: WebSocket
+
+    Returns:
+        the connection
 
-        self.ws = None  # websocket client:
-        # # Websocket path is different for cloud and local connections:
-        # if api_client.base_url.host == OM_API_HOST:
-        #     self.path = f"{OM_API_BASE_PATH}/ws"
-        # else:
-        #     self.path = "/ws"
-
-        # self.path = f"{OM_API_BASE_PATH}/ws"
-
-        # self.endpoint = URL.build(
-        #     scheme="ws",
-        #     host=api_client.base_url.host,
-        #     port=api_client.base_url.port,
-        #     path=self.path,
-        # )
-
-        # print(self.endpoint)
-
-    # async def events(
-    #     self,
-    # ):
-    #     path = "/ws/events"
-    #     return self.api_client.get(path)
-
-    # @property
-    # def connected(self) -> bool:
-    #     """Return if we are connect to the WebSocket of OpenMotics.
-    #     Returns:
-    #         True if we are connected to the WebSocket of OpenMotics,
-    #         False otherwise.
-    #     """
-    #     return self.ws is not None and not self.ws.closed
-
-    # async def connect(self) -> None:
-    #     """Connect to the WebSocket of a OpenMotics.
-    #     Raises:
-    #         OpenMoticsError: The configured OpenMotics does not support WebSocket
-    #             communications.
-    #         OpenMoticsConnectionError: Error occurred while communicating with
-    #             OpenMotics via the WebSocket.
-    #     """
-    #     if self.connected:
-    #         return
-
-    #     try:
-    #         self.ws = await self.api_client.client.ws_connect(
-    #             url=self.endpoint,
-    #             heartbeat=30,
-    #         )
-    #     except (
-    #         aiohttp.WSServerHandshakeError,
-    #         aiohttp.ClientConnectionError,
-    #         socket.gaierror,
-    #     ) as exception:
-    #         raise OpenMoticsConnectionError(
-    #             "Error occurred while communicating with openmotics"
-    #             f" on WebSocket at {self.server}"
-    #         ) from exception
-
-    # async def listen(self, callback: Callable[[Device], None]) -> None:
-    #     """Listen for events on the WLED WebSocket.
-    #     Args:
-    #         callback: Method to call when a state update is received from
-    #             the WLED device.
-    #     Raises:
-    #         WLEDError: Not connected to a WebSocket.
-    #         WLEDConnectionError: An connection error occurred while connected
-    #             to the WLED device.
-    #         WLEDConnectionClosed: The WebSocket connection to the remote WLED
-    #             has been closed.
-    #     """
-    #     if not self.ws or not self.connected or not self._device:
-    #         raise OpenMoticsError("Not connected to a WLED WebSocket")
-
-    #     while not self.ws.closed:
-    #         message = await self.ws.receive()
-
-    #         if message.type == aiohttp.WSMsgType.ERROR:
-    #             raise OpenMoticsConnectionError(self.ws.exception())
-
-    #         if message.type == aiohttp.WSMsgType.TEXT:
-    #             message_data = message.json()
-    #             device = self.ws.update_from_dict(data=message_data)
-    #             callback(device)
-
-    #         if message.type in (
-    #             aiohttp.WSMsgType.CLOSE,
-    #             aiohttp.WSMsgType.CLOSED,
-    #             aiohttp.WSMsgType.CLOSING,
-    #         ):
-    #             raise OpenMoticsConnectionError(
-    #                 f"Connection to the WLED WebSocket on {self.host} has been closed"
-    #             )
-
-    # async def disconnect(self) -> None:
-    #     """Disconnect from the WebSocket of a WLED device."""
-    #     if not self.ws or not self.connected:
-    #         return
+    Raises:
+        OpenMoticsError: websocket-client is not installed
+    """
+    if websocket_client is None:
+        raise OpenMoticsError(
+            "WebSocket events need websocket-client: "
+            "pip install pyopenmotics[websocket]"
+        )
+    api_client = websocket.api_client
+    api_client._ensure_token()  # pylint: disable=protected-access
+    token = api_client.token
+    if isinstance(token, dict):
+        token = token["access_token"]
+    protocol = base64.b64encode(token.encode()).decode().rstrip("=")
+    connection = websocket_client.create_connection(
+        websocket.endpoint,
+        subprotocols=[f"authorization.bearer.{protocol}"],
+        timeout=api_client.request_timeout,
+    )
+    connection.settimeout(None)
+    return connection
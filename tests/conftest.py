@@ -0,0 +1,41 @@
+"""Fixtures shared by the tests: a fake OpenMotics API and its clients.
+
+A test module or test configures the fake server by overriding the
+server_config fixture, for example with
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=3)]).
+"""
+import pytest
+
+from pyopenmotics import BackendClient
+from pyopenmotics.fakeserver import FakeOpenMoticsServer, FakeServerConfig
+
+
+@pytest.fixture(name="server_config")
+def fixture_server_config():
+    """Return the configuration of the fake server."""
+    return FakeServerConfig()
+
+
+@pytest.fixture(name="server")
+def fixture_server(server_config):
+    """Run a fake OpenMotics API."""
+    with FakeOpenMoticsServer(server_config) as server:
+        yield server
+
+
+@pytest.fixture(name="make_client")
+def fixture_make_client(server):
+    """Return a factory of clients of the fake server."""
+
+    def make_client(**kwargs):
+        return BackendClient(
+            "id", "secret", server=server.host, port=server.port, ssl=False, **kwargs
+        )
+
+    return make_client
+
+
+@pytest.fixture(name="client")
+def fixture_client(make_client):
+    """Return a client of the fake server."""
+    return make_client()
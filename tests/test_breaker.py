@@ -0,0 +1,46 @@
+"""Tests for the per installation circuit breaker."""
+import pytest
+
+from pyopenmotics.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from pyopenmotics.exceptions import OpenMoticsCircuitOpenError, OpenMoticsError
+from pyopenmotics.fakeserver import FakeServerConfig
+
+OUTPUTS = "/base/installations/2/outputs"
+
+
+@pytest.mark.parametrize(
+    "server_config", [FakeServerConfig(installations=2, offline_installations={2})]
+)
+def test_circuit_opens_and_recovers(server, make_client):
+    """Test a failing installation fails fast without affecting the others."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    client = make_client(breaker=breaker)
+    outputs = client.base.installations.outputs
+    for _ in range(2):
+        with pytest.raises(OpenMoticsError):
+            outputs.all(2)
+    assert breaker.state(2) == OPEN
+    with pytest.raises(OpenMoticsCircuitOpenError):
+        outputs.all(2)
+    assert server.fleet.requests[OUTPUTS] == 2
+    assert outputs.all(1)
+    assert breaker.state(1) == CLOSED
+
+    # The installation object is served by the cloud.
+    assert client.base.installations.by_id(2)["id"] == 2
+
+    breaker.circuits[2].opened_at -= 30
+    assert breaker.state(2) == HALF_OPEN
+    server.config.offline_installations.clear()
+    assert outputs.all(2)
+    assert breaker.state(2) == CLOSED
+    assert not breaker.snapshot()
+
+
+def test_offline_installations_trip():
+    """Test installations flagged offline open their circuit."""
+    breaker = CircuitBreaker()
+    breaker.learn([{"id": 1, "flags": {"ONLINE": True}}, {"id": 2, "flags": {}}])
+    breaker.learn({"id": 3, "flags": {"ONLINE": False}})
+    assert list(breaker.snapshot()) == [3]
+    assert breaker.snapshot()[3]["state"] == OPEN
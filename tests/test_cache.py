@@ -0,0 +1,57 @@
+"""Tests for conditional GET requests and compression."""
+import pytest
+
+from pyopenmotics.cache import ResponseCache
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.instrumentation import MetricsCollector
+
+OUTPUTS = "GET /base/installations/{installation_id}/outputs"
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=100)])
+def test_not_modified_served_from_cache(make_client):
+    """Test an unchanged list is revalidated and served from the cache."""
+    collector = MetricsCollector()
+    client = make_client(hooks=[collector], conditional_requests=True)
+    first = client.base.installations.outputs.all(1)
+    first[3]["status"]["on"] = "changed by the caller"
+    second = client.base.installations.outputs.all(1)
+    assert second[3]["status"]["on"] is False
+    assert client.response_cache.hits == 1
+    second[3]["status"]["on"] = "changed by the caller"
+    assert client.base.installations.outputs.all(1)[3]["status"]["on"] is False
+    assert client.response_cache.hits == 2
+
+    client.base.installations.outputs.turn_on(1, 3)
+    third = client.base.installations.outputs.all(1)
+    assert third[3]["status"]["on"] is True
+    assert client.response_cache.misses == 1
+
+    metrics = collector.snapshot()["endpoints"][OUTPUTS]
+    assert metrics["status_codes"] == {"200": 2, "304": 2}
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=200)])
+def test_gzip_transfer(make_client):
+    """Test large bodies are downloaded compressed."""
+    collector = MetricsCollector()
+    client = make_client(hooks=[collector])
+    outputs = client.base.installations.outputs.all(1)
+    assert len(outputs) == 200
+    assert client.response_cache is None
+
+    metrics = collector.snapshot()["endpoints"][OUTPUTS]
+    assert metrics["response_bytes"] < len(str(outputs)) / 4
+
+
+def test_response_cache_lru():
+    """Test the least recently used entry is evicted."""
+    cache = ResponseCache(max_entries=2)
+    for url in ("a", "b", "c"):
+        cache.store(cache.key(url), {"ETag": f'"{url}"'}, url)
+    assert cache.get(cache.key("a")) is None
+    assert cache.get(cache.key("c")).conditional_headers() == {"If-None-Match": '"c"'}
+    cache.store(cache.key("c"), {}, "no validators")
+    assert cache.get(cache.key("c")) is None
+    assert cache.key("x", {"b": 1, "a": 2}) == cache.key("x", {"a": 2, "b": 1})
+    assert not cache.cacheable("/base/installations/1/sensors/2/historical")
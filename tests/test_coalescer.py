@@ -0,0 +1,28 @@
+"""Tests for command coalescing."""
+import pytest
+
+from pyopenmotics.coalescer import CommandCoalescer
+from pyopenmotics.fakeserver import FakeServerConfig
+
+TURN_ON = "/base/installations/1/lights/0/turn_on"
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(latency=0.05)])
+def test_latest_value_wins(server, client):
+    """Test a burst of dimmer values is coalesced to a few ordered commands."""
+    settled = []
+    client.get_token()
+    coalescer = CommandCoalescer(client, on_settled=lambda *args: settled.append(args))
+    futures = [coalescer.set_light(1, 0, value) for value in range(1, 31)]
+    assert coalescer.wait_settled(timeout=5)
+    coalescer.close()
+
+    assert server.fleet.requests[TURN_ON] == 2
+    assert server.fleet.entities[1]["lights"][0]["status"]["value"] == 30
+    assert coalescer.coalesced == 28
+    assert [future.result()["status"]["value"] for future in futures[-2:]] == [30, 30]
+    assert len(settled) == 1
+    key, result, error = settled[0]
+    assert key == ("lights", 1, 0)
+    assert result["status"]["value"] == 30
+    assert error is None
@@ -0,0 +1,40 @@
+"""Tests for per call deadlines."""
+import time
+
+import pytest
+
+from pyopenmotics.exceptions import (
+    OpenMoticsDeadlineExceededError,
+    OpenMoticsRateLimitError,
+)
+from pyopenmotics.fakeserver import FakeServerConfig
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(latency=0.5)])
+def test_get_timeout(client):
+    """Test a slow request fails when its timeout passes."""
+    client.get_token()
+    start = time.perf_counter()
+    with pytest.raises(OpenMoticsDeadlineExceededError):
+        client.get("/base/installations", timeout=0.1)
+    assert time.perf_counter() - start < 0.4
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(rate_limit_rate=1.0)])
+def test_deadline_bounds_retries(client):
+    """Test rate limit waits do not outlive the deadline."""
+    start = time.perf_counter()
+    with pytest.raises((OpenMoticsRateLimitError, OpenMoticsDeadlineExceededError)):
+        with client.deadline(0.3):
+            client.base.installations.all()
+    assert time.perf_counter() - start < 1.0
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(latency=0.1)])
+def test_status_by_id_partial(client):
+    """Test status_by_id returns what it fetched before the timeout."""
+    client.get_token()
+    status = client.base.installations.status_by_id(1, timeout=0.25)
+    assert "installation" not in status["timed_out"]
+    assert "lights" in status["timed_out"]
+    assert status["outputs"]
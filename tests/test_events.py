@@ -0,0 +1,91 @@
+"""Tests for the event bus."""
+import threading
+
+import pytest
+
+from pyopenmotics.events import BLOCK, COALESCE, DROP_OLDEST, Event, EventBus
+from pyopenmotics.state import StateStore
+
+
+def test_filters():
+    """Test events are routed by installation and kind."""
+    bus = EventBus()
+    outputs = bus.subscribe(installation_ids={1}, kinds={"outputs"})
+    everything = bus.subscribe()
+    bus.publish(Event(1, "outputs", 3))
+    bus.publish(Event(1, "shutters", 1))
+    bus.publish(Event(2, "outputs", 3))
+    assert outputs.depth == 1
+    assert everything.depth == 3
+    outputs.close()
+    assert bus.publish(Event(1, "outputs", 3)) == 1
+
+
+def test_empty_installation_filter_matches_nothing():
+    """Test an empty installation filter is not taken for all installations."""
+    bus = EventBus()
+    nothing = bus.subscribe(installation_ids=[])
+    assert bus.publish(Event(1, "outputs", 3)) == 0
+    assert nothing.depth == 0
+    nothing.close()
+
+
+def test_overflow_policies():
+    """Test a full queue drops the oldest event or coalesces per entity."""
+    bus = EventBus()
+    dropping = bus.subscribe(maxsize=2, overflow=DROP_OLDEST)
+    coalescing = bus.subscribe(maxsize=2, overflow=COALESCE)
+    for value in range(5):
+        bus.publish(Event(1, "lights", 3, {"value": value}))
+    bus.publish(Event(1, "lights", 4, {"value": 0}))
+    assert [event.data["value"] for event in (dropping.get(0), dropping.get(0))] == [
+        4,
+        0,
+    ]
+    assert dropping.snapshot()["dropped"] == 4
+    assert coalescing.get(0).data["value"] == 4
+    assert coalescing.get(0).entity_id == 4
+    assert coalescing.snapshot()["coalesced"] == 4
+    with pytest.raises(ValueError):
+        bus.subscribe(overflow="explode")
+
+
+def test_block_waits_for_room():
+    """Test a blocking subscription holds up the publisher until read."""
+    bus = EventBus()
+    slow = bus.subscribe(maxsize=1, overflow=BLOCK, block_timeout=5)
+    bus.publish(Event(1, "outputs", 1))
+    publisher = threading.Thread(target=bus.publish, args=(Event(1, "outputs", 2),))
+    publisher.start()
+    publisher.join(0.05)
+    assert publisher.is_alive()
+    assert slow.get(1).entity_id == 1
+    publisher.join(1)
+    assert slow.get(1).entity_id == 2
+    assert slow.snapshot()["max_lag"] > 0
+
+
+def test_block_does_not_delay_other_subscribers():
+    """Test an event reaches the other subscribers before a full BLOCK one."""
+    bus = EventBus()
+    slow = bus.subscribe(maxsize=1, overflow=BLOCK, block_timeout=5)
+    fast = bus.subscribe()
+    bus.publish(Event(1, "outputs", 1))
+    publisher = threading.Thread(target=bus.publish, args=(Event(1, "outputs", 2),))
+    publisher.start()
+    assert [fast.get(1).entity_id, fast.get(1).entity_id] == [1, 2]
+    assert publisher.is_alive()
+    slow.close()
+    publisher.join(1)
+    assert bus.published == 2
+
+
+def test_state_changes_are_published():
+    """Test a state store feeds the bus."""
+    bus = EventBus()
+    subscription = bus.subscribe(kinds={"outputs"})
+    store = StateStore(on_change=bus.on_state_change)
+    store.update(1, "outputs", [{"id": 3, "status": {"on": True}}])
+    event = subscription.get(0)
+    assert (event.installation_id, event.entity_id) == (1, 3)
+    assert event.data["status"]["on"] is True
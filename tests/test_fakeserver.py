@@ -0,0 +1,124 @@
+"""Tests for `openmotics` against the local fake OpenMotics API."""
+import pytest
+
+from pyopenmotics.exceptions import OpenMoticsError, OpenMoticsRateLimitError
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.serialization import Serializer, default_serializer
+
+
+@pytest.fixture(name="server_config")
+def fixture_server_config():
+    """Return a small fake fleet."""
+    return FakeServerConfig(installations=3, outputs=6, shutters=2, seed=1)
+
+
+@pytest.fixture(name="client")
+def fixture_client(make_client):
+    """Return a client talking to the fake server, with a token."""
+    client = make_client()
+    client.get_token()
+    yield client
+    client.session.close()
+
+
+def test_installations(client):
+    """Test listing installations and fetching one by id."""
+    installations = client.base.installations.all()
+    assert [installation["id"] for installation in installations] == [1, 2, 3]
+    installation = client.base.installations.by_id(2)
+    assert installation["features"]["outputs"]["used"] is True
+
+
+def test_outputs(client):
+    """Test output commands are reflected in later reads."""
+    outputs = client.base.installations.outputs
+    assert len(outputs.all(1)) == 6
+    assert len(outputs.lights(1)) == 3
+
+    outputs.turn_on(1, 3, value=40)
+    output = outputs.by_id(1, 3)
+    assert output["status"]["on"] is True
+    assert output["status"]["value"] == 40
+
+    outputs.toggle(1, 3)
+    assert outputs.by_id(1, 3)["status"]["on"] is False
+
+
+def test_lights_and_shutters(client):
+    """Test light and shutter commands."""
+    installations = client.base.installations
+    light = installations.lights.turn_off(1, 0)
+    assert light["status"]["on"] is False
+
+    shutter = installations.shutters.down(1, 1)
+    assert shutter["status"]["state"] == "GOING_DOWN"
+
+
+def test_sensor_history(client):
+    """Test historical query parameters reach the server."""
+    points = client.base.installations.sensors.historical(
+        1, 0, start="0", end="3600", resolution="1m"
+    )
+    assert len(points) == 60
+
+
+def test_status_by_id(client):
+    """Test the combined status call."""
+    status = client.base.installations.status_by_id(1)
+    assert len(status["outputs"]) == 6
+    assert len(status["shutters"]) == 2
+
+
+def test_groupaction_trigger(client):
+    """Test an empty response is handled."""
+    assert client.base.installations.groupactions.trigger(1, 0) == {"": ""}
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(error_rate=1.0)])
+def test_server_error(client):
+    """Test injected server errors surface as OpenMoticsError."""
+    with pytest.raises(OpenMoticsError):
+        client.base.installations.all()
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(rate_limit_rate=1.0)])
+def test_rate_limit(monkeypatch, server, client):
+    """Test injected 429 responses raise OpenMoticsRateLimitError."""
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    with pytest.raises(OpenMoticsRateLimitError):
+        client.base.installations.all()
+    assert server.fleet.requests["/base/installations"] >= 6
+
+
+def test_json_bodies(client):
+    """Test command payloads are sent as a JSON object, encoded once."""
+    installations = client.base.installations
+    light = installations.lights.turn_on(1, 0, value=60)
+    assert light["status"]["on"] is True
+
+    shutter = installations.shutters.change_position(1, 1, 42)
+    assert shutter["status"]["position"] == 42
+
+    output = installations.outputs.location(1, 2, floor_id=3)
+    assert output["location"]["floor_id"] == 3
+
+
+def test_serializers():
+    """Test the standard library and orjson serializers agree."""
+    body = b'{"data": [{"id": 1, "name": "\\u00e9"}], "_error": null}'
+    for serializer in (Serializer(), default_serializer()):
+        assert serializer.decode_data(body) == [{"id": 1, "name": "é"}]
+        assert serializer.loads(serializer.dumps({"a": [1, None]})) == {"a": [1, None]}
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(shutters=0)])
+def test_status_by_id_uses_cached_features(server, make_client):
+    """Test features are read once and unused sections are skipped."""
+    client = make_client()
+    client.base.installations.status_by_id(1)
+    status = client.base.installations.status_by_id(1)
+    requests = server.fleet.requests
+    assert requests["/base/installations/1"] == 1
+    assert "/base/installations/1/shutters" not in requests
+    assert requests["/base/installations/1/lights"] == 2
+    assert status["shutters"] == {}
@@ -0,0 +1,20 @@
+"""Tests for the installation handle."""
+import pytest
+
+
+def test_installation_handle(client):
+    """Test commands through the handle reuse their paths and urls."""
+    home = client.installation(1)
+    assert client.installation(1) is home
+    assert home.turn_on_output(3)["status"]["on"] is True
+    assert home.turn_off_output(3)["status"]["on"] is False
+    assert home.change_shutter_position(1, 40)["status"]["position"] == 40
+    assert len(home.get("outputs")) == 10
+    path = home.route("outputs", 3, "turn_on")
+    assert path == "/base/installations/1/outputs/3/turn_on"
+    assert home.route("outputs", 3, "turn_on") is path
+    assert client.join_url(client.base_url, path) is client.join_url(
+        client.base_url, path
+    )
+    with pytest.raises(ValueError):
+        home.route("outputs", 3, "explode")
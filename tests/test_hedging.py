@@ -0,0 +1,106 @@
+"""Tests for hedged GET requests."""
+import threading
+import time
+
+from pyopenmotics.hedging import HedgingPolicy
+
+
+def slow_once(server, seconds):
+    """Delay the next response of server by seconds."""
+    delays = [seconds]
+
+    def delay():
+        if delays:
+            time.sleep(delays.pop())
+
+    server._delay = delay  # pylint: disable=protected-access
+
+
+def hedged_client(make_client, policy):
+    """Return a client with hedging and primed latencies."""
+    client = make_client(hedging=policy)
+    for _ in range(policy.min_samples):
+        client.base.installations.outputs.by_id(1, 1)
+    return client
+
+
+def test_slow_request_is_hedged(server, make_client):
+    """Test a slow GET is answered by the hedged request."""
+    policy = HedgingPolicy(min_samples=5, max_delay=0.05)
+    client = hedged_client(make_client, policy)
+    slow_once(server, 1.0)
+    start = time.perf_counter()
+    assert client.base.installations.outputs.by_id(1, 1)["id"] == 1
+    assert time.perf_counter() - start < 0.5
+    snapshot = policy.snapshot()
+    assert snapshot["hedges"] == 1
+    assert snapshot["hedge_wins"] == 1
+    policy.close()
+
+
+def test_hedge_budget(server, make_client):
+    """Test no hedges are sent without budget."""
+    policy = HedgingPolicy(min_samples=5, max_delay=0.05, budget=0, max_burst=0)
+    client = hedged_client(make_client, policy)
+    slow_once(server, 0.2)
+    client.base.installations.outputs.by_id(1, 1)
+    assert policy.snapshot()["hedges"] == 0
+    policy.close()
+
+
+def test_primary_does_not_queue_behind_hedges(make_client):
+    """Test a busy hedge pool does not delay the first attempt."""
+    policy = HedgingPolicy(min_samples=5, max_delay=0.05, max_workers=1)
+    client = hedged_client(make_client, policy)
+    policy.executor.submit(time.sleep, 1.0)
+    start = time.perf_counter()
+    assert client.base.installations.outputs.by_id(1, 1)["id"] == 1
+    assert time.perf_counter() - start < 0.5
+    policy.close()
+
+
+def primed_policy(**kwargs):
+    """Return a policy hedging the endpoint "e" after 50 ms."""
+    policy = HedgingPolicy(min_samples=1, min_delay=0.05, max_delay=0.05, **kwargs)
+    policy.observe("e", 0.05)
+    return policy
+
+
+def test_losing_attempt_is_abandoned():
+    """Test a losing attempt that was sent is counted as abandoned."""
+    policy = primed_policy()
+    delays = [0.5, 0]
+
+    def attempt():
+        time.sleep(delays.pop(0))
+        return threading.current_thread().name
+
+    assert policy.call("e", attempt).startswith("openmotics-hedge")
+    snapshot = policy.snapshot()
+    assert snapshot["hedges"] == 1 and snapshot["abandoned"] == 1
+    policy.close()
+
+
+def test_queued_hedge_is_cancelled():
+    """Test a hedge that was not sent yet is cancelled and its budget returned."""
+    policy = primed_policy(max_workers=1, max_burst=1)
+    blocker = policy.executor.submit(time.sleep, 0.5)
+    delays = [0.1]
+
+    def attempt():
+        time.sleep(delays.pop(0))
+
+    policy.call("e", attempt)
+    snapshot = policy.snapshot()
+    assert snapshot["hedges"] == 0 and snapshot["abandoned"] == 0
+    assert policy._tokens == 1  # pylint: disable=protected-access
+    blocker.result()
+    policy.close()
+
+
+def test_primaries_are_bounded():
+    """Test requests beyond max_primaries run unhedged on the calling thread."""
+    policy = primed_policy(max_primaries=0)
+    assert policy.call("e", threading.current_thread) is threading.current_thread()
+    assert policy.snapshot()["hedges"] == 0
+    policy.close()
@@ -0,0 +1,96 @@
+"""Tests for the instrumentation hooks."""
+import pytest
+
+from pyopenmotics.exceptions import OpenMoticsRateLimitError
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.instrumentation import (
+    LatencyHistogram,
+    MetricsCollector,
+    PhaseTimings,
+)
+from pyopenmotics.profiler import SamplingProfiler
+from pyopenmotics.util import endpoint_template
+
+
+def test_endpoint_template():
+    """Test ids are replaced by placeholders."""
+    assert (
+        endpoint_template("/base/installations/21/outputs/70/turn_on")
+        == "/base/installations/{installation_id}/outputs/{id}/turn_on"
+    )
+    assert endpoint_template("base/installations") == "/base/installations"
+
+
+def test_histogram_percentiles():
+    """Test percentile estimates from the buckets."""
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.observe(0.003)
+    histogram.observe(0.2)
+    assert histogram.percentile(50) == 5.0
+    assert histogram.percentile(99) == 5.0
+    assert histogram.percentile(100) == pytest.approx(200.0)
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=3)])
+def test_metrics_collector(make_client):
+    """Test the collector sees requests, auth and status codes."""
+    collector = MetricsCollector()
+    client = make_client(hooks=[collector])
+    client.base.installations.outputs.all(1)
+    client.base.installations.outputs.turn_on(1, 0)
+    client.base.installations.outputs.turn_on(1, 2)
+
+    snapshot = collector.snapshot()
+    assert snapshot["auth"]["count"] == 1
+    endpoints = snapshot["endpoints"]
+    turn_on = endpoints[
+        "POST /base/installations/{installation_id}/outputs/{id}/turn_on"
+    ]
+    assert turn_on["latency"]["count"] == 2
+    assert turn_on["status_codes"] == {"200": 2}
+    assert turn_on["response_bytes"] > 0
+    assert endpoints["GET /base/installations/{installation_id}/outputs"]["errors"] == 0
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(rate_limit_rate=1.0)])
+def test_retries_and_rate_limits(monkeypatch, client):
+    """Test retries and 429 responses are counted."""
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    collector = MetricsCollector()
+    client.add_hook(collector)
+    with pytest.raises(OpenMoticsRateLimitError):
+        client.base.installations.all()
+
+    metrics = collector.snapshot()["endpoints"]["GET /base/installations"]
+    attempts = metrics["latency"]["count"]
+    assert metrics["rate_limited"] == attempts
+    assert metrics["status_codes"] == {"429": attempts}
+    assert metrics["retries"] == attempts - 1
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=200, latency=0.02)])
+def test_sampling_profiler(make_client):
+    """Test phase timings are measured and aggregated per endpoint."""
+    profiler = SamplingProfiler(sample_rate=1.0)
+    client = make_client(hooks=[profiler])
+    client.base.installations.outputs.all(1)
+    client.base.installations.outputs.all(1)
+
+    phases = profiler.report()["GET /base/installations/{installation_id}/outputs"]
+    assert phases["total"]["count"] == 2
+    assert phases["auth"]["max_ms"] > 0
+    assert phases["server"]["min_ms"] >= 20
+    assert phases["decode"]["max_ms"] > 0
+    assert set(phases) == {*PhaseTimings.PHASES, "total"}
+    for phase in PhaseTimings.PHASES:
+        assert phases[phase]["min_ms"] <= phases["total"]["max_ms"]
+    assert 0 < phases["server"]["share"] <= 1
+
+
+def test_profiler_sample_rate(make_client):
+    """Test unsampled requests carry no phase timings."""
+    profiler = SamplingProfiler(sample_rate=0.0)
+    client = make_client(hooks=[profiler])
+    client.base.installations.all()
+    assert not profiler.report()
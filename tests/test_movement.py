@@ -0,0 +1,172 @@
+"""Tests for the shutter movement estimator."""
+import time
+
+import pytest
+
+from pyopenmotics import movement as movement_module
+from pyopenmotics.movement import DOWN, UP, MovementEstimator
+from pyopenmotics.state import StateStore
+
+
+class FakeTime:
+    """A clock that only moves when advanced."""
+
+    def __init__(self):
+        """Start the clock at an arbitrary monotonic time."""
+        self.now = 1000.0
+        self.wall = time.time()
+
+    def monotonic(self):
+        """Return the monotonic time."""
+        return self.now
+
+    def time(self):
+        """Return the wall clock time."""
+        return self.wall + self.now - 1000.0
+
+    def advance(self, seconds):
+        """Move the clock forward by seconds."""
+        self.now += seconds
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """Replace the clock of the estimator."""
+    clock = FakeTime()
+    monkeypatch.setattr(movement_module, "time", clock)
+    return clock
+
+
+def make_estimator(client, position=None, **kwargs):
+    """Return an estimator that knows shutter 1, confirming only on demand."""
+    confirmed = []
+    movements = MovementEstimator(
+        client,
+        margin=60,
+        on_confirmed=lambda *args: confirmed.append(args),
+        **kwargs,
+    )
+    shutter = client.base.installations.shutters.by_id(1, 1)
+    if position is not None:
+        shutter["status"]["position"] = position
+    movements.observe(1, shutter)
+    return movements, confirmed
+
+
+def test_estimates_and_confirms_once(server, client, clock):
+    """Test a movement is interpolated and confirmed with a single read."""
+    movements, confirmed = make_estimator(client)
+    movements.down(1, 1)
+    assert movements.moving() == 1 and movements.eta(1, 1) == 30
+    clock.advance(15)
+    assert movements.eta(1, 1) == 15 and movements.position(1, 1) == 50
+
+    clock.advance(10)
+    shutter = server.fleet.entities[1]["shutters"][1]
+    shutter["status"]["state"] = "STOPPED"
+    shutter["last_state_change"] = clock.time() - 1
+    movements.confirm(1, 1)
+    movements.close()
+
+    assert server.fleet.requests["/base/installations/1/shutters/1"] == 2
+    assert len(confirmed) == 1 and confirmed[0][0] == (1, 1)
+    assert confirmed[0][2] is None and movements.confirms == 1
+    assert movements.moving() == 0 and movements.eta(1, 1) == 0
+    assert movements.position(1, 1) == 99
+    # Arrived after 24 s, blended into the 30 s of the configuration.
+    assert movements.travel(1, 1, DOWN) == pytest.approx(28.2)
+    assert movements.travel(1, 1, UP) == 30
+
+
+def test_up_stop_and_change_position(client, clock):
+    """Test the commands start, re-plan and end a movement."""
+    movements, _ = make_estimator(client, position=60)
+    movements.up(1, 1)
+    assert movements.eta(1, 1) == pytest.approx(30 * 60 / 99)
+    clock.advance(30 * 20 / 99)
+    assert movements.position(1, 1) == 40
+
+    movements.stop(1, 1)
+    assert movements.moving() == 0 and movements.position(1, 1) == 40
+    clock.advance(5)
+    assert movements.position(1, 1) == 40
+
+    movements.change_position(1, 1, 70)
+    assert movements.eta(1, 1) == pytest.approx(30 * 30 / 99)
+    clock.advance(30 * 15 / 99)
+    assert movements.position(1, 1) == 55
+    movements.change_position(1, 1, 45)
+    assert movements.eta(1, 1) == pytest.approx(30 * 10 / 99)
+    movements.close()
+    assert movements.moving() == 0
+
+
+def test_move_to_preset(client, clock):
+    """Test a preset movement heads for the observed preset position."""
+    client.base.installations.shutters.preset(1, 1, 40)
+    movements, _ = make_estimator(client, position=80)
+    movements.move_to_preset(1, 1)
+    assert movements.eta(1, 1) == pytest.approx(30 * 40 / 99)
+    clock.advance(30 * 40 / 99)
+    assert movements.position(1, 1) == 40
+    movements.close()
+
+
+def test_follows_movement_started_elsewhere(client, clock):
+    """Test an observed GOING_* state is followed to the end."""
+    movements, _ = make_estimator(client, position=0)
+    shutter = client.base.installations.shutters.by_id(1, 1)
+    shutter["status"]["state"] = "GOING_DOWN"
+    movements.observe(1, shutter)
+    assert movements.moving() == 1 and movements.eta(1, 1) == 30
+    clock.advance(10)
+    assert movements.position(1, 1) == 33
+
+    shutter["status"].update(state="STOPPED", position=50)
+    movements.observe(1, shutter)
+    assert movements.moving() == 0 and movements.position(1, 1) == 50
+    movements.close()
+
+
+def test_gives_up_after_max_confirms(client, clock):
+    """Test a movement that does not end is dropped after max_confirms reads."""
+    movements, confirmed = make_estimator(client, max_confirms=2)
+    movements.down(1, 1)
+    clock.advance(40)
+    movements.confirm(1, 1)
+    assert movements.moving() == 1 and not confirmed
+    movements.confirm(1, 1)
+    movements.close()
+
+    assert movements.moving() == 0 and movements.confirms == 2
+    assert len(confirmed) == 1 and confirmed[0][2] is None
+
+
+def test_failed_confirm_ends_movement(server, client, clock):
+    """Test a failing confirming read ends the movement and reports the error."""
+    movements, confirmed = make_estimator(client)
+    movements.down(1, 1)
+    del server.fleet.entities[1]["shutters"][1]
+    movements.confirm(1, 1)
+    movements.close()
+
+    assert movements.moving() == 0
+    assert len(confirmed) == 1 and confirmed[0][1] is None
+    assert confirmed[0][2] is not None
+
+
+def test_close_removes_store_listener(make_client, clock):
+    """Test changes in the state store are not observed after close."""
+    client = make_client(state=StateStore())
+    movements, _ = make_estimator(client, position=0)
+    shutter = client.base.installations.shutters.by_id(1, 1)
+    shutter["status"]["state"] = "GOING_DOWN"
+    movements.close()
+    client.state.update(1, "shutters", shutter)
+    assert movements.moving() == 0
+
+    movements = MovementEstimator(client, margin=60)
+    movements.observe(1, {"id": 1, "status": {"position": 0}})
+    client.state.update(1, "shutters", dict(shutter, last_state_change=clock.time()))
+    assert movements.moving() == 1
+    movements.close()
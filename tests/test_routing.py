@@ -0,0 +1,84 @@
+"""Tests for routing requests to the local gateway."""
+import pytest
+
+from pyopenmotics.const import OM_API_BASE_PATH
+from pyopenmotics.exceptions import OpenMoticsError
+from pyopenmotics.fakeserver import FakeOpenMoticsServer, FakeServerConfig
+from pyopenmotics.routing import LocalRouter
+
+OUTPUT_ON = "/base/installations/1/outputs/2/turn_on"
+
+
+@pytest.fixture(name="cloud")
+def fixture_cloud(server):
+    """Return the fake server playing the cloud."""
+    return server
+
+
+def test_learn_gateways(make_client):
+    """Test gateway addresses are learned from the installations."""
+    router = LocalRouter()
+    make_client(router=router).base.installations.all()
+    assert router.gateways[1].host == "10.0.0.2"
+    assert router.gateways[1].healthy is None
+
+
+def test_local_gateway_and_fallback(cloud, make_client):
+    """Test commands go to a reachable gateway and to the cloud otherwise."""
+    router = LocalRouter(scheme="http", base_path=OM_API_BASE_PATH)
+    client = make_client(router=router)
+    with FakeOpenMoticsServer() as gateway:
+        # The gateway accepts the tokens issued by the cloud.
+        gateway.fleet.tokens = cloud.fleet.tokens
+        router.add_gateway(1, gateway.host, gateway.port)
+        router.refresh()
+        client.base.installations.outputs.turn_on(1, 2)
+        assert gateway.fleet.requests[OUTPUT_ON] == 1
+        assert OUTPUT_ON not in cloud.fleet.requests
+        assert router.gateways[1].healthy is True
+
+    router.gateways[1].checked = 0.0
+    router.refresh()
+    client.base.installations.outputs.turn_on(1, 2)
+    assert cloud.fleet.requests[OUTPUT_ON] == 1
+    assert router.gateways[1].healthy is False
+    assert router.gateways[1].failures == 1
+
+    # Skipped until the next probe.
+    client.base.installations.outputs.turn_on(1, 2)
+    assert cloud.fleet.requests[OUTPUT_ON] == 2
+    assert router.gateways[1].failures == 1
+    router.close()
+
+
+def test_probe_off_the_request_path(cloud, make_client):
+    """Test an unknown gateway is probed in the background, not by a request."""
+    router = LocalRouter(scheme="http", base_path=OM_API_BASE_PATH)
+    with FakeOpenMoticsServer() as gateway:
+        gateway.fleet.tokens = cloud.fleet.tokens
+        router.add_gateway(1, gateway.host, gateway.port)
+        make_client(router=router).base.installations.outputs.turn_on(1, 2)
+        assert cloud.fleet.requests[OUTPUT_ON] == 1
+        router.refresh()
+        assert router.gateways[1].healthy is True
+    router.close()
+
+
+def test_ambiguous_command_failure_not_resent(cloud, make_client):
+    """Test a command that timed out on the gateway is not sent to the cloud."""
+    router = LocalRouter(scheme="http", base_path=OM_API_BASE_PATH, request_timeout=0.1)
+    slow = FakeServerConfig(latency=0.5)
+    with FakeOpenMoticsServer(slow) as gateway:
+        client = make_client(router=router)
+        gateway.fleet.tokens = cloud.fleet.tokens
+        router.add_gateway(1, gateway.host, gateway.port)
+        router.refresh()
+        with pytest.raises(OpenMoticsError, match="may have been applied"):
+            client.base.installations.outputs.turn_on(1, 2)
+        assert OUTPUT_ON not in cloud.fleet.requests
+
+        # Reads are safe to repeat, they fall back to the cloud.
+        router.gateways[1].healthy = True
+        assert client.base.installations.outputs.by_id(1, 2)["id"] == 2
+        assert cloud.fleet.requests["/base/installations/1/outputs/2"] == 1
+    router.close()
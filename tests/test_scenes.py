@@ -0,0 +1,80 @@
+"""Tests for the groupaction effect prediction."""
+from pyopenmotics.scenes import Effect, decode_actions
+from pyopenmotics.state import StateStore
+
+
+def test_decode_actions():
+    """Test actions are decoded into the final state per entity."""
+    prediction = decode_actions([160, 3, 102, 1, 161, 3, 162, 3, 162, 4])
+    assert prediction.complete
+    assert prediction.effects == [
+        Effect("shutters", 1, {"state": "STOPPED"}),
+        Effect("outputs", 3, {"on": False}),
+        Effect("outputs", 4, None),
+    ]
+
+
+def test_classic_action_numbers():
+    """Test the action numbers of the gateway, spelled out literally."""
+    prediction = decode_actions([161, 3, 160, 4, 100, 1, 101, 2, 102, 5, 185, 6])
+    assert {effect.entity_id: effect.status for effect in prediction.effects} == {
+        3: {"on": True},
+        4: {"on": False},
+        1: {"state": "UP", "position": 0},
+        2: {"state": "DOWN"},
+        5: {"state": "STOPPED"},
+        6: {"on": True, "value": 100},
+    }
+
+
+def test_decode_nested_and_unknown_actions():
+    """Test nested groupactions are expanded and unknown types are reported."""
+    groupactions = {5: [181, 7, 2, 6], 6: [2, 5]}
+    prediction = decode_actions([2, 5, 240, 1], groupactions)
+    assert prediction.affected() == {("outputs", 7)}
+    assert prediction.effects[0].status == {"on": True, "value": 60}
+    assert not prediction.complete
+    assert prediction.unknown == [(2, 5), (240, 1)]
+
+
+def test_trigger_updates_state(server, make_client):
+    """Test a trigger applies the effects of the scene to the state store."""
+    store = StateStore()
+    client = make_client(state=store)
+    groupactions = client.base.installations.groupactions
+    groupactions.all(1)
+    groupactions.trigger(1, 2)
+    assert store.get(1, "outputs", 2).data["status"]["on"] is True
+    assert store.get(1, "outputs", 3).data["status"]["on"] is False
+    assert store.get(1, "outputs", 3).optimistic
+
+    outputs_read = server.fleet.requests.get("/base/installations/1/outputs/3", 0)
+    refreshed = groupactions.refresh_affected(1, 2)
+    assert [output["id"] for output in refreshed] == [2, 3]
+    assert server.fleet.requests["/base/installations/1/outputs/3"] == (
+        outputs_read + 1
+    )
+    assert not store.get(1, "outputs", 2).optimistic
+    assert store.get(1, "outputs", 2).data["status"]["on"] is True
+
+
+def test_shutters_predicted_at_their_end_state(server, make_client):
+    """Test shutters are predicted where they stop, using their configuration."""
+    prediction = decode_actions([101, 1, 100, 2, 100, 3, 101, 3])
+    effects = {effect.entity_id: effect for effect in prediction.effects}
+    assert effects[3].status == {"state": "DOWN"}
+    assert effects[1].resolve({"configuration": {"steps": 50}}) == {
+        "state": "DOWN",
+        "position": 49,
+    }
+    assert effects[1].resolve(None) == {"state": "DOWN"}
+
+    store = StateStore()
+    server.fleet.entities[1]["groupactions"][2]["actions"] = [101, 1, 100, 2]
+    client = make_client(state=store)
+    client.base.installations.shutters.all(1)
+    client.base.installations.groupactions.trigger(1, 2)
+    assert store.get(1, "shutters", 1).data["status"]["state"] == "DOWN"
+    assert store.get(1, "shutters", 1).data["status"]["position"] == 99
+    assert store.get(1, "shutters", 2).data["status"]["state"] == "UP"
+    assert store.get(1, "shutters", 2).data["status"]["position"] == 0
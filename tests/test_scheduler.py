@@ -0,0 +1,51 @@
+"""Tests for the priority scheduler."""
+import threading
+import time
+
+from pyopenmotics.scheduler import Priority, PriorityScheduler
+
+
+def grant_order(scheduler, requests):
+    """Queue requests (priority, installation id) and return the grant order."""
+    scheduler.acquire(Priority.INTERACTIVE)  # use up the burst
+    order = []
+    threads = []
+    for request in requests:
+        thread = threading.Thread(
+            target=lambda r=request: (scheduler.acquire(*r), order.append(r))
+        )
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_interactive_overtakes_background():
+    """Test a command is served before queued polls."""
+    scheduler = PriorityScheduler(rate=20, burst=1)
+    requests = [(Priority.BACKGROUND, 1)] * 3 + [(Priority.INTERACTIVE, 2)]
+    assert grant_order(scheduler, requests)[0] == (Priority.INTERACTIVE, 2)
+
+
+def test_fair_share_across_installations():
+    """Test one busy installation does not starve another."""
+    scheduler = PriorityScheduler(rate=20, burst=1)
+    requests = [(Priority.BACKGROUND, 1)] * 4 + [(Priority.BACKGROUND, 2)]
+    assert grant_order(scheduler, requests).index((Priority.BACKGROUND, 2)) <= 1
+
+
+def test_default_priorities(make_client):
+    """Test commands and reads get their default class."""
+    scheduler = PriorityScheduler(rate=1000, burst=100)
+    client = make_client(scheduler=scheduler)
+    client.base.installations.outputs.turn_on(1, 1)
+    client.base.installations.sensors.historical(1, 1, start=0, end=3600)
+    list(client.base.installations.sensors.iter_historical(1, 1, start=0, end=60))
+    with client.priority(Priority.BACKGROUND):
+        client.base.installations.outputs.all(1)
+    classes = scheduler.snapshot()["classes"]
+    assert classes["INTERACTIVE"]["count"] == 1
+    assert classes["BACKFILL"]["count"] == 2
+    assert classes["BACKGROUND"]["count"] == 1
@@ -0,0 +1,28 @@
+"""Tests for selective and projected snapshots."""
+import pytest
+
+from pyopenmotics.util import compile_fields, project
+
+
+def test_project():
+    """Test nested fields are projected and missing fields left out."""
+    tree = compile_fields(["id", "status.on", "status.value", "missing"])
+    entity = {"id": 3, "name": "Kitchen", "status": {"on": True, "locked": False}}
+    assert project([entity], tree) == [{"id": 3, "status": {"on": True}}]
+    assert compile_fields(["status", "status.on"]) == {"status": None}
+
+
+def test_snapshot_reads_only_requested_sections(server, client):
+    """Test only the requested endpoints are hit and fields are projected."""
+    snapshot = client.base.installations.snapshot(
+        1, ["outputs"], {"outputs": ["id", "status.on"]}
+    )
+    requests = {path for path in server.fleet.requests if path.startswith("/base")}
+    assert requests == {
+        "/base/installations/1",
+        "/base/installations/1/outputs",
+    }
+    with pytest.raises(ValueError):
+        client.base.installations.snapshot(1, ["doors"])
+    assert snapshot["timed_out"] == []
+    assert snapshot["outputs"][0] == {"id": 0, "status": {"on": False}}
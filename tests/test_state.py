@@ -0,0 +1,63 @@
+"""Tests for the optimistic state store."""
+import pytest
+
+from pyopenmotics.exceptions import OpenMoticsError
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.state import StateStore
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=3)])
+def test_reads_and_commands_update_state(make_client):
+    """Test reads fill the store and commands are confirmed by responses."""
+    changes = []
+    store = StateStore(on_change=lambda key, state: changes.append(key))
+    client = make_client(state=store)
+    client.base.installations.outputs.all(1)
+    assert len(store.entities(1, "outputs")) == 3
+    assert store.get(1, "outputs", 1).data["status"]["on"] is False
+
+    client.base.installations.outputs.turn_on(1, 1)
+    state = store.get(1, "outputs", 1)
+    assert state.data["status"]["on"] is True
+    assert state.optimistic is False
+    # optimistic update followed by the confirmed response
+    assert changes[3:] == [(1, "outputs", 1), (1, "outputs", 1)]
+
+
+def test_optimistic_update_and_rollback():
+    """Test the expected state is shown until a failing command rolls back."""
+    store = StateStore()
+    store.update(1, "shutters", [{"id": 0, "status": {"position": 10}}])
+    seen = []
+
+    def send():
+        state = store.get(1, "shutters", 0)
+        seen.append((state.optimistic, state.data["status"]["position"]))
+        raise OpenMoticsError(500, {"_error": "failed"})
+
+    with pytest.raises(OpenMoticsError):
+        store.track(
+            "POST",
+            "/base/installations/1/shutters/0/change_position",
+            {"position": 80},
+            send,
+        )
+    assert seen == [(True, 80)]
+    state = store.get(1, "shutters", 0)
+    assert state.data["status"]["position"] == 10
+    assert state.optimistic is False
+
+
+def test_stale_read_keeps_optimistic_state():
+    """Test a read started before a command finished does not overwrite it."""
+    store = StateStore()
+    store.track(
+        "POST", "/base/installations/1/outputs/2/turn_on", {"value": 50}, lambda: None
+    )
+    store.update(1, "outputs", [{"id": 2, "status": {"on": False}}], started=0.0)
+    state = store.get(1, "outputs", 2)
+    assert state.optimistic is True
+    assert state.data["status"] == {"on": True, "value": 50}
+
+    store.update(1, "outputs", [{"id": 2, "status": {"on": True, "value": 50}}])
+    assert store.get(1, "outputs", 2).optimistic is False
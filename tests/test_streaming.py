@@ -0,0 +1,78 @@
+"""Tests for the incremental decoding of list responses."""
+import json
+
+import pytest
+
+from pyopenmotics.exceptions import OpenMoticsError
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.state import StateStore
+from pyopenmotics.streaming import iter_json_array
+
+DOCUMENT = {
+    "_acl": {"data": [0]},
+    "data": [
+        {"id": 1, "name": 'quote " and \\ backslash', "nested": {"a": [1, 2]}},
+        "string with ] and , and }",
+        3.5,
+        None,
+        [1, [2, 3]],
+    ],
+    "_error": None,
+}
+
+
+def chunked(data, size):
+    """Split data in chunks of size bytes."""
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1 << 16])
+def test_iter_json_array(size):
+    """Test elements are found regardless of the chunk boundaries."""
+    body = json.dumps(DOCUMENT).encode("utf8")
+    elements = list(iter_json_array(chunked(body, size)))
+    assert elements == DOCUMENT["data"]
+
+
+def test_iter_json_object():
+    """Test a data object is yielded as a single element."""
+    body = b'{"data": {"id": 1, "values": [1, 2]}, "_error": null}'
+    assert list(iter_json_array(chunked(body, 3))) == [{"id": 1, "values": [1, 2]}]
+
+
+def test_iter_json_empty():
+    """Test an empty or missing array yields nothing."""
+    assert not list(iter_json_array([b'{"data": []}']))
+    assert not list(iter_json_array([b'{"data": null}']))
+
+
+def test_iter_json_truncated():
+    """Test a truncated document raises."""
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"data": [1, 2, {"a"']))
+
+
+@pytest.mark.parametrize(
+    "server_config", [FakeServerConfig(installations=1, outputs=500, sensors=1)]
+)
+def test_stream_from_server(client):
+    """Test streaming outputs and history from the fake server."""
+    outputs = client.base.installations.outputs
+    assert list(outputs.iter_all(1)) == outputs.all(1)
+
+    sensors = client.base.installations.sensors
+    points = sensors.iter_historical(1, 0, start=0, end=86400, resolution="1m")
+    assert sum(1 for _ in points) == 1440
+
+    with pytest.raises(OpenMoticsError):
+        list(outputs.iter_all(5))
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(outputs=3)])
+def test_stream_updates_state(make_client):
+    """Test streamed entities are stored in the state store."""
+    store = StateStore()
+    client = make_client(state=store)
+    outputs = list(client.base.installations.outputs.iter_all(1))
+    assert store.get(1, "outputs", outputs[1]["id"]).data == outputs[1]
+    assert len(store.entities(1, "outputs")) == 3
@@ -0,0 +1,55 @@
+"""Tests for the persisted topology snapshot."""
+import pytest
+
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.scheduler import PriorityScheduler
+from pyopenmotics.topology import TopologySnapshot
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(installations=3)])
+def test_warm_start_and_revalidation(server, make_client, tmp_path):
+    """Test a restart serves from the file and refetches changed installations."""
+    path = tmp_path / "topology.json"
+    cold = TopologySnapshot(make_client(), path)
+    assert len(cold.installations()) == 3
+    assert cold.refreshed == 3
+    assert path.exists()
+    outputs = server.fleet.requests["/base/installations/2/outputs"]
+
+    warm = TopologySnapshot(make_client(), path)
+    assert warm.entities(2, "outputs") == cold.entities(2, "outputs")
+    warm.revalidate(wait=True)
+    assert warm.refreshed == 0
+    assert server.fleet.requests["/base/installations/2/outputs"] == outputs
+
+    server.fleet.installations[2]["_version"] = 2.0
+    warm.revalidate(wait=True)
+    assert warm.refreshed == 1
+    assert server.fleet.requests["/base/installations/2/outputs"] == outputs + 1
+    assert TopologySnapshot(make_client(), path).installations()[1]["_version"] == 2.0
+
+
+@pytest.mark.parametrize(
+    "server_config", [FakeServerConfig(installations=3, offline_installations={2})]
+)
+def test_failing_installation_is_skipped(server, client, tmp_path):
+    """Test one offline installation does not abort the revalidation."""
+    path = tmp_path / "topology.json"
+    snapshot = TopologySnapshot(client, path)
+    assert [item["id"] for item in snapshot.installations()] == [1, 3]
+    assert snapshot.failed == 1
+    assert path.exists()
+
+    server.config.offline_installations.clear()
+    snapshot.revalidate(wait=True)
+    assert len(snapshot.installations()) == 3
+
+
+def test_revalidation_runs_in_background_priority(make_client, tmp_path):
+    """Test the revalidation reads do not compete with interactive requests."""
+    scheduler = PriorityScheduler(rate=1000, burst=1000)
+    client = make_client(scheduler=scheduler)
+    TopologySnapshot(client, tmp_path / "topology.json").installations()
+    requests = {name: count for name, (count, _) in scheduler.waits.items()}
+    assert requests["BACKGROUND"] > 0
+    assert requests["UI_READ"] == 0
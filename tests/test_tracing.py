@@ -0,0 +1,93 @@
+"""Tests for the tracing spans."""
+import contextlib
+import contextvars
+
+import pytest
+
+from pyopenmotics.exceptions import OpenMoticsRateLimitError
+from pyopenmotics.fakeserver import FakeServerConfig
+
+_current = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    """Minimal span recording its attributes and parent."""
+
+    def __init__(self, name, attributes, parent):
+        """Init the span."""
+        self.name = name
+        self.attributes = dict(attributes)
+        self.parent = parent
+
+    def set_attribute(self, key, value):
+        """Set an attribute."""
+        self.attributes[key] = value
+
+
+class Tracer:
+    """Minimal OpenTelemetry like tracer."""
+
+    def __init__(self):
+        """Init the tracer."""
+        self.spans = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        """Start a span as child of the current one."""
+        span = Span(name, attributes or {}, _current.get())
+        self.spans.append(span)
+        token = _current.set(span)
+        try:
+            yield span
+        finally:
+            _current.reset(token)
+
+
+@pytest.fixture(name="server_config")
+def fixture_server_config():
+    """Return the configuration of the fake server."""
+    return FakeServerConfig(outputs=2, shutters=1)
+
+
+def test_status_by_id_spans(make_client):
+    """Test sub-requests are children of the status_by_id span."""
+    tracer = Tracer()
+    client = make_client(tracer=tracer)
+    client.base.installations.status_by_id(1)
+
+    parent = tracer.spans[0]
+    assert parent.name == "openmotics.status_by_id"
+    assert parent.attributes["openmotics.installation_id"] == 1
+    children = tracer.spans[1:]
+    assert {child.parent for child in children} == {parent}
+    assert children[0].name == "GET /base/installations/{installation_id}"
+    assert children[1].attributes["openmotics.endpoint"] == (
+        "/base/installations/{installation_id}/outputs"
+    )
+    assert all(child.attributes["http.status_code"] == 200 for child in children)
+    assert all(child.attributes["openmotics.retries"] == 0 for child in children)
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(rate_limit_rate=1.0)])
+def test_retries_attribute(make_client, monkeypatch):
+    """Test retries are counted on the request span."""
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    tracer = Tracer()
+    client = make_client(tracer=tracer)
+    with pytest.raises(OpenMoticsRateLimitError):
+        client.base.installations.by_id(1)
+
+    (span,) = tracer.spans
+    assert span.attributes["openmotics.retries"] > 0
+    assert span.attributes["http.status_code"] == 429
+
+
+def test_streamed_request_span(make_client):
+    """Test a streamed list gets a request span."""
+    tracer = Tracer()
+    client = make_client(tracer=tracer)
+    assert len(list(client.base.installations.outputs.iter_all(1))) == 2
+
+    (span,) = tracer.spans
+    assert span.name == "GET /base/installations/{installation_id}/outputs"
+    assert span.attributes["http.status_code"] == 200
@@ -0,0 +1,104 @@
+"""Tests for waiting on entity states."""
+import queue
+import threading
+import time
+
+import pytest
+
+from pyopenmotics.exceptions import OpenMoticsDeadlineExceededError
+from pyopenmotics.fakeserver import FakeServerConfig
+from pyopenmotics.state import StateStore
+from pyopenmotics.waiting import StateWaiter
+from pyopenmotics.websocket import WebSocketPool
+
+
+class Connection:
+    """A WebSocket connection without events."""
+
+    def __init__(self):
+        """Init the connection."""
+        self.messages = queue.Queue()
+
+    def send(self, message):
+        """Ignore subscriptions."""
+
+    def recv(self):
+        """Return the next message, raise an exception put in the queue."""
+        message = self.messages.get()
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def close(self):
+        """Make recv fail, like a closed connection."""
+        self.messages.put(ConnectionError("closed"))
+
+
+def is_on(output):
+    """Return if an output is on."""
+    return output["status"]["on"]
+
+
+def test_waiters_share_polling(client, make_client):
+    """Test concurrent waiters on an entity are served by one poller."""
+    waiter = StateWaiter(client, min_interval=0.05, max_interval=0.2)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(waiter.wait_for(1, ("outputs", 3), is_on, 5))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    make_client().base.installations.outputs.turn_on(1, 3)
+    for thread in threads:
+        thread.join()
+    with pytest.raises(OpenMoticsDeadlineExceededError):
+        client.base.installations.wait_for(1, ("outputs", 4), is_on, timeout=0.2)
+
+    assert len(results) == 4 and all(is_on(output) for output in results)
+    assert waiter.polls < 12  # separate pollers would need about 4 times more
+    assert waiter.watching() == 0
+
+
+def test_resolves_from_pushed_state(make_client):
+    """Test a state store update resolves a waiter without polling."""
+    store = StateStore()
+    client = make_client(state=store)
+    client.base.installations.outputs.all(1)
+    waiter = StateWaiter(client, push=True)
+    timer = threading.Timer(
+        0.1, store.update, (1, "outputs", {"id": 3, "status": {"on": True}})
+    )
+    timer.start()
+    output = waiter.wait_for(1, ("outputs", 3), is_on, timeout=5)
+    assert output == {"id": 3, "status": {"on": True}}
+    assert waiter.polls == 0
+
+
+@pytest.mark.parametrize("server_config", [FakeServerConfig(installations=3)])
+def test_push_is_decided_per_installation(make_client):
+    """Test only installations watched by a connected stream count as pushed."""
+    client = make_client(state=StateStore())
+    waiter = StateWaiter(client, min_interval=0.05, max_interval=5)
+    assert not waiter.pushed(1)
+
+    client.websocket.connect = lambda _: Connection()
+    client.websocket.start([1])
+    pool = WebSocketPool(client, connect=lambda _: Connection())
+    pool.watch([3])
+    while not (client.websocket.connected and pool.pushes(3)):
+        time.sleep(0.01)
+    assert waiter.pushed(1) and waiter.pushed(3)
+    assert not waiter.pushed(2)
+
+    # Unwatched installations keep polling at the adaptive rate.
+    with pytest.raises(OpenMoticsDeadlineExceededError):
+        waiter.wait_for(2, ("outputs", 3), is_on, timeout=0.3)
+    assert waiter.polls > 2
+
+    pool.stop(5)
+    client.websocket.stop(5)
+    assert not waiter.pushed(3)
@@ -0,0 +1,139 @@
+"""Tests for the WebSocket event stream."""
+import json
+import queue
+import time
+
+import pytest
+
+from pyopenmotics.events import EventBus
+from pyopenmotics.exceptions import OpenMoticsError
+from pyopenmotics.state import StateStore
+from pyopenmotics.websocket import WebSocket, WebSocketPool
+
+
+class Connection:
+    """A WebSocket connection replaying queued messages."""
+
+    def __init__(self, messages):
+        """Init the connection with a queue of messages to receive."""
+        self.messages = messages
+        self.sent = []
+
+    def send(self, message):
+        """Record a sent message."""
+        self.sent.append(json.loads(message))
+
+    def recv(self):
+        """Return the next message, raise an exception put in the queue."""
+        message = self.messages.get(timeout=5)
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def close(self):
+        """Make recv fail, like a closed connection."""
+        self.messages.put(ConnectionError("closed"))
+
+
+def output_change(output_id, on, installation_id=1):
+    """Return an OUTPUT_CHANGE event message."""
+    return json.dumps(
+        {
+            "type": "EVENT",
+            "data": {
+                "type": "OUTPUT_CHANGE",
+                "data": {
+                    "id": output_id,
+                    "location": {"installation_id": installation_id},
+                    "status": {"on": on},
+                },
+            },
+        }
+    )
+
+
+def test_reconnect_backfills_missed_changes(client):
+    """Test changes made while disconnected are published after reconnecting."""
+    connections = []
+
+    def connect(_):
+        messages = queue.Queue()
+        if not connections:
+            messages.put(output_change(2, True))
+        connections.append(Connection(messages))
+        return connections[-1]
+
+    bus = EventBus()
+    events = bus.subscribe()
+    websocket = WebSocket(client, connect=connect, min_backoff=0.05)
+    websocket.start([1], bus=bus)
+    assert events.get(5).entity_id == 2
+
+    client.base.installations.outputs.turn_on(1, 4)  # missed while down
+    connections[0].messages.put(ConnectionError("dropped"))
+    backfilled = {}
+    while 4 not in backfilled:
+        event = events.get(5)
+        backfilled[event.entity_id] = event
+    websocket.stop(5)
+
+    # Output 2 is repeated, its event had no last_state_change to compare.
+    assert set(backfilled) <= {2, 4}
+    assert backfilled[4].data["status"]["on"] is True
+    assert websocket.backfilled <= 2
+    assert len(connections) == 2
+    assert connections[1].sent[0]["data"]["installation_ids"] == [1]
+
+
+def test_backfill_compares_with_state_store(make_client):
+    """Test a reconnect without changes passes nothing on."""
+    connections = []
+
+    def connect(_):
+        messages = queue.Queue()
+        if not connections:
+            messages.put(ConnectionError("dropped"))
+        connections.append(Connection(messages))
+        return connections[-1]
+
+    store = StateStore()
+    client = make_client(state=store)
+    client.base.installations.outputs.all(1)
+    websocket = WebSocket(client, connect=connect, min_backoff=0.05)
+    websocket.start([1])
+    while len(connections) < 2 or not websocket.connected:
+        time.sleep(0.01)
+    websocket.stop(5)
+
+    assert websocket.connects == 2
+    assert websocket.backfilled == 0
+
+
+def test_pool_shards_installations(client):
+    """Test installations are packed onto few connections and routed."""
+    connections = []
+
+    def connect(_):
+        connections.append(Connection(queue.Queue()))
+        return connections[-1]
+
+    pool = WebSocketPool(client, max_connections=3, per_connection=2, connect=connect)
+    pool.watch([1, 2, 3])
+    received = queue.Queue()
+    pool.add_handler(3, received.put)
+    pool.add_handler(1, lambda event: received.put(None))
+    shard = pool.shard(3)
+    while not shard.connected:
+        time.sleep(0.01)
+    connections[1].messages.put(output_change(2, True, installation_id=3))
+    event = received.get(timeout=5)
+    pool.watch([4])
+    with pytest.raises(OpenMoticsError):
+        pool.watch([5, 6, 7])
+    pool.stop(5)
+
+    assert (event.installation_id, event.entity_id) == (3, 2)
+    assert received.empty()
+    assert len(connections) == 2
+    assert connections[0].sent[0]["data"]["installation_ids"] == [1, 2]
+    assert connections[1].sent[-1]["data"]["installation_ids"] == [3, 4]